@@ -1,13 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from app.supabase_client import supabase
+from fastapi import APIRouter, HTTPException, Request
+from app.supabase_client import read_router
+from app.utils.etag import conditional_get
 
 router = APIRouter()
 
 @router.get("/{bot_id}")
-def get_bot(bot_id: str):
-    try:
+def get_bot(bot_id: str, request: Request):
+    def load():
         response = (
-            supabase
+            read_router.client_for("bots.get", bot_id=bot_id)
             .table("bots")
             .select("*")
             .eq("bot_id", bot_id)  # ✅ updated from 'id'
@@ -15,11 +16,15 @@ def get_bot(bot_id: str):
             .execute()
         )
 
-        if not response.data or len(response.data) == 0:
+        if not response.data or len(response.data) == 0 or response.data[0].get("status") == "deleted":
             raise HTTPException(status_code=404, detail="Bot not found")
 
         return response.data[0]
 
+    try:
+        return conditional_get(request, ("bot", bot_id), bot_id, load)
+    except HTTPException:
+        raise
     except Exception as e:
         print("ERROR fetching bot:", e)
         raise HTTPException(status_code=500, detail="Supabase fetch error: " + str(e))
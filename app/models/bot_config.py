@@ -0,0 +1,182 @@
+# app/models/bot_config.py
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Optional, Tuple, Union
+
+
+class OrderType(str, Enum):
+    MARKET = "market"
+    LIMIT = "limit"
+    CONDITIONAL_MARKET = "conditional_market"
+    CONDITIONAL_LIMIT = "conditional_limit"
+
+    @property
+    def is_conditional(self) -> bool:
+        return self in (OrderType.CONDITIONAL_MARKET, OrderType.CONDITIONAL_LIMIT)
+
+    @property
+    def execution_type(self) -> str:
+        """Order type actually sent to the exchange ('market' or 'limit')."""
+        if self in (OrderType.MARKET, OrderType.CONDITIONAL_MARKET):
+            return "market"
+        return "limit"
+
+
+class DcaCondition(str, Enum):
+    LAST_ENTRY = "lastEntry"
+    AVERAGE_ENTRY = "averageEntry"
+    LOSS_PERCENT = "lossPercent"
+    LOSS_AMOUNT = "lossAmount"
+    VOLATILITY = "volatility"
+
+
+class DcaAmountMode(str, Enum):
+    FIXED = "fixed"
+    MULTIPLIER = "multiplier"
+    PROGRESSIVE = "progressive"
+
+
+def normalize_order_type(raw: Any) -> str:
+    """'Conditional Market' -> 'conditional_market'"""
+    return str(raw).strip().replace(" ", "_").lower() if raw else ""
+
+
+def _to_float(value: Any, default: Optional[float] = None) -> Optional[float]:
+    try:
+        return float(value) if value is not None and value != "" else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_int(value: Any, default: int = 0) -> int:
+    try:
+        return int(value) if value is not None and value != "" else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_enum(enum_cls, value: Any):
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class TakeProfitTarget:
+    step: int
+    trigger_pct: float
+    position_size: float
+
+
+@dataclass(frozen=True, slots=True)
+class PriceDropConditions:
+    """Stop or pause thresholds in %, None when the condition is disabled."""
+    price_drop_from_last: Optional[float] = None
+    price_drop_from_avg: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]) -> "PriceDropConditions":
+        config = config or {}
+
+        def enabled_value(key: str) -> Optional[float]:
+            entry = config.get(key) or {}
+            if not entry.get("enabled"):
+                return None
+            return _to_float(entry.get("value"))
+
+        return cls(
+            price_drop_from_last=enabled_value("priceDropFromLast"),
+            price_drop_from_avg=enabled_value("priceDropFromAvg"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class BotConfig:
+    """
+    Typed, pre-normalized view of a `bots` row.
+    Parse once with BotConfig.from_row(row) and pass it to the calculators.
+    """
+    bot_id: str
+    user_id: str
+    status: str
+    exchange: str
+    trading_pair: str
+    order_type: Optional[OrderType]
+    limit_price: Optional[float]
+    initial_amount: float
+    required_capital: Optional[float]
+    dca_orders: int
+    max_dca_orders: int
+    dca_condition: Optional[DcaCondition]
+    dca_amount_mode: Optional[DcaAmountMode]
+    fixed_amount: float
+    multiplier: float
+    last_entry_drop: float
+    average_entry_drop: float
+    loss_percentage: float
+    loss_amount: float
+    progressive_enabled: bool
+    progressive_multiplier: float
+    take_profit_targets: Tuple[TakeProfitTarget, ...]
+    stop_conditions: PriceDropConditions
+    pause_conditions: PriceDropConditions
+    trigger_mode: Optional[str] = None
+    volatility_interval: str = "1h"
+    volatility_window: int = 14
+    volatility_multiplier: float = 1.0
+
+    @classmethod
+    def from_row(cls, row: dict) -> "BotConfig":
+        progressive = row.get("progressive_drops") or {}
+        take_profit = row.get("take_profit") or {}
+
+        targets = []
+        for i, tp in enumerate(take_profit.get("targets") or []):
+            # Normalize keys from frontend if needed
+            trigger_pct = _to_float(tp.get("triggerPrice") or tp.get("trigger_pct"))
+            position_size = _to_float(tp.get("positionSize") or tp.get("position_size"))
+            if trigger_pct is None or position_size is None:
+                continue
+            targets.append(TakeProfitTarget(i + 1, trigger_pct, position_size))
+
+        return cls(
+            bot_id=row.get("bot_id") or "",
+            user_id=row.get("user_id") or "",
+            status=row.get("status") or "",
+            exchange=(row.get("exchange") or "").lower(),
+            trading_pair=row.get("trading_pair") or "",
+            order_type=_to_enum(OrderType, normalize_order_type(row.get("order_type"))),
+            limit_price=_to_float(row.get("limit_price")),
+            initial_amount=_to_float(row.get("initial_amount"), 0.0),
+            required_capital=_to_float(row.get("required_capital")),
+            dca_orders=_to_int(row.get("dca_orders")),
+            max_dca_orders=_to_int(row.get("max_dca_orders")),
+            dca_condition=_to_enum(DcaCondition, row.get("dca_condition")),
+            dca_amount_mode=_to_enum(DcaAmountMode, row.get("dca_amount_mode")),
+            fixed_amount=_to_float(row.get("fixed_amount"), 0.0),
+            multiplier=_to_float(row.get("multiplier"), 1.0),
+            last_entry_drop=_to_float(row.get("last_entry_drop"), 0.0),
+            average_entry_drop=_to_float(row.get("average_entry_drop"), 0.0),
+            loss_percentage=_to_float(row.get("loss_percentage"), 0.0),
+            loss_amount=_to_float(row.get("loss_amount"), 0.0),
+            progressive_enabled=bool(progressive.get("enabled", False)),
+            progressive_multiplier=_to_float(progressive.get("multiplier"), 1.0),
+            take_profit_targets=tuple(targets),
+            stop_conditions=PriceDropConditions.from_dict(row.get("stop_conditions")),
+            pause_conditions=PriceDropConditions.from_dict(row.get("pause_conditions")),
+            trigger_mode=row.get("trigger_mode"),
+            volatility_interval=row.get("volatility_interval") or "1h",
+            volatility_window=_to_int(row.get("volatility_window"), 14),
+            volatility_multiplier=_to_float(row.get("volatility_multiplier"), 1.0),
+        )
+
+    @classmethod
+    def coerce(cls, bot: Union["BotConfig", dict]) -> "BotConfig":
+        """Accept either a parsed config or a raw `bots` row."""
+        return bot if isinstance(bot, cls) else cls.from_row(bot)
+
+    @property
+    def dca_steps(self) -> int:
+        return max(self.max_dca_orders - self.dca_orders, 0)
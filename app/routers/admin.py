@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+from app.utils.auth import require_admin
+from app.utils.profiling import ProfiledRoute, request_profiler, memory_tracker
+from app.services.order_netting import order_netter
+
+router = APIRouter(dependencies=[Depends(require_admin)], route_class=ProfiledRoute)
+
+
+class ProfilingToggle(BaseModel):
+    sample_rate: float
+    path_prefix: str = "/"
+    duration_secs: float = 600
+
+
+# 🔥 Sample a fraction of requests (optionally under one path) for a limited time
+@router.get("/profiling")
+def read_profiling():
+    return request_profiler.status()
+
+@router.post("/profiling")
+def set_profiling(toggle: ProfilingToggle):
+    return request_profiler.configure(toggle.sample_rate, toggle.path_prefix, toggle.duration_secs)
+
+
+# 🧠 tracemalloc snapshots and diffs
+@router.get("/memory")
+def read_memory():
+    return memory_tracker.status()
+
+@router.post("/memory/start")
+def start_memory_tracing(frames: int = 25):
+    return memory_tracker.start(frames)
+
+@router.post("/memory/stop")
+def stop_memory_tracing():
+    return memory_tracker.stop()
+
+@router.post("/memory/snapshot")
+def take_memory_snapshot(limit: int = 25, key_type: str = "lineno"):
+    try:
+        return memory_tracker.snapshot(limit=limit, key_type=key_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/memory/diff")
+def diff_memory_snapshots(base: int, target: Optional[int] = None, limit: int = 25, key_type: str = "lineno"):
+    try:
+        return memory_tracker.diff(base, target, limit=limit, key_type=key_type)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+# 🧮 Order netting: orders requested vs exchange orders placed
+@router.get("/netting")
+def read_netting():
+    return order_netter.status()
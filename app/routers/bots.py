@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from datetime import datetime
-from app.supabase_client import supabase
+from typing import Dict, List, Optional
+from app.supabase_client import supabase, read_router
 from app.services.preflight import validate_bot
 from app.services.run_dca_bot import run_dca_bot
 from app.services.status_transition import (
@@ -11,23 +12,35 @@ from app.services.status_transition import (
     get_latest_run_id
 )
 from app.services.bot_service import delete_bot_completely
+from app.services.log_retention import fetch_bot_logs, parse_timestamp
+from app.services.capital_calculator import calculate_ladder_capital, expand_grid
+from app.services.run_summaries import get_user_run_summaries
+from app.services.dca_scheduler import dca_scheduler
+from app.utils.etag import conditional_get
+from app.utils.auth import get_current_user_id
+from app.utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 # ✅ Get single bot config by bot_id
 @router.get("/{bot_id}")
-def get_bot(bot_id: str):
-    response = (
-        supabase
-        .table("bots")
-        .select("*")
-        .eq("bot_id", bot_id)
-        .single()
-        .execute()
-    )
-    if not response or not response.data:
-        raise HTTPException(status_code=404, detail="Bot not found")
-    return response.data
+def get_bot(bot_id: str, request: Request):
+    def load():
+        response = (
+            read_router.client_for("bots.get", bot_id=bot_id)
+            .table("bots")
+            .select("*")
+            .eq("bot_id", bot_id)
+            .limit(1)
+            .execute()
+        )
+        # Soft-deleted bots stay in the table until purged, but are gone for readers
+        if not response or not response.data or response.data[0].get("status") == "deleted":
+            raise HTTPException(status_code=404, detail="Bot not found")
+        return response.data[0]
+
+    # Dashboards poll this; unchanged bots answer 304 without a database read
+    return conditional_get(request, ("bot", bot_id), bot_id, load)
 
 # ✅ Start bot
 class StartBotRequest(BaseModel):
@@ -69,6 +82,25 @@ def start_bot(request: StartBotRequest):
         print("❌ Exception in run_dca_bot:", str(e))
         raise HTTPException(status_code=500, detail="Internal server error: " + str(e))
 
+# ✅ What-if capital / ladder depth for many candidate configs
+class CapitalGridRequest(BaseModel):
+    configs: Optional[List[dict]] = None
+    base: Optional[dict] = None
+    grid: Optional[Dict[str, list]] = None
+    entry_price: Optional[float] = None
+
+@router.post("/capital")
+def calculate_capital(request: CapitalGridRequest):
+    try:
+        configs = list(request.configs or [])
+        if request.base is not None:
+            configs += expand_grid(request.base, request.grid or {})
+        if not configs:
+            raise ValueError("Provide 'configs' or a 'base' config with a 'grid'")
+        return {"results": calculate_ladder_capital(configs, request.entry_price)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/pause")
 def pause_bot(request: StartBotRequest):
     update_bot_status(request.bot_id, "paused")
@@ -106,21 +138,66 @@ def stop_bot(request: StartBotRequest):
 def delete_bot(request: StartBotRequest):
     try:
         delete_bot_completely(request.bot_id)
-        return {"status": "deleted", "message": "Bot and related data deleted"}
+        return {"status": "deleted", "message": "Bot deleted, related data is being purged"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete bot: {e}")
 
 @router.get("/{bot_id}/logs")
-async def get_bot_logs(bot_id: str, limit: int = 50):
+async def get_bot_logs(bot_id: str, request: Request, limit: int = 50, since: Optional[str] = None):
+    if since:
+        try:
+            since = parse_timestamp(since).isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid 'since' timestamp, expected ISO 8601")
     try:
-        result = (
-            supabase.table("bot_logs")
-            .select("*")
-            .eq("bot_id", bot_id)
-            .order("timestamp", desc=True)
-            .limit(limit)
-            .execute()
-        )
-        return result.data or []
+        # Falls back to hourly rollups for ranges older than the retention window
+        return conditional_get(request, ("bot_logs", bot_id, limit, since), bot_id,
+                               lambda: fetch_bot_logs(bot_id, limit=limit, since=since))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching logs: {str(e)}")
+
+# ✅ Run state, duration, fills and last event for all of the caller's runs
+@router.get("/runs/summaries")
+def get_run_summaries(status: Optional[str] = None, bot_id: Optional[str] = None, limit: int = 50,
+                      user_id: str = Depends(get_current_user_id)):
+    try:
+        return get_user_run_summaries(user_id, status=status, bot_id=bot_id, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching run summaries: {str(e)}")
+
+# ⏰ Recurring buys, e.g. $50 every 86400s anchored at 09:00 UTC
+class ScheduleRequest(BaseModel):
+    user_id: str
+    amount: float
+    interval_secs: int = 86400
+    start_at: Optional[str] = None
+
+@router.put("/{bot_id}/schedule")
+def set_bot_schedule(bot_id: str, request: ScheduleRequest):
+    response = (
+        supabase.table("bots")
+        .select("bot_id, user_id, exchange, trading_pair, status")
+        .eq("bot_id", bot_id)
+        .eq("user_id", request.user_id)
+        .limit(1)
+        .execute()
+    )
+    if not response.data or response.data[0].get("status") == "deleted":
+        raise HTTPException(status_code=404, detail="Bot not found or access denied")
+    bot = response.data[0]
+
+    try:
+        return dca_scheduler.set_schedule(
+            bot_id, request.user_id, bot["exchange"], bot["trading_pair"],
+            request.amount, request.interval_secs, request.start_at,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/{bot_id}/schedule")
+def delete_bot_schedule(bot_id: str, user_id: str):
+    response = supabase.table("bots").select("bot_id").eq("bot_id", bot_id).eq("user_id", user_id).limit(1).execute()
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Bot not found or access denied")
+    dca_scheduler.remove_schedule(bot_id)
+    return {"status": "deleted", "message": "Schedule removed"}
@@ -3,9 +3,10 @@ from pydantic import BaseModel
 from app.supabase_client import supabase
 from app.utils.crypto import encrypt
 from app.utils.auth import get_current_user_id
+from app.utils.profiling import ProfiledRoute
 from datetime import datetime
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 class ExchangeKeyPayload(BaseModel):
     exchange: str
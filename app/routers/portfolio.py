@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from app.utils.auth import get_current_user_id
+from app.utils.profiling import ProfiledRoute
+from app.services.portfolio import get_portfolio, get_portfolio_history
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# ✅ Capital deployed, unrealized PnL and exposure per symbol for the signed-in user
+@router.get("/")
+def read_portfolio(include_closed: bool = False, user_id: str = Depends(get_current_user_id)):
+    try:
+        return get_portfolio(user_id, include_closed=include_closed)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching portfolio: {str(e)}")
+
+# ✅ Periodic valuations for charts
+@router.get("/history")
+def read_portfolio_history(since: Optional[str] = None, limit: int = 500,
+                           user_id: str = Depends(get_current_user_id)):
+    try:
+        return get_portfolio_history(user_id, since=since, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching portfolio history: {str(e)}")
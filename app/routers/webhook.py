@@ -1,10 +1,33 @@
 from fastapi import APIRouter, Request, HTTPException
+from starlette.concurrency import run_in_threadpool
 from app.supabase_client import supabase
 from app.services.run_dca_bot import run_dca_bot
+from app.services.webhook_journal import webhook_journal
+from app.utils.rate_limit import admit
+from app.utils.profiling import ProfiledRoute
 from datetime import datetime, timedelta
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def replay_signal(record: dict):
+    """
+    Journal replay: re-run a bot whose accepted webhook was never fully processed.
+    Skipped when the webhook already created its run (bot_runs.entry_key), so a
+    crash after the order went out never places a second one.
+    """
+    entry_key = record.get("key")
+    if entry_key:
+        existing = supabase.table("bot_runs").select("run_id").eq("entry_key", entry_key).limit(1).execute()
+        if existing.data:
+            print(f"⏭️ Webhook {entry_key} already started run {existing.data[0]['run_id']}, skipping replay")
+            return
+    print(f"🔁 Replaying webhook signal for bot {record['bot_id']}")
+    run_dca_bot(bot_id=record["bot_id"], user_id=record["user_id"], entry_key=entry_key)
+
+
+webhook_journal.register("signal", replay_signal)
 
 @router.post("/webhook")
 async def webhook_handler(request: Request):
@@ -13,6 +36,12 @@ async def webhook_handler(request: Request):
         bot_id = payload.get("bot_id")
         secret = payload.get("secret")
         signal = payload.get("signal")
+    except Exception as e:
+        print(f"❌ Webhook error: {str(e)}")
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+    admit(request, bot_id=bot_id)
+    try:
         return await process_webhook(bot_id, secret, signal, source="POST")
     except Exception as e:
         print(f"❌ Webhook error: {str(e)}")
@@ -20,7 +49,8 @@ async def webhook_handler(request: Request):
 
 
 @router.get("/w/{bot_id}/{secret}/{signal}")
-async def webhook_url_handler(bot_id: str, secret: str, signal: str):
+async def webhook_url_handler(bot_id: str, secret: str, signal: str, request: Request):
+    admit(request, bot_id=bot_id)
     try:
         return await process_webhook(bot_id, secret, signal, source="GET")
     except Exception as e:
@@ -29,7 +59,8 @@ async def webhook_url_handler(bot_id: str, secret: str, signal: str):
 
 
 @router.get("/webhook/{token}")
-async def token_webhook_handler(token: str):
+async def token_webhook_handler(token: str, request: Request):
+    admit(request, token=token)
     try:
         # Token format: temp_{bot_id}_{condition_id}_{uuid}
         if not token.startswith("temp_"):
@@ -68,7 +99,20 @@ async def token_webhook_handler(token: str):
                 raise HTTPException(status_code=404, detail="Bot not found")
 
             bot = bot_resp.data[0]
-            result = run_dca_bot(bot_id=bot_id, user_id=bot["user_id"])
+            entry_key = uuid.uuid4().hex
+            offset = await webhook_journal.append_async({
+                "kind": "signal",
+                "bot_id": bot_id,
+                "user_id": bot["user_id"],
+                "signal": condition_id,
+                "source": "TOKEN",
+                "key": entry_key,
+            })
+            try:
+                result = await run_in_threadpool(run_dca_bot, bot_id=bot_id, user_id=bot["user_id"],
+                                                 entry_key=entry_key)
+            finally:
+                webhook_journal.commit(offset)
 
             return {
                 "status": "success",
@@ -98,7 +142,7 @@ async def process_webhook(bot_id: str, secret: str, signal: str, source: str = "
         .execute()
     )
 
-    if not response.data:
+    if not response.data or response.data[0].get("status") == "deleted":
         reason = "Bot not found"
         await log_webhook(bot_id, signal, secret, False, reason, source)
         raise HTTPException(status_code=404, detail=reason)
@@ -121,9 +165,21 @@ async def process_webhook(bot_id: str, secret: str, signal: str, source: str = "
         await log_webhook(bot_id, signal, secret, False, reason, source)
         raise HTTPException(status_code=403, detail=reason)
 
-    # ✅ Success – log and run bot
-    await log_webhook(bot_id, signal, secret, True, "valid", source)
-    result = run_dca_bot(bot_id=bot_id, user_id=bot["user_id"])
+    # ✅ Accepted – journal durably before acting on it, so a crash replays it on restart
+    entry_key = uuid.uuid4().hex
+    offset = await webhook_journal.append_async({
+        "kind": "signal",
+        "bot_id": bot_id,
+        "user_id": bot["user_id"],
+        "signal": signal,
+        "source": source,
+        "key": entry_key,
+    })
+    try:
+        await log_webhook(bot_id, signal, secret, True, "valid", source)
+        result = await run_in_threadpool(run_dca_bot, bot_id=bot_id, user_id=bot["user_id"], entry_key=entry_key)
+    finally:
+        webhook_journal.commit(offset)
 
     return {
         "status": "success",
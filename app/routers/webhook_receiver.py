@@ -1,15 +1,22 @@
 from fastapi import APIRouter, Request, HTTPException
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timezone
+from typing import Optional
+import uuid
 from app.supabase_client import supabase
-from app.services.evaluator import evaluate_condition_groups
+from app.services.condition_graph import condition_graphs, validity_secs
 from app.services.run_dca_bot import trigger_bot_condition
+from app.services.webhook_journal import webhook_journal
+from app.utils.rate_limit import admit
+from app.utils.profiling import ProfiledRoute
+from app.utils.tracing import current_trace_id
 from app.services.status_transition import (
     get_latest_run_id,
     update_bot_run_status,
     log_bot_event,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.post("/webhook/condition")
@@ -18,16 +25,19 @@ async def receive_condition_webhook(request: Request):
     token = body.get("token")
     if not token:
         raise HTTPException(status_code=400, detail="Missing token in payload")
+    admit(request, token=token)
     return await handle_condition_trigger(token)
 
 
 @router.api_route("/wc/{token}", methods=["GET", "POST"])
-async def receive_condition_webhook_url(token: str):
+async def receive_condition_webhook_url(token: str, request: Request):
+    admit(request, token=token)
     return await handle_condition_trigger(token)
 
 
 @router.api_route("/webhook/{token}", methods=["GET", "POST"])
-async def receive_condition_webhook_direct(token: str):
+async def receive_condition_webhook_direct(token: str, request: Request):
+    admit(request, token=token)
     return await handle_condition_trigger(token)
 
 
@@ -62,13 +72,13 @@ async def handle_condition_trigger(token: str):
             raise HTTPException(status_code=404, detail="Bot not found for condition")
         user_id = bot_resp.data[0]["user_id"]
 
-    validity_secs = condition.get("validity_secs", 300)
+    valid_for = validity_secs(condition)
 
     if condition["status"] == "triggered":
         triggered_at = datetime.fromisoformat(condition["triggered_at"].replace("Z", "+00:00"))
         now = datetime.now(timezone.utc)
         delta = (now - triggered_at).total_seconds()
-        if delta < validity_secs:
+        if delta < valid_for:
             return {
                 "status": "already_triggered",
                 "triggered_at": condition["triggered_at"]
@@ -88,17 +98,22 @@ async def handle_condition_trigger(token: str):
     if getattr(update_resp, "error", None):
         raise HTTPException(status_code=500, detail="Failed to update condition")
 
+    metadata = {
+        "condition_id": condition_id,
+        "triggered_at": now_utc,
+        "webhook_token": token
+    }
+    trace_id = current_trace_id()
+    if trace_id:
+        # Same correlation key log_bot_event adds; this event has no run yet
+        metadata["trace_id"] = trace_id
     log_resp = (
         supabase.table("bot_logs")
         .insert({
             "bot_id": bot_id,
             "user_id": user_id,
             "event": "condition_triggered",
-            "metadata": {
-                "condition_id": condition_id,
-                "triggered_at": now_utc,
-                "webhook_token": token
-            },
+            "metadata": metadata,
             "timestamp": now_utc
         })
         .execute()
@@ -107,32 +122,30 @@ async def handle_condition_trigger(token: str):
     if getattr(log_resp, "error", None):
         raise HTTPException(status_code=500, detail="Failed to log trigger event")
 
+    entry_fired = False
     if stage in ["trigger", "filter"]:
-        print(f"🚀 Trigger stage reached (stage={stage}). Evaluating and executing bot {bot_id}")
-
-        # Optional pre-evaluation
-        evaluate_condition_groups(bot_id=bot_id, user_id=user_id)
-
-        # Run the trigger logic
-        result = trigger_bot_condition(bot_id, user_id)
-
-        if result:
-            print(f"✅ Bot trigger result: {result}")
-
-            # ✅ Update bot_runs.stage = 'executed'
-            run_id = get_latest_run_id(bot_id)
-            if run_id:
-                update_bot_run_status(run_id, "executed")
-
-                log_bot_event(
-                    run_id=run_id,
-                    bot_id=bot_id,
-                    user_id=user_id,
-                    event_type="entry_executed",
-                    metadata={"source": "webhook_receiver"}
-                )
+        # Incremental AND/OR evaluation; no re-query of the bot's other conditions
+        if condition_graphs.record_trigger(bot_id, condition, now_utc):
+            print(f"🚀 All condition groups satisfied (stage={stage}). Executing bot {bot_id}")
+
+            # Journal the entry first: the condition is already marked triggered,
+            # so a crash past this point can only be recovered by replaying it
+            entry_key = uuid.uuid4().hex
+            offset = await webhook_journal.append_async({
+                "kind": "entry",
+                "bot_id": bot_id,
+                "user_id": user_id,
+                "condition_id": condition_id,
+                "key": entry_key,
+            })
+            try:
+                # Off the event loop: concurrent entries can then be netted and run in parallel
+                await run_in_threadpool(execute_entry, bot_id, user_id, entry_key=entry_key)
+            finally:
+                webhook_journal.commit(offset)
+            entry_fired = True
         else:
-            print(f"⚠️ Bot trigger returned no result")
+            print(f"⏳ Condition {condition_id} recorded, waiting for remaining groups of bot {bot_id}")
     else:
         condition_type = condition.get("type", "setup")
         print(f"⚠️ Condition triggered but ignored due to stage={stage} (expected 'filter' or 'trigger')")
@@ -140,5 +153,82 @@ async def handle_condition_trigger(token: str):
     return {
         "status": "triggered",
         "condition_id": condition_id,
-        "triggered_at": now_utc
+        "triggered_at": now_utc,
+        "entry_fired": entry_fired
     }
+
+
+def execute_entry(bot_id: str, user_id: str, source: str = "webhook_receiver",
+                  run_id: Optional[str] = None, entry_key: Optional[str] = None):
+    # Run the trigger logic; its triggers are spent either way, so a failed
+    # entry needs fresh triggers rather than firing again on the next one
+    try:
+        result = trigger_bot_condition(bot_id, user_id, run_id=run_id, entry_key=entry_key)
+    finally:
+        condition_graphs.reset(bot_id)
+
+    if result and not result.get("error"):
+        print(f"✅ Bot trigger result: {result}")
+
+        # ✅ Update bot_runs.stage = 'executed'
+        run_id = get_latest_run_id(bot_id)
+        if run_id:
+            update_bot_run_status(run_id, "executed")
+
+            log_bot_event(
+                run_id=run_id,
+                bot_id=bot_id,
+                user_id=user_id,
+                event_type="entry_executed",
+                metadata={"source": source}
+            )
+    else:
+        print(f"⚠️ Bot trigger returned no result: {result}")
+    return result
+
+
+def replay_entry(record: dict):
+    """
+    Journal replay of an entry. The process may have died anywhere inside
+    execute_entry, so the entry only runs again when it provably did not
+    place its order: no trade carries the record's key, and the bot's latest
+    run is still waiting, or running without an initial entry trade.
+    """
+    bot_id = record["bot_id"]
+    entry_key = record.get("key")
+    if entry_key:
+        done = supabase.table("bot_trades").select("id").eq("entry_key", entry_key).limit(1).execute()
+        if done.data:
+            print(f"⏭️ Entry {entry_key} for bot {bot_id} already placed its order, skipping replay")
+            return
+
+    run_resp = (
+        supabase.table("bot_runs")
+        .select("run_id, status")
+        .eq("bot_id", bot_id)
+        .order("started_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    run = run_resp.data[0] if run_resp.data else None
+    if run is None or run["status"] not in ("waiting", "running"):
+        print(f"⏭️ No waiting run for bot {bot_id}, skipping entry replay")
+        return
+    if run["status"] == "running":
+        initial = (
+            supabase.table("bot_trades")
+            .select("id")
+            .eq("run_id", run["run_id"])
+            .eq("note", "Initial entry")
+            .limit(1)
+            .execute()
+        )
+        if initial.data:
+            print(f"⏭️ Run {run['run_id']} already has its initial entry, skipping replay")
+            return
+
+    print(f"🔁 Replaying condition entry for bot {bot_id}")
+    execute_entry(bot_id, record["user_id"], source="journal_replay", run_id=run["run_id"], entry_key=entry_key)
+
+
+webhook_journal.register("entry", replay_entry)
@@ -0,0 +1,166 @@
+# app/services/bot_purger.py
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Set, Tuple
+
+from app.supabase_client import supabase
+from app.utils.archive import archive_path, append_rows
+
+# (table, primary key) in delete order; bot_runs last since logs reference run_id
+PURGE_TABLES = [
+    ("bot_logs", "id"),
+    ("bot_trades", "id"),
+    ("bot_run_summaries", "run_id"),
+    ("bot_schedules", "bot_id"),
+    ("bot_plans", "id"),
+    ("bot_runs", "run_id"),
+]
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+PURGE_THROTTLE_SECS = float(os.getenv("PURGE_THROTTLE_SECS", "0.2"))
+PURGE_INTERVAL_SECS = float(os.getenv("PURGE_INTERVAL_SECS", "30"))
+PURGE_MAX_BOTS_PER_PASS = int(os.getenv("PURGE_MAX_BOTS_PER_PASS", "50"))
+PURGE_LEASE_SECS = float(os.getenv("PURGE_LEASE_SECS", "600"))
+
+
+def _utc(ts: float) -> str:
+    # No "+00:00" offset: the value also goes into PostgREST filters
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class BotPurger:
+    """
+    Deletes data of soft-deleted bots in the background.
+    Rows are removed in bounded batches (archived to gzip first), with a pause
+    between batches so purging never competes with the trading path.
+
+    Every worker runs a purger, so a pass first leases its bots through a
+    conditional update of bots.purge_claimed_until; a bot is purged and
+    archived only by the worker whose lease took. The lease is renewed
+    before each table, and a crashed worker's bots are taken over once it lapses.
+    """
+
+    def __init__(self):
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def enqueue(self, bot_id: str):
+        with self._lock:
+            self._pending.add(bot_id)
+        self._wake.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="bot-purger", daemon=True)
+        self._thread.start()
+        print("🧹 Bot purger started")
+
+    def _loop(self):
+        # Resume purges interrupted by a restart
+        self._enqueue_soft_deleted()
+        while True:
+            self._wake.wait(PURGE_INTERVAL_SECS)
+            self._wake.clear()
+            try:
+                self.run_pass()
+            except Exception as e:
+                print(f"❌ Bot purge pass failed: {e}")
+
+    def _enqueue_soft_deleted(self):
+        try:
+            response = (
+                supabase.table("bots")
+                .select("bot_id")
+                .eq("status", "deleted")
+                .execute()
+            )
+            for row in response.data or []:
+                self.enqueue(row["bot_id"])
+        except Exception as e:
+            print(f"❌ Failed to load soft-deleted bots: {e}")
+
+    def _take_batch(self) -> List[str]:
+        with self._lock:
+            bot_ids = list(self._pending)[:PURGE_MAX_BOTS_PER_PASS]
+            self._pending.difference_update(bot_ids)
+            more = bool(self._pending)
+        if more:
+            self._wake.set()
+        return bot_ids
+
+    def _claim(self, bot_ids: List[str], held: Optional[str] = None) -> Tuple[List[str], str]:
+        """
+        Lease soft-deleted bots for this worker: free or lapsed leases, or with
+        `held` only the leases this worker still holds. Returns the bots it
+        now holds and the new lease, which doubles as the renewal token.
+        """
+        now = time.time()
+        lease = _utc(now + PURGE_LEASE_SECS)
+        query = (
+            supabase.table("bots")
+            .update({"purge_claimed_until": lease})
+            .in_("bot_id", bot_ids)
+            .eq("status", "deleted")
+        )
+        if held is not None:
+            query = query.eq("purge_claimed_until", held)
+        else:
+            query = query.or_(f"purge_claimed_until.is.null,purge_claimed_until.lt.{_utc(now)}")
+        return [row["bot_id"] for row in query.execute().data or []], lease
+
+    def run_pass(self):
+        """Purge every table for up to PURGE_MAX_BOTS_PER_PASS bots at once."""
+        bot_ids = self._take_batch()
+        if not bot_ids:
+            return
+        bot_ids, lease = self._claim(bot_ids)
+        if not bot_ids:
+            return
+
+        try:
+            for table, key in PURGE_TABLES:
+                # Bots whose lease lapsed and was taken over are left to their new owner
+                bot_ids, lease = self._claim(bot_ids, held=lease)
+                if not bot_ids:
+                    return
+                purged = self._purge_table(table, key, bot_ids)
+                print(f"🧹 Purged {purged} rows from {table} for {len(bot_ids)} bot(s)")
+
+            self._purge_table("bots", "bot_id", bot_ids, only_deleted=True)
+        except Exception:
+            # Keep the bots queued so the next pass retries them
+            with self._lock:
+                self._pending.update(bot_ids)
+            raise
+
+    def _purge_table(self, table: str, key: str, bot_ids: List[str], only_deleted: bool = False) -> int:
+        path = archive_path("purge", table)
+        total = 0
+
+        while True:
+            query = supabase.table(table).select("*").in_("bot_id", bot_ids)
+            if only_deleted:
+                query = query.eq("status", "deleted")
+            rows = query.limit(PURGE_BATCH_SIZE).execute().data or []
+            if not rows:
+                break
+
+            append_rows(path, rows)
+            ids = [row[key] for row in rows]
+            supabase.table(table).delete().in_(key, ids).execute()
+            total += len(rows)
+
+            if len(rows) < PURGE_BATCH_SIZE:
+                break
+            time.sleep(PURGE_THROTTLE_SECS)
+
+        return total
+
+
+bot_purger = BotPurger()
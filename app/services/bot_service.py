@@ -1,13 +1,19 @@
 # app/services/bot_service.py
 
-from app.supabase_client import supabase
+from app.supabase_client import supabase, read_router
+from app.services.bot_purger import bot_purger
 from fastapi import HTTPException
 from typing import Optional
+from datetime import datetime, timezone
+
+# neq alone also drops rows whose status is NULL (NULL <> 'deleted' is not true)
+NOT_DELETED = "status.is.null,status.neq.deleted"
 
 
 def get_all_bots(limit: int = 20):
     try:
-        response = supabase.table("bots").select("*").limit(limit).execute()
+        db = read_router.client_for("bots.list_all")
+        response = db.table("bots").select("*").or_(NOT_DELETED).limit(limit).execute()
         if response.data:
             return response.data
         else:
@@ -18,7 +24,8 @@ def get_all_bots(limit: int = 20):
 
 def get_user_bots(user_id: str, status: Optional[str] = None):
     try:
-        query = supabase.table("bots").select("*").eq("user_id", user_id)
+        db = read_router.client_for("bots.list_user", user_id=user_id)
+        query = db.table("bots").select("*").eq("user_id", user_id).or_(NOT_DELETED)
         if status:
             query = query.eq("status", status)
         response = query.order("created_at", desc=True).execute()
@@ -30,28 +37,31 @@ def get_user_bots(user_id: str, status: Optional[str] = None):
 def get_bot_by_id(bot_id: str):
     try:
         response = (
-            supabase.table("bots")
+            read_router.client_for("bots.get", bot_id=bot_id)
+            .table("bots")
             .select("*")
             .eq("bot_id", bot_id)
-            .single()
+            .limit(1)
             .execute()
         )
-        if not response.data:
+        if not response.data or response.data[0].get("status") == "deleted":
             raise HTTPException(status_code=404, detail="Bot not found")
-        return response.data
+        return response.data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching bot: {str(e)}")
 
 # app/services/bot_service.py
 
 def delete_bot_completely(bot_id: str):
-    # Step 1: Delete from dependent tables
-    supabase.table("bot_runs").delete().eq("bot_id", bot_id).execute()
-    supabase.table("bot_logs").delete().eq("bot_id", bot_id).execute()
-    supabase.table("bot_trades").delete().eq("bot_id", bot_id).execute()
-
-    # Step 2: Delete from bots
-    supabase.table("bots").delete().eq("bot_id", bot_id).execute()
+    # Step 1: Soft-delete so the bot disappears from reads and can't be started
+    supabase.table("bots").update({
+        "status": "deleted",
+        "deleted_at": datetime.now(timezone.utc).isoformat()
+    }).eq("bot_id", bot_id).execute()
 
-    print(f"🗑️ Deleted bot and all related records for bot_id={bot_id}")
+    # Step 2: Runs, logs, trades and the bot row are purged in the background
+    bot_purger.enqueue(bot_id)
 
+    print(f"🗑️ Marked bot_id={bot_id} as deleted, related records queued for purge")
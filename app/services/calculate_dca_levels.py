@@ -1,66 +1,57 @@
 # calculate_dca_levels.py
 
-def calculate_dca_levels(bot: dict, entry_price: float) -> list:
+from typing import Union
+from app.models.bot_config import BotConfig, DcaCondition
+from app.services.ladder_templates import dca_template
+from app.services.symbol_filters import symbol_filters
+from app.services.kline_store import kline_store
+from app.utils.tracing import traced
+
+
+def volatility_drop_pct(config: BotConfig) -> float:
+    """
+    Rung spacing for the 'volatility' condition: multiplier x ATR% from the local
+    kline store. Until the store has synced enough candles (the sync leader picks
+    up volatility bots by itself) the bot's static last-entry drop % is used.
+    """
+    atr_pct = kline_store.volatility_pct(config.trading_pair, config.volatility_interval, config.volatility_window)
+    if atr_pct is not None:
+        return round(atr_pct * config.volatility_multiplier, 4)
+    if config.last_entry_drop > 0:
+        print(f"⚠️ No {config.volatility_interval} klines for {config.trading_pair} yet, "
+              f"spacing rungs at the static {config.last_entry_drop}%")
+        return config.last_entry_drop
+    raise ValueError(
+        f"Not enough {config.volatility_interval} klines for {config.trading_pair} to compute volatility spacing"
+    )
+
+
+def require_dca_inputs(config: BotConfig):
+    """
+    Raise if calculate_dca_levels would fail for this config. Called before the
+    entry order is placed, so a volatility bot without klines or a static drop
+    is rejected instead of leaving a filled entry without a DCA plan.
+    """
+    if config.dca_steps > 0 and config.dca_condition == DcaCondition.VOLATILITY:
+        volatility_drop_pct(config)
+
+
+@traced()
+def calculate_dca_levels(bot: Union[BotConfig, dict], entry_price: float) -> list:
     """
     Step 3: Calculate DCA trigger prices and amounts based on the selected DCA condition.
+    Accepts a BotConfig or a raw `bots` row.
     Returns a list of dicts with drop %, trigger price, amount, and step.
-    """
-    levels = []
 
-    condition = bot["dca_condition"]
+    The entry-independent part of the ladder (drops, amounts) comes from the
+    shared template cache, so identical configs only pay for scaling by entry_price.
+    Trigger prices are snapped to the symbol's tick size when its filters are known.
+    """
+    config = BotConfig.coerce(bot)
 
     # Determine number of DCA steps
-    max_steps = bot["max_dca_orders"] - bot["dca_orders"]
-    if max_steps <= 0:
+    if config.dca_steps <= 0:
         return []
 
-    progressive = bot.get("progressive_drops", {})
-    progressive_enabled = progressive.get("enabled", False)
-    progressive_multiplier = progressive.get("multiplier", 1)
-
-    # Starting values
-    current_price = entry_price
-    current_amount = bot["initial_amount"]
-
-    for step in range(1, max_steps + 1):
-        if condition == "lossAmount":
-            # Convert loss amount to price drop (approximation)
-            capital = bot["initial_amount"]
-            loss_amount = bot["loss_amount"]
-            total_qty = capital / entry_price
-            trigger_price = entry_price - (loss_amount / total_qty)
-            current_drop_pct = round((entry_price - trigger_price) / entry_price * 100, 2)
-        elif condition == "lastEntry":
-            current_drop_pct = bot["last_entry_drop"]
-            trigger_price = round(current_price * (1 - current_drop_pct / 100), 4)
-        elif condition == "averageEntry":
-            current_drop_pct = bot["average_entry_drop"]
-            trigger_price = round(current_price * (1 - current_drop_pct / 100), 4)
-        elif condition == "lossPercent":
-            current_drop_pct = bot["loss_percentage"]
-            trigger_price = round(current_price * (1 - current_drop_pct / 100), 4)
-        else:
-            raise ValueError("Unsupported DCA condition")
-
-        # Determine amount for this step
-        if bot["dca_amount_mode"] == "fixed":
-            amount = bot["fixed_amount"]
-        elif bot["dca_amount_mode"] == "multiplier":
-            amount = round(current_amount * bot["multiplier"], 2)
-            current_amount = amount  # for next iteration
-        else:
-            raise ValueError("Invalid DCA amount mode")
-
-        levels.append({
-            "step": step,
-            "drop_pct": round(current_drop_pct, 2),
-            "trigger_price": trigger_price,
-            "amount": amount
-        })
-
-        current_price = trigger_price
-
-        if progressive_enabled and condition != "lossAmount":
-            current_drop_pct *= progressive_multiplier
-
-    return levels
+    volatility_drop = volatility_drop_pct(config) if config.dca_condition == DcaCondition.VOLATILITY else None
+    return dca_template(config, volatility_drop).scale(entry_price, symbol_filters.get(config.trading_pair))
@@ -1,9 +1,16 @@
-def calculate_stop_pause_levels(bot: dict, avg_entry: float, last_entry: float) -> dict:
+from typing import Optional, Union
+from app.models.bot_config import BotConfig
+from app.services.symbol_filters import symbol_filters
+from app.utils.tracing import traced
+
+
+@traced()
+def calculate_stop_pause_levels(bot: Union[BotConfig, dict], avg_entry: float, last_entry: float) -> dict:
     """
     Converts stop and pause condition percentages into trigger prices.
 
     Args:
-        bot (dict): The bot configuration containing stop/pause settings.
+        bot (BotConfig | dict): The bot configuration containing stop/pause settings.
         avg_entry (float): Average entry price.
         last_entry (float): Last entry price.
 
@@ -13,29 +20,34 @@ def calculate_stop_pause_levels(bot: dict, avg_entry: float, last_entry: float)
             "pause": [ {type, trigger_price, drop_pct}, ... ]
         }
     """
-    stop_config = bot.get("stop_conditions", {})
-    pause_config = bot.get("pause_conditions", {})
-
-    def calculate_level(config: dict, key: str, base_price: float):
-        if config.get(key, {}).get("enabled"):
-            drop_pct = config[key].get("value")
-            if drop_pct is not None:
-                trigger_price = round(base_price * (1 - drop_pct / 100), 4)
-                return {
-                    "type": key,
-                    "trigger_price": trigger_price,
-                    "drop_pct": drop_pct
-                }
+    config = BotConfig.coerce(bot)
+    filters = symbol_filters.get(config.trading_pair)
+
+    def calculate_level(drop_pct: Optional[float], key: str, base_price: float):
+        if drop_pct is not None:
+            raw_price = base_price * (1 - drop_pct / 100)
+            if filters is not None:
+                trigger_price = float(filters.quantize_prices([raw_price])[0])
+            else:
+                trigger_price = round(raw_price, 4)
+            return {
+                "type": key,
+                "trigger_price": trigger_price,
+                "drop_pct": drop_pct
+            }
         return None
 
+    stop = config.stop_conditions
+    pause = config.pause_conditions
+
     stop_levels = list(filter(None, [
-        calculate_level(stop_config, "priceDropFromLast", last_entry),
-        calculate_level(stop_config, "priceDropFromAvg", avg_entry)
+        calculate_level(stop.price_drop_from_last, "priceDropFromLast", last_entry),
+        calculate_level(stop.price_drop_from_avg, "priceDropFromAvg", avg_entry)
     ]))
 
     pause_levels = list(filter(None, [
-        calculate_level(pause_config, "priceDropFromLast", last_entry),
-        calculate_level(pause_config, "priceDropFromAvg", avg_entry)
+        calculate_level(pause.price_drop_from_last, "priceDropFromLast", last_entry),
+        calculate_level(pause.price_drop_from_avg, "priceDropFromAvg", avg_entry)
     ]))
 
     return {
@@ -0,0 +1,155 @@
+# app/services/capital_calculator.py
+
+import itertools
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from app.models.bot_config import BotConfig, DcaAmountMode, DcaCondition
+from app.services.calculate_dca_levels import volatility_drop_pct
+
+MAX_GRID_SIZE = 10000
+
+_PERCENT_DROP_FIELD = {
+    DcaCondition.LAST_ENTRY: "last_entry_drop",
+    DcaCondition.AVERAGE_ENTRY: "average_entry_drop",
+    DcaCondition.LOSS_PERCENT: "loss_percentage",
+}
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """
+    np.round(values, 2) with Python's round() semantics: np.round scales by 100
+    first, which can flip near-ties (1708.605 -> 1708.60 instead of 1708.61).
+    Only those near-ties fall back to round().
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.nonzero(near_tie)[0]:
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def calculate_ladder_capital(bots: List[Union[BotConfig, dict]], entry_price: Optional[float] = None) -> List[Dict]:
+    """
+    Capital requirement and depth of the full DCA ladder for many configs at once.
+
+    Mirrors calculate_dca_levels (same per-step drops and amount rounding), but
+    works on price ratios relative to the entry, vectorized across configs and
+    iterated only over the step index. For each config returns:
+    - required_capital: initial amount + every DCA amount
+    - worst_avg_entry_ratio: average entry / entry price once every rung has filled
+    - ladder_depth_pct: % below entry of the last rung
+    - worst_avg_entry_price / last_trigger_price when entry_price is given
+    """
+    configs = [BotConfig.coerce(bot) for bot in bots]
+    n = len(configs)
+    if n == 0:
+        return []
+
+    steps = np.array([c.dca_steps for c in configs], dtype=np.int64)
+    initial = np.array([c.initial_amount for c in configs], dtype=np.float64)
+    fixed = np.array([c.fixed_amount for c in configs], dtype=np.float64)
+    multiplier = np.array([c.multiplier for c in configs], dtype=np.float64)
+    is_fixed = np.array([c.dca_amount_mode == DcaAmountMode.FIXED for c in configs])
+    is_multiplier = np.array([c.dca_amount_mode == DcaAmountMode.MULTIPLIER for c in configs])
+    is_loss_amount = np.array([c.dca_condition == DcaCondition.LOSS_AMOUNT for c in configs])
+
+    errors = [None] * n
+    volatility_drops = {}
+
+    def step_drop(i: int, c: BotConfig) -> float:
+        if c.dca_condition in _PERCENT_DROP_FIELD:
+            return getattr(c, _PERCENT_DROP_FIELD[c.dca_condition])
+        if c.dca_condition == DcaCondition.VOLATILITY and c.dca_steps > 0:
+            key = (c.trading_pair, c.volatility_interval, c.volatility_window, c.volatility_multiplier)
+            try:
+                if key not in volatility_drops:
+                    volatility_drops[key] = volatility_drop_pct(c)
+                return volatility_drops[key]
+            except ValueError as e:
+                errors[i] = str(e)
+        return 0.0
+
+    # Per-step price factor (1 - drop/100); lossAmount always triggers at the same price
+    drop = np.array([step_drop(i, c) for i, c in enumerate(configs)], dtype=np.float64)
+    step_factor = 1 - drop / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loss_ratio = np.where(initial > 0, 1 - np.array([c.loss_amount for c in configs]) / initial, np.nan)
+
+    for i, c in enumerate(configs):
+        if c.dca_steps > 0 and errors[i] is None:
+            if c.dca_condition is None:
+                errors[i] = "Unsupported DCA condition"
+            elif c.dca_amount_mode not in (DcaAmountMode.FIXED, DcaAmountMode.MULTIPLIER):
+                errors[i] = "Invalid DCA amount mode"
+
+    dca_capital = np.zeros(n)
+    quantity_ratio = initial.copy()  # quantity * entry_price; the initial buy fills at ratio 1
+    price_ratio = np.ones(n)
+    current_amount = initial.copy()
+
+    for k in range(1, int(steps.max(initial=0)) + 1):
+        active = steps >= k
+        price_ratio = np.where(active, np.where(is_loss_amount, loss_ratio, price_ratio * step_factor), price_ratio)
+
+        next_multiplied = _round2(current_amount * multiplier)
+        amount = np.where(is_fixed, fixed, np.where(is_multiplier, next_multiplied, np.nan))
+        current_amount = np.where(active & is_multiplier, next_multiplied, current_amount)
+
+        amount = np.where(active, amount, 0.0)
+        dca_capital += amount
+        with np.errstate(divide="ignore", invalid="ignore"):
+            quantity_ratio += np.where(active, amount / price_ratio, 0.0)
+
+    required = initial + dca_capital
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_ratio = required / quantity_ratio
+
+    results = []
+    for i, c in enumerate(configs):
+        result = {
+            "bot_id": c.bot_id or None,
+            "steps": int(steps[i]),
+            "required_capital": None if errors[i] else round(float(required[i]), 2),
+            "dca_capital": None if errors[i] else round(float(dca_capital[i]), 2),
+            "worst_avg_entry_ratio": None if errors[i] else round(float(avg_ratio[i]), 6),
+            "ladder_depth_pct": None if errors[i] else round(float((1 - price_ratio[i]) * 100), 4),
+            "error": errors[i],
+        }
+        if entry_price and not errors[i]:
+            result["worst_avg_entry_price"] = round(float(avg_ratio[i] * entry_price), 4)
+            result["last_trigger_price"] = round(float(price_ratio[i] * entry_price), 4)
+        results.append(result)
+
+    return results
+
+
+def required_capital(bot: Union[BotConfig, dict]) -> Optional[float]:
+    """Server-side required capital for a single bot (None if its DCA config is invalid)."""
+    return calculate_ladder_capital([bot])[0]["required_capital"]
+
+
+def expand_grid(base: dict, grid: Dict[str, list]) -> List[dict]:
+    """
+    Cartesian product of `grid` values applied over a base bots row, e.g.
+    {"multiplier": [1.2, 1.5], "max_dca_orders": [5, 10]} -> 4 configs.
+    Nested fields can be set with dots: {"progressive_drops.multiplier": [...]}.
+    """
+    keys = list(grid.keys())
+    combos = list(itertools.product(*(grid[k] for k in keys)))
+    if len(combos) > MAX_GRID_SIZE:
+        raise ValueError(f"Grid too large: {len(combos)} configs (max {MAX_GRID_SIZE})")
+
+    rows = []
+    for values in combos:
+        row = dict(base)
+        for key, value in zip(keys, values):
+            if "." in key:
+                parent, child = key.split(".", 1)
+                row[parent] = {**(row.get(parent) or {}), child: value}
+            else:
+                row[key] = value
+        rows.append(row)
+    return rows
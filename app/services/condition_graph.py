@@ -0,0 +1,202 @@
+# app/services/condition_graph.py
+
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.services.evaluator import STATUS_TRIGGERED, get_active_bot_conditions
+
+CONDITION_GRAPH_TTL_SECS = float(os.getenv("CONDITION_GRAPH_TTL_SECS", "300"))
+# A trigger without its own validity window counts for this long (as in webhook_receiver)
+DEFAULT_VALIDITY_SECS = 300.0
+
+
+def condition_key(condition: Dict[str, Any]) -> str:
+    return str(condition.get("condition_id") or condition.get("id"))
+
+
+def validity_secs(condition: Dict[str, Any]) -> float:
+    value = condition.get("valid_for_secs") or condition.get("validity_secs")
+    return float(value) if value else DEFAULT_VALIDITY_SECS
+
+
+def parse_ts(value: str) -> float:
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class GroupState:
+    __slots__ = ("operator", "total", "triggered")
+
+    def __init__(self, operator: str):
+        self.operator = operator
+        self.total = 0
+        self.triggered = 0
+
+    @property
+    def satisfied(self) -> bool:
+        if self.operator == "or":
+            return self.triggered > 0
+        return self.total > 0 and self.triggered == self.total
+
+
+class ConditionGraph:
+    """
+    Condition groups of one bot. Each group keeps a triggered/total counter and
+    the graph counts satisfied groups, so a trigger or expiry is O(1)
+    (plus O(log n) to schedule its expiry) instead of re-deriving every group.
+    Stored triggers at or before `reset_at` were consumed by an entry and are ignored.
+    """
+
+    def __init__(self, bot_id: str, conditions: List[Dict[str, Any]], reset_at: float = 0.0):
+        self.bot_id = bot_id
+        self.loaded_at = time.monotonic()
+        self.groups: Dict[Any, GroupState] = {}
+        # key -> [group_num, triggered, expires_at]
+        self.conditions: Dict[str, list] = {}
+        self.satisfied_groups = 0
+        self._expiries: list = []  # heap of (expires_at, key)
+
+        for condition in conditions:
+            group_num = condition.get("group_num")
+            group = self.groups.get(group_num)
+            if group is None:
+                group = GroupState((condition.get("logic_operator") or "and").lower())
+                self.groups[group_num] = group
+            group.total += 1
+            self.conditions[condition_key(condition)] = [group_num, False, None]
+
+        for group in self.groups.values():
+            if group.satisfied:
+                self.satisfied_groups += 1
+
+        now = time.time()
+        for condition in conditions:
+            if condition.get("status") == STATUS_TRIGGERED and condition.get("triggered_at"):
+                triggered_at = parse_ts(condition["triggered_at"])
+                if triggered_at > reset_at:
+                    self.trigger(condition_key(condition), self._expires_at(condition, triggered_at), now)
+
+    @staticmethod
+    def _expires_at(condition: Dict[str, Any], triggered_at: float) -> float:
+        return triggered_at + validity_secs(condition)
+
+    @property
+    def satisfied(self) -> bool:
+        return bool(self.groups) and self.satisfied_groups == len(self.groups)
+
+    def _set(self, key: str, triggered: bool, expires_at: Optional[float] = None):
+        state = self.conditions.get(key)
+        if state is None:
+            return
+        group = self.groups[state[0]]
+        state[2] = expires_at
+        if state[1] == triggered:
+            return
+
+        was_satisfied = group.satisfied
+        state[1] = triggered
+        group.triggered += 1 if triggered else -1
+        if group.satisfied != was_satisfied:
+            self.satisfied_groups += 1 if group.satisfied else -1
+
+    def trigger(self, key: str, expires_at: Optional[float] = None, now: Optional[float] = None) -> bool:
+        """Mark a condition triggered. Returns True if this made the whole graph true."""
+        now = now or time.time()
+        self.expire_due(now)
+        was_satisfied = self.satisfied
+
+        if expires_at is not None and expires_at <= now:
+            return False
+        self._set(key, True, expires_at)
+        if expires_at is not None:
+            heapq.heappush(self._expiries, (expires_at, key))
+
+        return self.satisfied and not was_satisfied
+
+    def expire(self, key: str):
+        self._set(key, False)
+
+    def expire_due(self, now: Optional[float] = None):
+        """Expire triggered conditions whose validity window has passed."""
+        now = now or time.time()
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            state = self.conditions.get(key)
+            # Skip stale heap entries left behind by a re-trigger
+            if state and state[1] and state[2] == expires_at:
+                self.expire(key)
+
+
+class ConditionGraphRegistry:
+    """Graphs per bot, loaded once and kept current by trigger events."""
+
+    def __init__(self, ttl_secs: float = CONDITION_GRAPH_TTL_SECS):
+        self.ttl_secs = ttl_secs
+        self._graphs: Dict[str, ConditionGraph] = {}
+        self._reset_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, bot_id: str) -> ConditionGraph:
+        with self._lock:
+            reset_at = self._reset_at.get(bot_id, 0.0)
+        graph = ConditionGraph(bot_id, get_active_bot_conditions(bot_id=bot_id), reset_at)
+        with self._lock:
+            self._graphs[bot_id] = graph
+        return graph
+
+    def _cached(self, bot_id: str) -> Optional[ConditionGraph]:
+        graph = self._graphs.get(bot_id)
+        # Reload periodically so conditions added or removed by the user are picked up
+        if graph and time.monotonic() - graph.loaded_at < self.ttl_secs:
+            return graph
+        return None
+
+    def get(self, bot_id: str) -> ConditionGraph:
+        with self._lock:
+            graph = self._cached(bot_id)
+        return graph or self._load(bot_id)
+
+    def invalidate(self, bot_id: str):
+        with self._lock:
+            self._graphs.pop(bot_id, None)
+
+    def reset(self, bot_id: str):
+        """
+        Consume the bot's current triggers once its entry ran: every group has
+        to be satisfied again by new triggers before the next entry fires.
+        """
+        with self._lock:
+            self._reset_at[bot_id] = time.time()
+            self._graphs.pop(bot_id, None)
+
+    def record_trigger(self, bot_id: str, condition: Dict[str, Any], triggered_at: Optional[str] = None) -> bool:
+        """
+        Apply one condition trigger (already stored in bot_conditions) to the bot's graph.
+        Returns True only when this trigger turns the graph from unsatisfied to
+        satisfied, whether or not the graph was cached.
+        """
+        key = condition_key(condition)
+        with self._lock:
+            graph = self._cached(bot_id)
+            if graph is not None and key in graph.conditions:
+                at = parse_ts(triggered_at) if triggered_at else time.time()
+                return graph.trigger(key, graph._expires_at(condition, at))
+
+        # Not cached (or condition is new): the loaded graph already includes this
+        # trigger, so take it back out and re-apply it to see the transition
+        graph = self._load(bot_id)
+        with self._lock:
+            if key not in graph.conditions:
+                return False
+            graph.expire(key)
+            at = parse_ts(triggered_at) if triggered_at else time.time()
+            return graph.trigger(key, graph._expires_at(condition, at))
+
+
+condition_graphs = ConditionGraphRegistry()
@@ -0,0 +1,326 @@
+# app/services/dca_scheduler.py
+
+import heapq
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.supabase_client import supabase
+from app.services.order_reconciler import order_reconciler
+from app.services import portfolio
+
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "8"))
+SCHEDULER_CLAIM_LIMIT = int(os.getenv("SCHEDULER_CLAIM_LIMIT", "500"))
+SCHEDULER_LEASE_SECS = int(os.getenv("SCHEDULER_LEASE_SECS", "300"))
+SCHEDULER_SYNC_SECS = float(os.getenv("SCHEDULER_SYNC_SECS", "60"))
+SCHEDULER_PAGE = int(os.getenv("SCHEDULER_PAGE", "1000"))
+MIN_INTERVAL_SECS = 60
+
+# Bots in these states keep their schedule but skip the buy
+SKIP_BOT_STATUSES = ("deleted", "paused")
+
+Group = Tuple[str, str, str]  # (user_id, exchange, symbol)
+
+
+def _ts(value: str) -> float:
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def next_fire(slot: float, interval_secs: int, now: float) -> float:
+    """First slot after `now` on the schedule's grid; slots missed while down collapse into the one being fired."""
+    if slot > now:
+        return slot
+    return slot + interval_secs * (int((now - slot) // interval_secs) + 1)
+
+
+class DcaScheduler:
+    """
+    Fires recurring buys ("$50 of BTCUSDT every 86400s").
+
+    Next fire times of all active schedules live in a heap, so the loop sleeps
+    until the earliest one (or a schedule change) instead of polling. Due rows
+    are leased through claim_bot_schedules, so several workers never fire the
+    same schedule, and each slot reserves a bot_trades row keyed by
+    (bot_id, schedule_slot) before the order goes out, so a retried lease
+    does not buy a slot that was already bought. Reservations are leased too:
+    one still "pending" without an order_id after SCHEDULER_LEASE_SECS (its
+    worker crashed) is reserved again, so the slot is retried, not skipped.
+    The one double-buy left is a crash after the exchange accepted the order
+    but before the row recorded it. Claimed buys are grouped by account and
+    symbol: one client and one price lookup per group, groups run on a bounded
+    pool. The heap is kept in sync with bot_schedules by polling updated_at.
+    """
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._heap: List[Tuple[float, str]] = []
+        self._due: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dca-schedule")
+        self._cursor: Optional[str] = None
+        self._thread = None
+
+    # --- Schedule management ---------------------------------------------
+
+    def set_schedule(self, bot_id: str, user_id: str, exchange: str, symbol: str, amount: float,
+                     interval_secs: int, start_at: Optional[str] = None) -> dict:
+        if amount <= 0:
+            raise ValueError("Schedule amount must be positive")
+        if interval_secs < MIN_INTERVAL_SECS:
+            raise ValueError(f"Schedule interval must be at least {MIN_INTERVAL_SECS} seconds")
+
+        now = time.time()
+        first = _ts(start_at) if start_at else now
+        # A start time in the past only anchors the grid (e.g. "daily at 09:00")
+        fire_at = next_fire(first, interval_secs, now) if start_at and first < now else first
+        row = {
+            "bot_id": bot_id,
+            "user_id": user_id,
+            "exchange": exchange,
+            "symbol": symbol,
+            "amount": amount,
+            "interval_secs": interval_secs,
+            "next_fire_at": _iso(fire_at),
+            "status": "active",
+            "last_error": None,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        response = supabase.table("bot_schedules").upsert(row, on_conflict="bot_id").execute()
+        self.track(bot_id, _ts(row["next_fire_at"]))
+        return response.data[0] if response.data else row
+
+    def remove_schedule(self, bot_id: str):
+        supabase.table("bot_schedules").delete().eq("bot_id", bot_id).execute()
+        self.untrack(bot_id)
+
+    def track(self, bot_id: str, fire_at: float):
+        with self._lock:
+            self._due[bot_id] = fire_at
+            heapq.heappush(self._heap, (fire_at, bot_id))
+            earliest = self._heap[0][0] == fire_at
+        if earliest:
+            self._wake.set()
+
+    def untrack(self, bot_id: str):
+        # The heap entry goes stale and is dropped when it reaches the top
+        with self._lock:
+            self._due.pop(bot_id, None)
+
+    def sync(self) -> int:
+        """Apply schedule rows changed since the last sync (all rows on the first call)."""
+        seen = 0
+        offset = 0
+        cursor = self._cursor
+        while True:
+            query = supabase.table("bot_schedules").select("bot_id, status, next_fire_at, updated_at")
+            if self._cursor:
+                query = query.gte("updated_at", self._cursor)
+            page = query.order("updated_at").range(offset, offset + SCHEDULER_PAGE - 1).execute().data or []
+            for row in page:
+                if row["status"] == "active":
+                    self.track(row["bot_id"], _ts(row["next_fire_at"]))
+                else:
+                    self.untrack(row["bot_id"])
+                cursor = row["updated_at"]
+            seen += len(page)
+            if len(page) < SCHEDULER_PAGE:
+                break
+            offset += SCHEDULER_PAGE
+        self._cursor = cursor
+        return seen
+
+    def next_wake(self) -> Optional[float]:
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    # --- Firing ----------------------------------------------------------
+
+    def _pop_due(self, now: float) -> int:
+        popped = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, bot_id = heapq.heappop(self._heap)
+                if self._due.get(bot_id) == fire_at:
+                    del self._due[bot_id]
+                    popped += 1
+        return popped
+
+    def fire_due(self, now: Optional[float] = None) -> int:
+        """Claim every due schedule, run the buys and advance the schedules. Returns buys placed."""
+        now = now or time.time()
+        self._pop_due(now)
+
+        placed = 0
+        while True:
+            claimed = supabase.rpc("claim_bot_schedules", {
+                "p_worker": self.worker_id,
+                "p_until": _iso(now),
+                "p_lease_secs": SCHEDULER_LEASE_SECS,
+                "p_limit": SCHEDULER_CLAIM_LIMIT,
+            }).execute().data or []
+            if not claimed:
+                break
+
+            statuses = self._bot_statuses([row["bot_id"] for row in claimed])
+            groups: Dict[Group, List[dict]] = {}
+            for row in claimed:
+                groups.setdefault((row["user_id"], row["exchange"], row["symbol"]), []).append(row)
+
+            completions = []
+            for done, group_placed in self._pool.map(lambda g: self._run_group(g[0], g[1], statuses, now),
+                                                     groups.items()):
+                completions.extend(done)
+                placed += group_placed
+
+            supabase.rpc("complete_bot_schedules", {"p_worker": self.worker_id, "p_rows": completions}).execute()
+            for done in completions:
+                self.track(done["bot_id"], _ts(done["next_fire_at"]))
+
+            print(f"⏰ Fired {len(claimed)} schedule(s) in {len(groups)} group(s)")
+            if len(claimed) < SCHEDULER_CLAIM_LIMIT:
+                break
+        return placed
+
+    def _bot_statuses(self, bot_ids: List[str]) -> Dict[str, str]:
+        response = supabase.table("bots").select("bot_id, status").in_("bot_id", bot_ids).execute()
+        return {row["bot_id"]: row["status"] for row in response.data or []}
+
+    def _run_group(self, group: Group, rows: List[dict], statuses: Dict[str, str], now: float) -> Tuple[list, int]:
+        user_id, exchange, symbol = group
+        completions = {
+            row["bot_id"]: {
+                "bot_id": row["bot_id"],
+                "next_fire_at": _iso(next_fire(_ts(row["next_fire_at"]), row["interval_secs"], now)),
+                "last_fired_at": None,
+                "fired": 0,
+                "last_error": None,
+            }
+            for row in rows
+        }
+        live = [row for row in rows if statuses.get(row["bot_id"], "deleted") not in SKIP_BOT_STATUSES]
+        if not live:
+            return list(completions.values()), 0
+
+        try:
+            client = order_reconciler.client_for((user_id, exchange))
+            price = client.get_live_price(symbol)
+            lease_until = _iso(time.time() + SCHEDULER_LEASE_SECS)
+            # Reserve each slot first; rows that already exist were bought by an earlier lease
+            pending = [{
+                "bot_id": row["bot_id"],
+                "symbol": symbol,
+                "price": round(price, 4),
+                "amount": round(float(row["amount"]), 4),
+                "quantity": round(float(row["amount"]) / price, 6),
+                "drop_pct": 0,
+                "step": 0,
+                "note": "Scheduled buy",
+                "order_status": "pending",
+                "schedule_slot": row["next_fire_at"],
+                "reserved_until": lease_until,
+                "created_at": datetime.utcnow().isoformat(),
+            } for row in live]
+            reserved = supabase.table("bot_trades").upsert(
+                pending, on_conflict="bot_id,schedule_slot", ignore_duplicates=True
+            ).execute().data or []
+            taken = {trade["bot_id"] for trade in reserved}
+            reserved += self._reclaim_stale([row for row in live if row["bot_id"] not in taken], lease_until)
+        except Exception as e:
+            print(f"❌ Scheduled buys failed for {user_id}/{exchange} {symbol}: {e}")
+            for row in live:
+                completions[row["bot_id"]]["last_error"] = str(e)
+            return list(completions.values()), 0
+
+        amounts = {row["bot_id"]: float(row["amount"]) for row in live}
+        placed = 0
+        for trade in reserved:
+            bot_id = trade["bot_id"]
+            done = completions[bot_id]
+            done["last_fired_at"] = trade["schedule_slot"]
+            done["fired"] = 1
+            try:
+                order = client.place_market_order(symbol=symbol, amount=amounts[bot_id], side="buy")
+                fill_price = float(order["price"])
+                quantity = float(order.get("filled_quantity") or float(order["amount"]) / fill_price)
+                supabase.table("bot_trades").update({
+                    "price": round(fill_price, 4),
+                    "quantity": round(quantity, 6),
+                    "order_id": order.get("order_id"),
+                    "order_status": "filled",
+                    "filled_quantity": round(quantity, 6),
+                    "avg_fill_price": fill_price,
+                }).eq("id", trade["id"]).execute()
+                portfolio.apply_fill(user_id, symbol, "buy", fill_price, quantity)
+                placed += 1
+            except Exception as e:
+                print(f"❌ Scheduled buy failed for bot_id={bot_id}: {e}")
+                done["last_error"] = str(e)
+                supabase.table("bot_trades").update({"order_status": "failed"}).eq("id", trade["id"]).execute()
+        return list(completions.values()), placed
+
+    def _reclaim_stale(self, rows: List[dict], lease_until: str) -> List[dict]:
+        """Take over reservations whose lease lapsed before an order was recorded."""
+        if not rows:
+            return []
+        expired_before = _iso(time.time())
+        reclaimed = []
+        for row in rows:
+            reclaimed += (
+                supabase.table("bot_trades")
+                .update({"reserved_until": lease_until})
+                .eq("bot_id", row["bot_id"])
+                .eq("schedule_slot", row["next_fire_at"])
+                .eq("order_status", "pending")
+                .is_("order_id", "null")
+                .lt("reserved_until", expired_before)
+                .execute().data or []
+            )
+        for trade in reclaimed:
+            print(f"♻️ Re-reserving stale slot {trade['schedule_slot']} of bot_id={trade['bot_id']}")
+        return reclaimed
+
+    # --- Loop ------------------------------------------------------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="dca-scheduler", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        next_sync = 0.0
+        while True:
+            try:
+                now = time.time()
+                if now >= next_sync:
+                    self.sync()
+                    # Also picks up rows whose lease expired on a crashed worker
+                    self.fire_due()
+                    next_sync = now + SCHEDULER_SYNC_SECS
+                wake_at = self.next_wake()
+                timeout = min(wake_at if wake_at is not None else next_sync, next_sync) - time.time()
+                if timeout > 0:
+                    self._wake.wait(timeout)
+                    self._wake.clear()
+                    continue
+                self.fire_due()
+            except Exception as e:
+                print(f"❌ DCA scheduler pass failed: {e}")
+                # Entries popped for a failed pass come back with a full resync
+                self._cursor = None
+                next_sync = 0.0
+                time.sleep(5)
+
+
+dca_scheduler = DcaScheduler()
@@ -3,6 +3,9 @@
 import random
 from datetime import datetime
 from binance.client import Client as BinanceClient
+from app.services.symbol_filters import symbol_filters
+from app.services.paper_exchange import PaperExchangeClient
+from app.utils.tracing import TracedClient
 
 
 class BinanceExchangeClient:
@@ -19,10 +22,15 @@ class BinanceExchangeClient:
     def place_market_order(self, symbol: str, amount: float, side: str = "buy") -> dict:
         """
         Place a market order using amount (in quote currency, e.g. USDT).
-        Quantity is calculated using live price.
+        Quantity is calculated using live price and rounded down to the symbol's step size.
         """
         price = self.get_live_price(symbol)
-        quantity = round(amount / price, 6)
+        filters = symbol_filters.get(symbol)
+        if filters is not None:
+            quantity = float(filters.quantities_for([amount], [price])[0])
+            filters.check_order(price, quantity)
+        else:
+            quantity = round(amount / price, 6)
 
         order_id = f"mock-order-{random.randint(100, 999)}"
         print(f"[LIVE ORDER] Market {side} order for {amount} USDT of {symbol} at price {price}")
@@ -41,8 +49,15 @@ class BinanceExchangeClient:
     def place_limit_order(self, symbol: str, amount: float, price: float, side: str = "buy") -> dict:
         """
         Place a limit order using amount and price.
+        Price is snapped to the tick size and quantity to the step size.
         """
-        quantity = round(amount / price, 6)
+        filters = symbol_filters.get(symbol)
+        if filters is not None:
+            price = float(filters.quantize_prices([price])[0])
+            quantity = float(filters.quantities_for([amount], [price])[0])
+            filters.check_order(price, quantity)
+        else:
+            quantity = round(amount / price, 6)
 
         order_id = f"mock-limit-{random.randint(100, 999)}"
         print(f"[LIVE ORDER] Limit {side} order for {amount} USDT of {symbol} at price {price}")
@@ -56,6 +71,32 @@ class BinanceExchangeClient:
             "timestamp": datetime.utcnow().isoformat()
         }
 
+    def get_open_orders(self, symbol: str = None) -> list:
+        """
+        All open orders of the account, or of one symbol.
+        Without a symbol this is a single (heavier) request covering every symbol.
+        """
+        if symbol:
+            return self.client.get_open_orders(symbol=symbol)
+        return self.client.get_open_orders()
+
+    def get_my_trades(self, symbol: str, from_id: int = None, start_time: int = None, limit: int = 1000) -> list:
+        """
+        Account trades for a symbol, oldest first, from a trade id or a start time (ms).
+        """
+        params = {"symbol": symbol, "limit": limit}
+        if from_id is not None:
+            params["fromId"] = from_id
+        elif start_time is not None:
+            params["startTime"] = start_time
+        return self.client.get_my_trades(**params)
+
+    def get_order(self, symbol: str, order_id) -> dict:
+        """
+        Current state of one order (used for orders no longer open).
+        """
+        return self.client.get_order(symbol=symbol, orderId=order_id)
+
     def get_mock_balance(self) -> dict:
         """
         Return a mock balance. In production, replace with real API call.
@@ -73,7 +114,11 @@ def get_exchange_client(exchange: str, api_key: str, api_secret: str):
             raise ValueError("Missing API key or secret.")
 
         if exchange.lower() == "binance":
-            return BinanceExchangeClient(api_key, api_secret)
+            return TracedClient(BinanceExchangeClient(api_key, api_secret), "binance")
+
+        if exchange.lower() == "paper":
+            # Simulated account keyed by the stored API key; no network involved
+            return TracedClient(PaperExchangeClient(api_key, api_secret), "paper")
 
         raise ValueError(f"Unsupported exchange: {exchange}")
     except Exception as e:
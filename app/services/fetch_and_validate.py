@@ -2,7 +2,9 @@ from app.supabase_client import supabase
 from app.utils.crypto import decrypt
 from app.services.supabase_queries import get_user_exchange_keys
 from fastapi import HTTPException
+from app.utils.tracing import traced
 
+@traced()
 def fetch_and_validate_bot(bot_id: str, user_id: str, allow_running: bool = False) -> tuple:
     """
     Fetch bot config, validate status, and fetch/decrypt exchange keys.
@@ -20,7 +22,7 @@ def fetch_and_validate_bot(bot_id: str, user_id: str, allow_running: bool = Fals
         .execute()
     )
 
-    if not response.data:
+    if not response.data or response.data[0].get("status") == "deleted":
         raise HTTPException(status_code=404, detail="Bot not found or access denied")
 
     bot = response.data[0]
@@ -0,0 +1,199 @@
+# app/services/kline_store.py
+
+import fcntl
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from binance.client import Client as BinanceClient
+
+from app.supabase_client import supabase
+
+KLINE_DIR = os.getenv("KLINE_DIR", "data/klines")
+KLINE_SYNC_SECS = float(os.getenv("KLINE_SYNC_SECS", "60"))
+KLINE_SYNC_LIMIT = int(os.getenv("KLINE_SYNC_LIMIT", "1000"))
+# Comma-separated SYMBOL:interval pairs to keep synced from startup, e.g. "BTCUSDT:1h,ETHUSDT:1h"
+KLINE_PRELOAD = os.getenv("KLINE_PRELOAD", "")
+
+_SYMBOL_CHARS = re.compile(r"[^A-Z0-9]+")
+_INTERVAL_CHARS = re.compile(r"[^A-Za-z0-9]+")
+
+CANDLE_DTYPE = np.dtype([
+    ("open_time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+
+class KlineStore:
+    """
+    Append-only columnar candle files, one per (symbol, interval), read through
+    np.memmap. Every worker maps the same file, so the page cache is shared and
+    reads are zero-copy; maps are refreshed only when the file has grown.
+    """
+
+    def __init__(self, root: str = KLINE_DIR):
+        self.root = root
+        self._maps: Dict[Tuple[str, str], Tuple[int, np.ndarray]] = {}
+        self._marked = set()
+        self._thread = None
+
+    @staticmethod
+    def symbol_slug(symbol: str) -> str:
+        """'btc/usdt' -> 'BTCUSDT': the exchange symbol, safe to use as a file name."""
+        return _SYMBOL_CHARS.sub("", (symbol or "").upper())
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, f"{self.symbol_slug(symbol)}_{_INTERVAL_CHARS.sub('', interval)}.bin")
+
+    def candles(self, symbol: str, interval: str) -> np.ndarray:
+        """All stored candles, oldest first (read-only memmap view)."""
+        path = self.path(symbol, interval)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        size -= size % CANDLE_DTYPE.itemsize  # ignore a record still being written
+        key = (self.symbol_slug(symbol), interval)
+        cached = self._maps.get(key)
+        if cached and cached[0] == size:
+            return cached[1]
+        if size == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        view = np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(size // CANDLE_DTYPE.itemsize,))
+        self._maps[key] = (size, view)
+        return view
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        candles = self.candles(symbol, interval)
+        return int(candles["open_time"][-1]) if len(candles) else None
+
+    def append(self, symbol: str, interval: str, rows: list) -> int:
+        """
+        Append candles newer than the last stored one.
+        `rows` uses the Binance kline layout: [open_time, open, high, low, close, volume, ...].
+        """
+        if not rows:
+            return 0
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(symbol, interval)
+
+        with open(path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                last = self.last_open_time(symbol, interval)
+                records = np.array(
+                    [tuple([int(r[0])] + [float(v) for v in r[1:6]]) for r in rows
+                     if last is None or int(r[0]) > last],
+                    dtype=CANDLE_DTYPE,
+                )
+                if len(records):
+                    f.write(records.tobytes())
+                    f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return len(records)
+
+    def volatility_pct(self, symbol: str, interval: str, window: int = 14) -> Optional[float]:
+        """Average true range over the last `window` candles, as % of the last close."""
+        candles = self.candles(symbol, interval)
+        if len(candles) < window + 1:
+            return None
+
+        recent = candles[-(window + 1):]
+        high = recent["high"][1:]
+        low = recent["low"][1:]
+        prev_close = recent["close"][:-1]
+        true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+        last_close = float(recent["close"][-1])
+        if last_close <= 0:
+            return None
+        return float(true_range.mean() / last_close * 100)
+
+    # --- Background sync -------------------------------------------------
+
+    def track(self, symbol: str, interval: str):
+        """Keep a pair synced. An empty file marks it for whichever worker is syncing."""
+        key = (self.symbol_slug(symbol), interval)
+        if key in self._marked:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        open(self.path(symbol, interval), "ab").close()
+        self._marked.add(key)
+
+    def tracked(self) -> list:
+        """Pairs with a file here plus the pairs volatility bots need, so bots never mark pairs themselves."""
+        pairs = set()
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name.endswith(".bin"):
+                    symbol, _, interval = name[:-4].partition("_")
+                    pairs.add((symbol, interval))
+        try:
+            response = (
+                supabase.table("bots")
+                .select("trading_pair, volatility_interval")
+                .eq("dca_condition", "volatility")
+                .or_("status.is.null,status.neq.deleted")
+                .execute()
+            )
+            for row in response.data or []:
+                if self.symbol_slug(row.get("trading_pair")):
+                    pairs.add((self.symbol_slug(row["trading_pair"]), row.get("volatility_interval") or "1h"))
+        except Exception as e:
+            print(f"❌ Failed to load volatility bots for kline sync: {e}")
+        return sorted(pairs)
+
+    def sync(self, client, symbol: str, interval: str) -> int:
+        """Fetch only candles after the last stored open time; the still-open candle is skipped."""
+        last = self.last_open_time(symbol, interval)
+        params = {"symbol": self.symbol_slug(symbol), "interval": interval, "limit": KLINE_SYNC_LIMIT}
+        if last is not None:
+            params["startTime"] = last + 1
+        rows = client.get_klines(**params)
+        now_ms = int(time.time() * 1000)
+        closed = [r for r in rows if int(r[6]) < now_ms]
+        return self.append(symbol, interval, closed)
+
+    def start(self):
+        for pair in filter(None, KLINE_PRELOAD.split(",")):
+            symbol, _, interval = pair.partition(":")
+            self.track(symbol.strip(), interval.strip() or "1h")
+
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="kline-sync", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        # Only one worker per host syncs; the others just read the shared files
+        os.makedirs(self.root, exist_ok=True)
+        leader = open(os.path.join(self.root, ".sync.lock"), "w")
+        while True:
+            try:
+                fcntl.flock(leader, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(KLINE_SYNC_SECS)
+
+        client = BinanceClient()  # public market data, no keys needed
+        print("🕯️ Kline sync started")
+
+        while True:
+            for symbol, interval in self.tracked():
+                try:
+                    self.sync(client, symbol, interval)
+                except Exception as e:
+                    print(f"❌ Kline sync failed for {symbol} {interval}: {e}")
+            time.sleep(KLINE_SYNC_SECS)
+
+
+kline_store = KlineStore()
@@ -0,0 +1,194 @@
+# app/services/ladder_templates.py
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.models.bot_config import BotConfig, DcaAmountMode, DcaCondition
+
+LADDER_TEMPLATE_CACHE_SIZE = int(os.getenv("LADDER_TEMPLATE_CACHE_SIZE", "4096"))
+
+_PERCENT_DROP_FIELD = {
+    DcaCondition.LAST_ENTRY: "last_entry_drop",
+    DcaCondition.AVERAGE_ENTRY: "average_entry_drop",
+    DcaCondition.LOSS_PERCENT: "loss_percentage",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class DcaTemplate:
+    """
+    Entry-price-independent part of a DCA ladder: per-step drop and amounts.
+    scale() turns it into levels for a concrete entry price.
+    """
+    drop_pct: float                 # per-step drop; unused for lossAmount
+    amounts: Tuple[float, ...]
+    loss_amount: Optional[float] = None  # set for lossAmount ladders
+    initial_amount: float = 0.0
+
+    def scale(self, entry_price: float, filters=None) -> list:
+        """
+        Levels for a concrete entry price. With the symbol's exchange filters
+        the whole ladder is snapped in one pass: prices to the tick size,
+        quantities down to the step size, and rungs below the minimum quantity
+        or notional are dropped (the exchange would reject them). Without
+        filters prices keep the legacy 4-decimal rounding.
+        """
+        if self.loss_amount is not None:
+            # Convert loss amount to price drop (approximation); every rung triggers at the same price
+            total_qty = self.initial_amount / entry_price
+            trigger_price = entry_price - (self.loss_amount / total_qty)
+            drop_pct = round(round((entry_price - trigger_price) / entry_price * 100, 2), 2)
+            if filters is not None:
+                trigger_price = float(filters.quantize_prices([trigger_price])[0])
+            return _rungs([trigger_price] * len(self.amounts), self.amounts, drop_pct, filters)
+
+        factor = 1 - self.drop_pct / 100
+        drop_pct = round(self.drop_pct, 2)
+
+        if filters is not None:
+            prices = filters.quantize_prices(entry_price * np.cumprod(np.full(len(self.amounts), factor))).tolist()
+            return _rungs(prices, self.amounts, drop_pct, filters)
+
+        # Each rung is rounded before the next is derived from it, as planned rungs always were
+        prices = []
+        price = entry_price
+        for _ in self.amounts:
+            price = round(price * factor, 4)
+            prices.append(price)
+        return _rungs(prices, self.amounts, drop_pct)
+
+
+def _rungs(prices: list, amounts: Tuple[float, ...], drop_pct: float, filters=None) -> list:
+    """DCA levels with their order quantity; with filters, rungs the exchange would reject are left out."""
+    if filters is None:
+        quantities = [round(amount / price, 6) if price > 0 else 0.0 for price, amount in zip(prices, amounts)]
+        keep = [True] * len(prices)
+    else:
+        quantities = filters.quantities_for(amounts, prices)
+        keep = filters.valid(prices, quantities).tolist()
+        quantities = quantities.tolist()
+
+    levels = []
+    for i, (price, amount, quantity, ok) in enumerate(zip(prices, amounts, quantities, keep), start=1):
+        if not ok:
+            print(f"⚠️ DCA step {i} ({amount} @ {price}) is below the exchange minimum, leaving it out")
+            continue
+        levels.append({"step": i, "drop_pct": drop_pct, "trigger_price": price, "amount": amount, "quantity": quantity})
+    return levels
+
+
+@dataclass(frozen=True, slots=True)
+class TakeProfitTemplate:
+    steps: Tuple[int, ...]
+    trigger_pcts: Tuple[float, ...]
+    position_sizes: Tuple[float, ...]
+    factors: Tuple[float, ...]      # 1 + trigger_pct / 100
+
+    def scale(self, avg_entry_price: float, filters=None) -> list:
+        if filters is not None:
+            prices = filters.quantize_prices(avg_entry_price * np.array(self.factors, dtype=np.float64)).tolist()
+        else:
+            prices = [round(avg_entry_price * factor, 4) for factor in self.factors]
+        return [
+            {
+                "step": step,
+                "trigger_pct": pct,
+                "trigger_price": price,
+                "position_size": size,
+            }
+            for step, pct, size, price in zip(self.steps, self.trigger_pcts, self.position_sizes, prices)
+        ]
+
+
+class TemplateCache:
+    """Bounded LRU of templates, shared by every bot with the same ladder fields."""
+
+    def __init__(self, max_size: int = LADDER_TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: tuple, build):
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        template = build()
+        with self._lock:
+            self._entries[key] = template
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+ladder_templates = TemplateCache()
+
+
+def dca_step_drop(config: BotConfig, volatility_drop: Optional[float] = None) -> float:
+    if config.dca_condition in _PERCENT_DROP_FIELD:
+        return getattr(config, _PERCENT_DROP_FIELD[config.dca_condition])
+    if config.dca_condition == DcaCondition.VOLATILITY:
+        return volatility_drop
+    if config.dca_condition == DcaCondition.LOSS_AMOUNT:
+        return 0.0
+    raise ValueError("Unsupported DCA condition")
+
+
+def dca_template_key(config: BotConfig, drop_pct: float) -> tuple:
+    """Only the fields the ladder depends on, so copied configs share one template."""
+    amount_key = (
+        config.fixed_amount if config.dca_amount_mode == DcaAmountMode.FIXED
+        else (config.initial_amount, config.multiplier)
+    )
+    loss_key = (config.loss_amount, config.initial_amount) if config.dca_condition == DcaCondition.LOSS_AMOUNT else None
+    return ("dca", config.dca_steps, config.dca_condition, drop_pct, config.dca_amount_mode, amount_key, loss_key)
+
+
+def _build_dca_template(config: BotConfig, drop_pct: float) -> DcaTemplate:
+    if config.dca_amount_mode == DcaAmountMode.FIXED:
+        amounts = [config.fixed_amount] * config.dca_steps
+    elif config.dca_amount_mode == DcaAmountMode.MULTIPLIER:
+        amounts = []
+        current_amount = config.initial_amount
+        for _ in range(config.dca_steps):
+            current_amount = round(current_amount * config.multiplier, 2)
+            amounts.append(current_amount)
+    else:
+        raise ValueError("Invalid DCA amount mode")
+
+    if config.dca_condition == DcaCondition.LOSS_AMOUNT:
+        return DcaTemplate(0.0, tuple(amounts), loss_amount=config.loss_amount, initial_amount=config.initial_amount)
+    return DcaTemplate(drop_pct, tuple(amounts))
+
+
+def dca_template(config: BotConfig, volatility_drop: Optional[float] = None) -> DcaTemplate:
+    """Cached DCA template for a config with at least one DCA step."""
+    drop_pct = dca_step_drop(config, volatility_drop)
+    return ladder_templates.get_or_build(dca_template_key(config, drop_pct),
+                                         lambda: _build_dca_template(config, drop_pct))
+
+
+def take_profit_template(config: BotConfig) -> TakeProfitTemplate:
+    targets = config.take_profit_targets
+    key = ("take_profit", tuple((tp.step, tp.trigger_pct, tp.position_size) for tp in targets))
+    return ladder_templates.get_or_build(key, lambda: TakeProfitTemplate(
+        steps=tuple(tp.step for tp in targets),
+        trigger_pcts=tuple(tp.trigger_pct for tp in targets),
+        position_sizes=tuple(tp.position_size for tp in targets),
+        factors=tuple(1 + tp.trigger_pct / 100 for tp in targets),
+    ))
@@ -1,83 +1,195 @@
 # app/services/log_bot_plan.py
 
 from datetime import datetime
+from typing import Optional
 from app.supabase_client import supabase
+from app.services.run_summaries import bump_run_summary
+from app.utils.tracing import traced
 
+PLAN_KINDS = ["dca", "take_profit", "stop", "pause"]
 
-def log_bot_plan(bot_id: str, symbol: str, dca_levels: list, tp_levels: list, stop_pause: dict):
+# Stop/pause levels have no natural step, so each condition type gets a fixed slot
+CONDITION_STEPS = {"priceDropFromLast": 1, "priceDropFromAvg": 2}
+
+
+def build_plan_entries(bot_id: str, run_id: Optional[str], symbol: str,
+                       dca_levels: list, tp_levels: list, stop_pause: dict) -> list:
     """
-    Step 5: Log initial trade plan to Supabase.
-    Stores DCA orders, take profit targets, and stop/pause conditions.
+    Turn calculator output into plan entries keyed by (kind, step).
     """
-    trade_entries = []
+    entries = []
 
-    now = datetime.utcnow().isoformat()
-
-    # DCA Levels
-    for dca in dca_levels:
-        trade_entries.append({
+    def add(kind: str, step: int, price, amount, drop_pct, note: str):
+        entries.append({
             "bot_id": bot_id,
+            "run_id": run_id,
+            "kind": kind,
+            "step": step,
             "symbol": symbol,
-            "price": dca["trigger_price"],
-            "amount": dca["amount"],
-            "drop_pct": dca["drop_pct"],
-            "step": dca["step"],
-            "note": "DCA Order",
-            "created_at": now
+            "price": price,
+            "amount": amount,
+            "drop_pct": drop_pct,
+            "note": note,
         })
 
+    # DCA Levels
+    for dca in dca_levels:
+        add("dca", dca["step"], dca["trigger_price"], dca["amount"], dca["drop_pct"], "DCA Order")
+
     # Take Profit Levels
     for tp in tp_levels:
-        trade_entries.append({
-            "bot_id": bot_id,
-            "symbol": symbol,
-            "price": tp["trigger_price"],
-            "amount": tp["position_size"],
-            "drop_pct": tp["trigger_pct"],
-            "step": tp["step"],
-            "note": "Take Profit",
-            "created_at": now
-        })
+        add("take_profit", tp["step"], tp["trigger_price"], tp["position_size"], tp["trigger_pct"], "Take Profit")
 
     # Stop Conditions
     for stop in stop_pause.get("stop", []):
-        trade_entries.append({
-            "bot_id": bot_id,
-            "symbol": symbol,
-            "price": stop["trigger_price"],
-            "amount": 0,
-            "drop_pct": stop["drop_pct"],
-            "step": 0,
-            "note": f"STOP: {stop['type']}",
-            "created_at": now
-        })
+        add("stop", CONDITION_STEPS.get(stop["type"], 0), stop["trigger_price"], 0, stop["drop_pct"],
+            f"STOP: {stop['type']}")
 
     # Pause Conditions
     for pause in stop_pause.get("pause", []):
-        trade_entries.append({
-            "bot_id": bot_id,
-            "symbol": symbol,
-            "price": pause["trigger_price"],
-            "amount": 0,
-            "drop_pct": pause["drop_pct"],
-            "step": 0,
-            "note": f"PAUSE: {pause['type']}",
-            "created_at": now
-        })
+        add("pause", CONDITION_STEPS.get(pause["type"], 0), pause["trigger_price"], 0, pause["drop_pct"],
+            f"PAUSE: {pause['type']}")
+
+    return entries
+
+
+# Parallel arrays stored per kind; stop/pause keep their condition type, notes are derived
+PACKED_FIELDS = ["step", "price", "amount", "drop_pct"]
+PLAN_WRITE_RETRIES = 3
+
 
-    # Insert all to Supabase
-    if not trade_entries:
-        raise Exception("No trade entries to insert.")
+def level_note(kind: str, level_type: Optional[str]) -> str:
+    if kind == "dca":
+        return "DCA Order"
+    if kind == "take_profit":
+        return "Take Profit"
+    return f"{kind.upper()}: {level_type}"
+
+
+def pack_plan(entries: list) -> dict:
+    """Plan entries -> {kind: {"step": [...], "price": [...], ...}}, levels ordered by step."""
+    levels = {}
+    for entry in sorted(entries, key=lambda e: (e["kind"], int(e["step"]))):
+        columns = levels.setdefault(entry["kind"], {field: [] for field in PACKED_FIELDS})
+        for field in PACKED_FIELDS:
+            columns[field].append(entry[field])
+        if entry["kind"] in ("stop", "pause"):
+            columns.setdefault("type", []).append(entry["note"].split(": ", 1)[-1])
+    return levels
+
+
+def unpack_plan(levels: dict, bot_id: str, run_id: Optional[str], symbol: str) -> list:
+    entries = []
+    for kind in PLAN_KINDS:
+        columns = levels.get(kind)
+        if not columns:
+            continue
+        types = columns.get("type") or [None] * len(columns["step"])
+        for i in range(len(columns["step"])):
+            entries.append({
+                "bot_id": bot_id,
+                "run_id": run_id,
+                "kind": kind,
+                "symbol": symbol,
+                "note": level_note(kind, types[i]),
+                **{field: columns[field][i] for field in PACKED_FIELDS},
+            })
+    return entries
+
+
+def _same_value(a, b) -> bool:
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return round(float(a), 8) == round(float(b), 8)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_same_value(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same_value(a[k], b[k]) for k in a)
+    return a == b
+
+
+def _plan_scope(query, run_id: Optional[str], bot_id: Optional[str]):
+    """A plan is keyed by its run; a plan logged without one is the bot's single run-less plan."""
+    if run_id:
+        return query.eq("run_id", run_id)
+    return query.eq("bot_id", bot_id).is_("run_id", "null")
+
+
+def fetch_plan_row(run_id: Optional[str], bot_id: Optional[str] = None) -> Optional[dict]:
+    query = supabase.table("bot_plans").select("run_id, bot_id, symbol, version, levels, level_count, updated_at")
+    response = _plan_scope(query, run_id, bot_id).limit(1).execute()
+    return response.data[0] if response.data else None
+
+
+def load_bot_plan(run_id: str) -> Optional[dict]:
+    """The run's current plan in one point read, with levels unpacked to the log_bot_plan entry shape."""
+    row = fetch_plan_row(run_id)
+    if row is None:
+        return None
+    row["levels"] = unpack_plan(row.get("levels") or {}, row["bot_id"], run_id, row.get("symbol"))
+    return row
+
+
+@traced()
+def log_bot_plan(bot_id: str, symbol: str, dca_levels: list, tp_levels: list, stop_pause: dict,
+                 run_id: Optional[str] = None, kinds: Optional[list] = None):
+    """
+    Step 5: Log trade plan to Supabase.
+    Stores DCA orders, take profit targets, and stop/pause conditions.
+
+    The whole plan is one bot_plans row per run with packed per-kind arrays,
+    so writing it is a single small write. Every change bumps `version`, and
+    writes are conditional on the version read, so concurrent re-plans retry
+    instead of overwriting each other. Without a run_id the plan replaces the
+    bot's one run-less plan instead of adding another row.
+    Pass `kinds` to re-plan only some level kinds and leave the others untouched.
+    Returns the write response, or None when the stored plan is already current.
+    """
+    desired = pack_plan(build_plan_entries(bot_id, run_id, symbol, dca_levels, tp_levels, stop_pause))
+    now = datetime.utcnow().isoformat()
 
     try:
-        response = supabase.table("bot_trades").insert(trade_entries).execute()
+        for _ in range(PLAN_WRITE_RETRIES):
+            current = fetch_plan_row(run_id, bot_id)
+            levels = dict((current or {}).get("levels") or {})
+            for kind in kinds or PLAN_KINDS:
+                levels.pop(kind, None)
+                if kind in desired:
+                    levels[kind] = desired[kind]
+            level_count = sum(len(c["step"]) for c in levels.values())
+
+            if current is not None and _same_value(current.get("levels") or {}, levels):
+                print(f"📐 Plan for bot_id={bot_id} run_id={run_id} unchanged ({level_count} levels)")
+                return None
+
+            row = {"symbol": symbol, "levels": levels, "level_count": level_count, "updated_at": now}
+            try:
+                if current is None:
+                    response = supabase.table("bot_plans").insert(
+                        {**row, "run_id": run_id, "bot_id": bot_id, "version": 1, "created_at": now}
+                    ).execute()
+                else:
+                    query = supabase.table("bot_plans").update({**row, "version": current["version"] + 1})
+                    response = _plan_scope(query, run_id, bot_id).eq("version", current["version"]).execute()
+            except Exception as e:
+                if current is None and "duplicate" in str(e).lower():
+                    continue  # another writer created the row first
+                raise
+
+            # Safely check for Supabase errors
+            error = getattr(response, "error", None)
+            if error:
+                raise Exception(f"Supabase write error: {error}")
+            if not response.data:
+                continue  # version moved on since the read
 
-        # Safely check for Supabase errors
-        error = getattr(response, "error", None)
-        if error:
-            raise Exception(f"Supabase insert error: {error}")
+            version = response.data[0].get("version")
+            print(f"📐 Plan for bot_id={bot_id} run_id={run_id}: {level_count} levels stored (v{version})")
+            if run_id and not kinds:
+                # Partial re-plans (exit levels only) don't know the full level count
+                bump_run_summary(run_id, bot_id, plan_levels=level_count)
+            return response
 
-        return response
+        raise Exception(f"plan for run_id={run_id} kept changing, gave up after {PLAN_WRITE_RETRIES} attempts")
 
     except Exception as e:
         raise Exception(f"❌ Failed to log bot plan: {str(e)}")
@@ -0,0 +1,169 @@
+# app/services/log_retention.py
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.supabase_client import supabase, read_router
+from app.utils.archive import archive_path, write_columnar
+
+RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+RETENTION_BATCH_SIZE = int(os.getenv("LOG_RETENTION_BATCH_SIZE", "1000"))
+RETENTION_THROTTLE_SECS = float(os.getenv("LOG_RETENTION_THROTTLE_SECS", "0.2"))
+RETENTION_INTERVAL_SECS = float(os.getenv("LOG_RETENTION_INTERVAL_SECS", "3600"))
+
+# Per-table layout: primary key, timestamp column, what counts as "event" and "valid"
+RETENTION_TABLES = {
+    "bot_logs": {
+        "key": "id",
+        "time": "timestamp",
+        "event": "event",
+        "valid": None,
+        "exclude": [],
+    },
+    "webhook_logs": {
+        "key": "id",
+        "time": "received_at",
+        "event": "signal",
+        "valid": "valid",
+        "exclude": ["secret"],  # never export webhook secrets
+    },
+}
+
+
+def retention_cutoff(days: int = RETENTION_DAYS) -> datetime:
+    """Start of the hour `days` ago; only whole hours are rolled up."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    return cutoff.replace(minute=0, second=0, microsecond=0)
+
+
+def parse_timestamp(value: str) -> datetime:
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def hour_bucket(value: str) -> str:
+    return parse_timestamp(value).replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def roll_up_table(source: str, cutoff: Optional[datetime] = None) -> int:
+    """
+    Archive, then roll up and delete rows of `source` older than the cutoff, batch by batch.
+    The roll_up_logs RPC deletes a batch and adds the deleted rows to the hourly
+    counts in one transaction, so a failure never leaves rows counted but kept
+    (or removed but uncounted). A batch whose RPC failed is archived again on
+    the next run, so archives can hold duplicates; the counts cannot.
+    """
+    spec = RETENTION_TABLES[source]
+    cutoff_iso = (cutoff or retention_cutoff()).isoformat()
+    total = 0
+    batch_num = 0
+
+    while True:
+        rows = (
+            supabase.table(source)
+            .select("*")
+            .lt(spec["time"], cutoff_iso)
+            .order(spec["time"])
+            .limit(RETENTION_BATCH_SIZE)
+            .execute()
+        ).data or []
+        if not rows:
+            break
+
+        batch_num += 1
+        export = [{k: v for k, v in row.items() if k not in spec["exclude"]} for row in rows]
+        write_columnar(archive_path("retention", f"{source}-{batch_num:05d}", "columns.json.gz"), export)
+
+        moved = supabase.rpc("roll_up_logs", {
+            "p_source": source,
+            "p_key": spec["key"],
+            "p_time": spec["time"],
+            "p_event": spec["event"],
+            "p_valid": spec["valid"],
+            "p_ids": [row[spec["key"]] for row in rows],
+        }).execute().data
+        total += int(moved or 0)
+
+        if len(rows) < RETENTION_BATCH_SIZE:
+            break
+        time.sleep(RETENTION_THROTTLE_SECS)
+
+    print(f"🗄️ Retention: rolled up and removed {total} rows from {source} older than {cutoff_iso}")
+    return total
+
+
+def run_retention():
+    cutoff = retention_cutoff()
+    for source in RETENTION_TABLES:
+        try:
+            roll_up_table(source, cutoff)
+        except Exception as e:
+            print(f"❌ Retention failed for {source}: {e}")
+
+
+def fetch_bot_logs(bot_id: str, limit: int = 50, since: Optional[str] = None) -> list:
+    """
+    Newest-first bot logs. Raw rows are returned while they exist; older
+    ranges that were already pruned are served from hourly rollups, marked
+    with "rollup": True and a "count".
+    """
+    db = read_router.client_for("bot_logs.list", bot_id=bot_id)
+    query = (
+        db.table("bot_logs")
+        .select("*")
+        .eq("bot_id", bot_id)
+    )
+    if since:
+        query = query.gte("timestamp", since)
+    logs = query.order("timestamp", desc=True).limit(limit).execute().data or []
+
+    remaining = limit - len(logs)
+    cutoff = retention_cutoff()
+    if remaining <= 0 or (since and parse_timestamp(since) >= cutoff):
+        return logs
+
+    # Rollups only cover hours before the cutoff, so they never overlap raw rows
+    rollup_query = (
+        db.table("log_rollups")
+        .select("bucket, bot_id, event, valid, count")
+        .eq("source", "bot_logs")
+        .eq("bot_id", bot_id)
+        .lt("bucket", cutoff.isoformat())
+    )
+    if since:
+        rollup_query = rollup_query.gte("bucket", hour_bucket(since))
+    rollups = rollup_query.order("bucket", desc=True).limit(remaining).execute().data or []
+
+    for rollup in rollups:
+        logs.append({
+            "bot_id": rollup["bot_id"],
+            "event": rollup["event"],
+            "timestamp": rollup["bucket"],
+            "count": rollup["count"],
+            "rollup": True,
+        })
+    return logs
+
+
+class LogRetentionJob:
+    def __init__(self, interval_secs: float = RETENTION_INTERVAL_SECS):
+        self.interval_secs = interval_secs
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="log-retention", daemon=True)
+        self._thread.start()
+        print(f"🗄️ Log retention job started (keeping {RETENTION_DAYS} days)")
+
+    def _loop(self):
+        while True:
+            run_retention()
+            time.sleep(self.interval_secs)
+
+
+log_retention_job = LogRetentionJob()
@@ -0,0 +1,150 @@
+# app/services/order_netting.py
+
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+NETTING_WINDOW_MS = float(os.getenv("NETTING_WINDOW_MS", "50"))  # 0 disables netting
+NETTING_MAX_BATCH = int(os.getenv("NETTING_MAX_BATCH", "100"))
+
+Key = Tuple[str, str, str, str]  # (exchange, api_key, symbol, side)
+
+
+class _Batch:
+    __slots__ = ("client", "requests", "full")
+
+    def __init__(self, client):
+        self.client = client
+        self.requests: List[Tuple[float, Future]] = []
+        self.full = threading.Event()
+
+
+def allocate(order: dict, amounts: List[float]) -> List[dict]:
+    """Split one fill pro rata by requested amount; rounding remainders go to the last share."""
+    total_amount = sum(amounts)
+    price = float(order["price"])
+    filled_amount = float(order["amount"])
+    filled_quantity = float(order.get("filled_quantity") or filled_amount / price)
+
+    shares = []
+    quantity_left, amount_left = filled_quantity, filled_amount
+    for i, amount in enumerate(amounts):
+        if i == len(amounts) - 1:
+            quantity, share_amount = quantity_left, amount_left
+        else:
+            ratio = amount / total_amount
+            quantity = round(filled_quantity * ratio, 8)
+            share_amount = round(filled_amount * ratio, 8)
+            quantity_left -= quantity
+            amount_left -= share_amount
+        shares.append({
+            **order,
+            "amount": share_amount,
+            "filled_quantity": quantity,
+            "netted_with": len(amounts),
+            "netted_amount": filled_amount,
+        })
+    return shares
+
+
+class OrderNetter:
+    """
+    Aggregation window in front of market orders. The first order for an
+    (account, symbol, side) opens a batch and waits NETTING_WINDOW_MS (or until
+    NETTING_MAX_BATCH orders joined); every order arriving meanwhile joins it.
+    The opener then places a single exchange order for the summed amount and
+    hands each caller its pro-rata share of the fill, in the same shape
+    place_market_order returns. Callers block until their share is known, so
+    they must not run on the event loop. Followers wait without a timeout of
+    their own: giving up earlier than the exchange client would leave them
+    without the share of a fill that did happen. The leader's exchange call
+    is bounded by the client's request timeout, and every request of the
+    batch is always resolved with a share or an error.
+    """
+
+    def __init__(self, window_ms: float = NETTING_WINDOW_MS, max_batch: int = NETTING_MAX_BATCH):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._open: Dict[Key, _Batch] = {}
+        self._lock = threading.Lock()
+        self.metrics = {
+            "orders_requested": 0,
+            "exchange_orders": 0,
+            "exchange_calls_saved": 0,
+            "netted_batches": 0,
+            "largest_batch": 0,
+            "failed_batches": 0,
+        }
+
+    def place_market_order(self, client, exchange: str, api_key: str, symbol: str, amount: float,
+                           side: str = "buy") -> dict:
+        if self.window <= 0:
+            with self._lock:
+                self.metrics["orders_requested"] += 1
+                self.metrics["exchange_orders"] += 1
+            return client.place_market_order(symbol=symbol, amount=amount, side=side)
+
+        key = (exchange.lower(), api_key, symbol, side)
+        future: Future = Future()
+        with self._lock:
+            self.metrics["orders_requested"] += 1
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch(client)
+            batch.requests.append((amount, future))
+            if len(batch.requests) >= self.max_batch:
+                del self._open[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._execute(batch, symbol, side)
+
+        return future.result()
+
+    def _execute(self, batch: _Batch, symbol: str, side: str):
+        try:
+            self._place(batch, symbol, side)
+        except BaseException as e:
+            # Never leave a follower waiting forever, whatever went wrong after the order
+            for _, future in batch.requests:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+
+    def _place(self, batch: _Batch, symbol: str, side: str):
+        amounts = [amount for amount, _ in batch.requests]
+        futures = [future for _, future in batch.requests]
+        try:
+            order = batch.client.place_market_order(symbol=symbol, amount=sum(amounts), side=side)
+            shares = allocate(order, amounts) if len(amounts) > 1 else [order]
+        except Exception as e:
+            with self._lock:
+                self.metrics["exchange_orders"] += 1
+                self.metrics["failed_batches"] += 1
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.metrics["exchange_orders"] += 1
+            self.metrics["exchange_calls_saved"] += len(amounts) - 1
+            self.metrics["largest_batch"] = max(self.metrics["largest_batch"], len(amounts))
+            if len(amounts) > 1:
+                self.metrics["netted_batches"] += 1
+        if len(amounts) > 1:
+            print(f"🧮 Netted {len(amounts)} {side} orders for {symbol} into one ({sum(amounts)})")
+        for future, share in zip(futures, shares):
+            future.set_result(share)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"window_ms": self.window * 1000, "max_batch": self.max_batch, **self.metrics}
+
+
+order_netter = OrderNetter()
@@ -0,0 +1,391 @@
+# app/services/order_reconciler.py
+
+import fcntl
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.models.bot_config import BotConfig
+from app.supabase_client import supabase
+from app.utils.crypto import decrypt
+from app.services.exchange_client import get_exchange_client
+from app.services.position_ledger import record_fill
+from app.services.status_transition import log_bot_event
+from app.services.supabase_queries import get_user_exchange_keys
+
+RECONCILE_MIN_SECS = float(os.getenv("RECONCILE_MIN_SECS", "5"))
+RECONCILE_MAX_SECS = float(os.getenv("RECONCILE_MAX_SECS", "120"))
+# Resting orders within NEAR % of market are polled at MIN, beyond FAR % at MAX
+RECONCILE_NEAR_PCT = float(os.getenv("RECONCILE_NEAR_PCT", "0.5"))
+RECONCILE_FAR_PCT = float(os.getenv("RECONCILE_FAR_PCT", "10"))
+RECONCILE_CLIENT_TTL_SECS = float(os.getenv("RECONCILE_CLIENT_TTL_SECS", "600"))
+# One worker per host polls the exchange; the others wait on this lock
+RECONCILE_LOCK_PATH = os.getenv("RECONCILE_LOCK_PATH", "data/order_reconciler.lock")
+
+OPEN_STATUSES = ["new", "partially_filled"]
+
+# Binance request weights: open orders for one symbol vs. the whole account
+OPEN_ORDERS_SYMBOL_WEIGHT = 6
+OPEN_ORDERS_ALL_WEIGHT = 80
+TRADES_PAGE_LIMIT = 1000
+ORDER_NOT_FOUND = -2013
+
+# Final exchange status -> bot_trades.order_status
+FINAL_STATUSES = {
+    "FILLED": "filled",
+    "CANCELED": "canceled",
+    "EXPIRED": "canceled",
+    "EXPIRED_IN_MATCH": "canceled",
+    "REJECTED": "rejected",
+}
+
+QTY_EPSILON = 1e-9
+
+Account = Tuple[str, str]  # (user_id, exchange)
+Change = Tuple[dict, dict, Optional[dict]]  # (tracked row, updated row, new fills summary or None)
+
+
+def poll_interval(distance_pct: Optional[float]) -> float:
+    """Seconds until the next poll, growing linearly with the closest order's distance from market."""
+    if distance_pct is None:
+        return RECONCILE_MAX_SECS
+    span = max(RECONCILE_FAR_PCT - RECONCILE_NEAR_PCT, 1e-9)
+    ratio = min(max((distance_pct - RECONCILE_NEAR_PCT) / span, 0.0), 1.0)
+    return RECONCILE_MIN_SECS + (RECONCILE_MAX_SECS - RECONCILE_MIN_SECS) * ratio
+
+
+def fee_in_quote(trade: dict, symbol: str) -> float:
+    """Commission converted to the quote asset; fees in a third asset (e.g. BNB) are not counted."""
+    commission = float(trade.get("commission") or 0.0)
+    asset = trade.get("commissionAsset") or ""
+    if not commission or not asset:
+        return 0.0
+    if not symbol.startswith(asset) and symbol.endswith(asset):
+        return commission
+    if symbol.startswith(asset):
+        return commission * float(trade["price"])
+    return 0.0
+
+
+def summarize_trades(trades: List[dict], symbol: str, after_trade_id: int) -> dict:
+    """Quantity, quote value, fees and last id of trades newer than `after_trade_id`."""
+    qty = quote = fees = 0.0
+    last_id = after_trade_id
+    for trade in trades:
+        trade_id = int(trade["id"])
+        if trade_id <= after_trade_id:
+            continue
+        qty += float(trade["qty"])
+        quote += float(trade.get("quoteQty") or float(trade["qty"]) * float(trade["price"]))
+        fees += fee_in_quote(trade, symbol)
+        last_id = max(last_id, trade_id)
+    return {"qty": qty, "quote": quote, "fees": fees, "last_trade_id": last_id}
+
+
+class OrderReconciler:
+    """
+    Keeps resting orders in bot_trades in sync with the exchange.
+
+    Orders are grouped per account (user_id, exchange): each poll makes one
+    open-orders request for the account and fetches trades only for symbols
+    where an order progressed or disappeared, then fans the results out to
+    every run on that account. Accounts whose closest resting order is far
+    from market are polled less often.
+
+    Only the worker holding RECONCILE_LOCK_PATH polls. Each row update is
+    also conditional on the row still being as it was read, so a second
+    poller (another host, or a lock handover mid-pass) books a fill at most once.
+    """
+
+    def __init__(self):
+        self._next_poll: Dict[Account, float] = {}
+        self._clients: Dict[Account, Tuple[float, object]] = {}
+        self._thread = None
+
+    # --- Loading ---------------------------------------------------------
+
+    def load_open_orders(self) -> List[dict]:
+        response = (
+            supabase.table("bot_trades")
+            .select("*")
+            .in_("order_status", OPEN_STATUSES)
+            .not_.is_("order_id", "null")
+            .execute()
+        )
+        # Only exchange-assigned (numeric) ids can be looked up
+        return [row for row in response.data or [] if str(row["order_id"]).isdigit()]
+
+    def load_bots(self, bot_ids: List[str]) -> Dict[str, BotConfig]:
+        if not bot_ids:
+            return {}
+        response = (
+            supabase.table("bots")
+            .select("*")
+            .in_("bot_id", bot_ids)
+            .or_("status.is.null,status.neq.deleted")
+            .execute()
+        )
+        return {row["bot_id"]: BotConfig.from_row(row) for row in response.data or []}
+
+    def client_for(self, account: Account):
+        cached = self._clients.get(account)
+        if cached and time.monotonic() - cached[0] < RECONCILE_CLIENT_TTL_SECS:
+            return cached[1]
+
+        user_id, exchange = account
+        keys = get_user_exchange_keys(user_id, exchange)
+        if not keys:
+            raise ValueError(f"Exchange keys not found for user {user_id} on {exchange}")
+        client = get_exchange_client(
+            exchange, decrypt(keys["api_key_encrypted"]), decrypt(keys["api_secret_encrypted"])
+        )
+        self._clients[account] = (time.monotonic(), client)
+        return client
+
+    # --- Reconciliation --------------------------------------------------
+
+    def run_pass(self, now: Optional[float] = None) -> int:
+        """Poll every account that is due. Returns the number of bot_trades rows updated."""
+        now = now or time.monotonic()
+        rows = self.load_open_orders()
+        configs = self.load_bots(sorted({row["bot_id"] for row in rows}))
+
+        by_account: Dict[Account, List[dict]] = defaultdict(list)
+        for row in rows:
+            config = configs.get(row["bot_id"])
+            if config is not None:
+                by_account[(config.user_id, config.exchange)].append(row)
+
+        # Forget accounts that no longer have resting orders
+        for account in list(self._next_poll):
+            if account not in by_account:
+                self._next_poll.pop(account, None)
+
+        updated = 0
+        for account, account_rows in by_account.items():
+            if self._next_poll.get(account, 0.0) > now:
+                continue
+            try:
+                changes, distance = self.reconcile_account(account, account_rows)
+                updated += self.apply_updates(changes, configs)
+                interval = poll_interval(distance)
+            except Exception as e:
+                print(f"❌ Reconciliation failed for account {account[0]} on {account[1]}: {e}")
+                interval = RECONCILE_MAX_SECS
+            self._next_poll[account] = now + interval
+        return updated
+
+    def reconcile_account(self, account: Account, rows: List[dict]) -> Tuple[List[Change], Optional[float]]:
+        """
+        Diff one account's tracked orders against the exchange.
+        Returns (changes, closest % distance of a still-resting order from market).
+        """
+        client = self.client_for(account)
+        by_symbol: Dict[str, List[dict]] = defaultdict(list)
+        for row in rows:
+            by_symbol[row["symbol"]].append(row)
+
+        # One request for the whole account once it beats per-symbol requests
+        if len(by_symbol) * OPEN_ORDERS_SYMBOL_WEIGHT > OPEN_ORDERS_ALL_WEIGHT:
+            open_orders = client.get_open_orders()
+        else:
+            open_orders = [order for symbol in by_symbol for order in client.get_open_orders(symbol)]
+        open_by_id = {str(order["orderId"]): order for order in open_orders}
+
+        changes = []
+        closest = None
+        for symbol, symbol_rows in by_symbol.items():
+            progressed = []
+            resting_prices = []
+            for row in symbol_rows:
+                order = open_by_id.get(str(row["order_id"]))
+                if order is None:
+                    progressed.append(row)
+                    continue
+                resting_prices.append(float(order["price"]))
+                if float(order["executedQty"]) > float(row.get("filled_quantity") or 0) + QTY_EPSILON:
+                    progressed.append(row)
+
+            if progressed:
+                changes.extend(self.reconcile_symbol(client, symbol, progressed, open_by_id))
+
+            if resting_prices:
+                market = client.get_live_price(symbol)
+                if market > 0:
+                    distance = min(abs(market - price) / market * 100 for price in resting_prices)
+                    closest = distance if closest is None else min(closest, distance)
+
+        return changes, closest
+
+    def reconcile_symbol(self, client, symbol: str, rows: List[dict],
+                         open_by_id: Dict[str, dict]) -> List[Change]:
+        """
+        Fetch trades once for the symbol and diff each progressed order.
+        Returns (row, update, new fills) per changed order; nothing is written here.
+        """
+        after = min(int(row.get("last_trade_id") or 0) for row in rows)
+        trades = self.fetch_trades(client, symbol, rows, after)
+        trades_by_order: Dict[str, List[dict]] = defaultdict(list)
+        for trade in trades:
+            trades_by_order[str(trade["orderId"])].append(trade)
+
+        changes = []
+        for row in rows:
+            order_id = str(row["order_id"])
+            summary = summarize_trades(trades_by_order.get(order_id, []), symbol, int(row.get("last_trade_id") or 0))
+            status = self.order_status(client, symbol, row, open_by_id.get(order_id), summary)
+            if status is None and summary["qty"] <= QTY_EPSILON:
+                continue
+
+            update = dict(row)
+            update["reconciled_at"] = datetime.now(timezone.utc).isoformat()
+            if status:
+                update["order_status"] = status
+
+            fill = None
+            if summary["qty"] > QTY_EPSILON:
+                prev_qty = float(row.get("filled_quantity") or 0)
+                prev_avg = float(row.get("avg_fill_price") or 0)
+                total_qty = prev_qty + summary["qty"]
+                update["filled_quantity"] = total_qty
+                update["avg_fill_price"] = (prev_qty * prev_avg + summary["quote"]) / total_qty
+                update["fees"] = float(row.get("fees") or 0) + summary["fees"]
+                update["last_trade_id"] = summary["last_trade_id"]
+                fill = summary
+            changes.append((row, update, fill))
+        return changes
+
+    def fetch_trades(self, client, symbol: str, rows: List[dict], after_trade_id: int) -> List[dict]:
+        if after_trade_id:
+            params = {"from_id": after_trade_id + 1}
+        else:
+            # Never reconciled: start from the oldest tracked order
+            created = min(row.get("created_at") or "" for row in rows)
+            start = datetime.fromisoformat(created.replace("Z", "+00:00")) if created else None
+            if start is not None and start.tzinfo is None:
+                start = start.replace(tzinfo=timezone.utc)
+            params = {"start_time": int(start.timestamp() * 1000)} if start else {}
+
+        trades = []
+        while True:
+            page = client.get_my_trades(symbol, limit=TRADES_PAGE_LIMIT, **params)
+            trades.extend(page)
+            if len(page) < TRADES_PAGE_LIMIT:
+                return trades
+            params = {"from_id": int(page[-1]["id"]) + 1}
+
+    def order_status(self, client, symbol: str, row: dict, open_order: Optional[dict],
+                     summary: dict) -> Optional[str]:
+        """New order_status for a progressed order, or None if unchanged."""
+        filled = float(row.get("filled_quantity") or 0) + summary["qty"]
+        if open_order is not None:
+            status = "partially_filled" if filled > QTY_EPSILON else "new"
+            return status if status != row.get("order_status") else None
+
+        # No longer open: fully filled by the trades seen, or ask the exchange how it ended
+        ordered = float(row.get("quantity") or 0)
+        if ordered and filled >= ordered * (1 - 1e-4):
+            return "filled"
+        try:
+            order = client.get_order(symbol, row["order_id"])
+        except Exception as e:
+            if getattr(e, "code", None) == ORDER_NOT_FOUND:
+                return "missing"
+            raise
+        return FINAL_STATUSES.get(order.get("status"))
+
+    def apply_fill(self, row: dict, config: Optional[BotConfig], summary: dict):
+        if not row.get("run_id") or config is None:
+            return
+        side = "sell" if row.get("kind") == "take_profit" else "buy"
+        price = summary["quote"] / summary["qty"]
+        record_fill(row["run_id"], config, side, price, summary["qty"], summary["fees"])
+
+    def log_status_change(self, row: dict, config: Optional[BotConfig], update: dict):
+        if not row.get("run_id") or config is None:
+            return
+        log_bot_event(row["run_id"], row["bot_id"], config.user_id, f"order_{update['order_status']}", {
+            "order_id": row["order_id"],
+            "kind": row.get("kind"),
+            "step": row.get("step"),
+            "filled_quantity": update.get("filled_quantity"),
+            "avg_fill_price": update.get("avg_fill_price"),
+        })
+
+    def claim_update(self, row: dict, update: dict) -> bool:
+        """
+        Write the update only if the row still has the status and last trade id
+        it was read with. Returns False when another poller got there first.
+        """
+        fields = {key: value for key, value in update.items() if key != "id"}
+        query = (
+            supabase.table("bot_trades")
+            .update(fields)
+            .eq("id", row["id"])
+            .eq("order_status", row["order_status"])
+        )
+        if row.get("last_trade_id") is None:
+            query = query.is_("last_trade_id", "null")
+        else:
+            query = query.eq("last_trade_id", row["last_trade_id"])
+        return bool(query.execute().data)
+
+    def apply_updates(self, changes: List[Change], configs: Dict[str, BotConfig]) -> int:
+        """
+        Persist each row first, then book its fills and log its status change.
+        A row whose conditional write matched nothing was already reconciled
+        elsewhere and is not booked again; a failed write books nothing and the
+        same trades are seen again next pass (last_trade_id did not move).
+        """
+        applied = 0
+        for row, update, fill in changes:
+            config = configs.get(row["bot_id"])
+            try:
+                if not self.claim_update(row, update):
+                    continue
+                applied += 1
+                if fill is not None:
+                    self.apply_fill(row, config, fill)
+                if update.get("order_status") != row.get("order_status"):
+                    self.log_status_change(row, config, update)
+            except Exception as e:
+                print(f"❌ Failed to apply reconciled fill for order {row['order_id']}: {e}")
+        if applied:
+            print(f"🔄 Reconciled {applied} order(s)")
+        return applied
+
+    # --- Background loop -------------------------------------------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="order-reconciler", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        # Only one worker per host polls; the others stay idle until it goes away
+        os.makedirs(os.path.dirname(RECONCILE_LOCK_PATH) or ".", exist_ok=True)
+        leader = open(RECONCILE_LOCK_PATH, "w")
+        while True:
+            try:
+                fcntl.flock(leader, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(RECONCILE_MAX_SECS)
+        print("🔄 Order reconciler started")
+
+        while True:
+            try:
+                self.run_pass()
+            except Exception as e:
+                print(f"❌ Order reconciliation pass failed: {e}")
+            now = time.monotonic()
+            next_due = min(self._next_poll.values(), default=now + RECONCILE_MIN_SECS)
+            # New orders are picked up at the next pass, so never sleep past MIN
+            time.sleep(min(max(next_due - now, 1.0), RECONCILE_MIN_SECS))
+
+
+order_reconciler = OrderReconciler()
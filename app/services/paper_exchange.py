@@ -0,0 +1,366 @@
+# app/services/paper_exchange.py
+
+import heapq
+import itertools
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.services.kline_store import kline_store
+
+PAPER_MAKER_FEE = float(os.getenv("PAPER_MAKER_FEE", "0.001"))
+PAPER_TAKER_FEE = float(os.getenv("PAPER_TAKER_FEE", "0.001"))
+PAPER_SLIPPAGE_BPS = float(os.getenv("PAPER_SLIPPAGE_BPS", "5"))
+PAPER_START_BALANCE = float(os.getenv("PAPER_START_BALANCE", "10000"))
+PAPER_START_PRICE = float(os.getenv("PAPER_START_PRICE", "100"))
+PAPER_PRICE_SOURCE = os.getenv("PAPER_PRICE_SOURCE", "synthetic")  # synthetic | replay
+PAPER_VOLATILITY = float(os.getenv("PAPER_VOLATILITY", "0.002"))  # stdev of log return per tick
+PAPER_REPLAY_INTERVAL = os.getenv("PAPER_REPLAY_INTERVAL", "1m")
+PAPER_TICK_SECS = float(os.getenv("PAPER_TICK_SECS", "1"))
+
+QUOTE_ASSETS = ("USDT", "USDC", "FDUSD", "BUSD", "TUSD", "BTC", "ETH", "BNB", "EUR", "TRY")
+
+
+def split_symbol(symbol: str) -> tuple:
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return symbol[:-4], symbol[-4:]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class PaperOrderNotFound(ValueError):
+    """Carries Binance's "Unknown order" code, so callers handle both exchanges alike."""
+    code = -2013
+
+    def __init__(self):
+        super().__init__("Order does not exist")
+
+
+class PaperOrder:
+    __slots__ = ("order_id", "account", "symbol", "side", "price", "quantity", "executed_qty",
+                 "quote_qty", "status", "created_ms", "reserved")
+
+    def __init__(self, order_id: int, account: str, symbol: str, side: str, price: float, quantity: float):
+        self.order_id = order_id
+        self.account = account
+        self.symbol = symbol
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.executed_qty = 0.0
+        self.quote_qty = 0.0
+        self.status = "NEW"
+        self.created_ms = _now_ms()
+        self.reserved = 0.0  # quote held for a buy (value plus fee) until it fills or is canceled
+
+    def to_binance(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "orderId": self.order_id,
+            "price": f"{self.price:.8f}",
+            "origQty": f"{self.quantity:.8f}",
+            "executedQty": f"{self.executed_qty:.8f}",
+            "cummulativeQuoteQty": f"{self.quote_qty:.8f}",
+            "status": self.status,
+            "type": "LIMIT",
+            "side": self.side.upper(),
+            "time": self.created_ms,
+        }
+
+
+class OrderBook:
+    """
+    Resting limit orders of one symbol. Buys sit in a max-heap and sells in a
+    min-heap keyed by (price, sequence), so a tick only looks at the top of
+    each heap and every fill costs O(log n). Cancelled orders are dropped
+    lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self.bids: list = []  # (-price, seq, order)
+        self.asks: list = []  # (price, seq, order)
+        self._seq = itertools.count()
+
+    def add(self, order: PaperOrder):
+        if order.side == "buy":
+            heapq.heappush(self.bids, (-order.price, next(self._seq), order))
+        else:
+            heapq.heappush(self.asks, (order.price, next(self._seq), order))
+
+    def crossed(self, price: float) -> List[PaperOrder]:
+        """Pop every resting order the price has reached (buys at/above it, sells at/below it)."""
+        hits = []
+        while self.bids and (self.bids[0][2].status != "NEW" or -self.bids[0][0] >= price):
+            order = heapq.heappop(self.bids)[2]
+            if order.status == "NEW":
+                hits.append(order)
+        while self.asks and (self.asks[0][2].status != "NEW" or self.asks[0][0] <= price):
+            order = heapq.heappop(self.asks)[2]
+            if order.status == "NEW":
+                hits.append(order)
+        return hits
+
+    def __len__(self) -> int:
+        return len(self.bids) + len(self.asks)
+
+
+class PaperExchange:
+    """
+    In-process matching engine behind PaperExchangeClient. Accounts are keyed
+    by API key and start with PAPER_START_BALANCE of each quote asset.
+    Prices come from a synthetic random walk or from candles replayed out of
+    the local kline store; call tick()/advance() directly for load tests, or
+    start() a feeder thread. All state (balances, orders, trades) lives in
+    this process and is lost on restart.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._books: Dict[str, OrderBook] = defaultdict(OrderBook)
+        self._orders: Dict[int, PaperOrder] = {}
+        self._trades: Dict[tuple, List[dict]] = defaultdict(list)  # (account, symbol) -> trades, oldest first
+        self._balances: Dict[str, Dict[str, float]] = {}
+        self._prices: Dict[str, float] = {}
+        self._replay_index: Dict[str, int] = {}
+        self._order_ids = itertools.count(int(time.time() * 1000))
+        self._trade_ids = itertools.count(1)
+        self._rng = random.Random(os.getenv("PAPER_SEED"))
+        self._thread = None
+
+    # --- Prices ----------------------------------------------------------
+
+    def price(self, symbol: str) -> float:
+        with self._lock:
+            if symbol not in self._prices:
+                candles = kline_store.candles(symbol, PAPER_REPLAY_INTERVAL)
+                self._prices[symbol] = float(candles["close"][0 if PAPER_PRICE_SOURCE == "replay" else -1]) \
+                    if len(candles) else PAPER_START_PRICE
+            return self._prices[symbol]
+
+    def next_price(self, symbol: str) -> float:
+        """Next price of the stream: the next replayed close, or one random-walk step."""
+        current = self.price(symbol)
+        if PAPER_PRICE_SOURCE == "replay":
+            candles = kline_store.candles(symbol, PAPER_REPLAY_INTERVAL)
+            if len(candles):
+                index = self._replay_index.get(symbol, 0) + 1
+                self._replay_index[symbol] = index % len(candles)
+                return float(candles["close"][index % len(candles)])
+        return current * math.exp(self._rng.gauss(0.0, PAPER_VOLATILITY))
+
+    def tick(self, symbol: str, price: float) -> int:
+        """Move the symbol's price and fill every resting order it reaches. Returns fills."""
+        with self._lock:
+            self._prices[symbol] = price
+            book = self._books.get(symbol)
+            if not book:
+                return 0
+            hits = book.crossed(price)
+            for order in hits:
+                # Resting orders are makers and fill at their own limit price
+                self._fill(order, order.price, PAPER_MAKER_FEE)
+            return len(hits)
+
+    def advance(self, symbol: str, ticks: int = 1) -> int:
+        fills = 0
+        for _ in range(ticks):
+            fills += self.tick(symbol, self.next_price(symbol))
+        return fills
+
+    # --- Accounts --------------------------------------------------------
+
+    def balances(self, account: str) -> Dict[str, float]:
+        with self._lock:
+            if account not in self._balances:
+                self._balances[account] = defaultdict(float, {q: PAPER_START_BALANCE for q in ("USDT", "USDC", "FDUSD")})
+            return self._balances[account]
+
+    def _fill(self, order: PaperOrder, price: float, fee_rate: float):
+        base, quote = split_symbol(order.symbol)
+        quantity = order.quantity - order.executed_qty
+        quote_qty = price * quantity
+        commission = quote_qty * fee_rate
+        balances = self.balances(order.account)
+
+        if order.side == "buy":
+            # Value and fee were reserved when the order was placed; return what was not spent
+            balances[quote] += order.reserved - quote_qty - commission
+            order.reserved = 0.0
+            balances[base] += quantity
+        else:
+            balances[quote] += quote_qty - commission
+
+        order.executed_qty = order.quantity
+        order.quote_qty += quote_qty
+        order.status = "FILLED"
+        self._trades[(order.account, order.symbol)].append({
+            "symbol": order.symbol,
+            "id": next(self._trade_ids),
+            "orderId": order.order_id,
+            "price": f"{price:.8f}",
+            "qty": f"{quantity:.8f}",
+            "quoteQty": f"{quote_qty:.8f}",
+            "commission": f"{commission:.8f}",
+            "commissionAsset": quote,
+            "time": _now_ms(),
+            "isBuyer": order.side == "buy",
+            "isMaker": fee_rate == PAPER_MAKER_FEE,
+        })
+
+    # --- Orders ----------------------------------------------------------
+
+    def submit(self, account: str, symbol: str, side: str, quantity: float, price: Optional[float] = None) -> PaperOrder:
+        """Market order when price is None, else a limit order (fills at once if marketable)."""
+        side = side.lower()
+        base, quote = split_symbol(symbol)
+        with self._lock:
+            market = self.price(symbol)
+            balances = self.balances(account)
+            reserve_price = price if price is not None else market * (1 + PAPER_SLIPPAGE_BPS / 10000)
+            if quantity <= 0:
+                raise ValueError("Order quantity must be positive")
+            marketable = price is None or (side == "buy" and price >= market) or (side == "sell" and price <= market)
+            fee_rate = PAPER_TAKER_FEE if marketable else PAPER_MAKER_FEE
+            reserved = reserve_price * quantity * (1 + fee_rate)
+            if side == "buy" and balances[quote] < reserved:
+                raise ValueError(f"Insufficient paper {quote} balance")
+            if side == "sell" and balances[base] < quantity:
+                raise ValueError(f"Insufficient paper {base} balance")
+
+            order = PaperOrder(next(self._order_ids), account, symbol, side, reserve_price, quantity)
+            self._orders[order.order_id] = order
+            if side == "buy":
+                order.reserved = reserved
+                balances[quote] -= reserved
+            else:
+                balances[base] -= quantity
+
+            if price is None:
+                slip = PAPER_SLIPPAGE_BPS / 10000
+                self._fill(order, market * (1 + slip if side == "buy" else 1 - slip), fee_rate)
+            elif marketable:
+                self._fill(order, market, fee_rate)
+            else:
+                self._books[symbol].add(order)
+            return order
+
+    def cancel(self, account: str, order_id: int) -> PaperOrder:
+        with self._lock:
+            order = self._orders.get(int(order_id))
+            if order is None or order.account != account:
+                raise PaperOrderNotFound()
+            if order.status == "NEW":
+                order.status = "CANCELED"
+                base, quote = split_symbol(order.symbol)
+                balances = self.balances(account)
+                if order.side == "buy":
+                    balances[quote] += order.reserved
+                    order.reserved = 0.0
+                else:
+                    balances[base] += order.quantity
+            return order
+
+    def order(self, account: str, order_id) -> PaperOrder:
+        with self._lock:
+            order = self._orders.get(int(order_id))
+            if order is None or order.account != account:
+                raise PaperOrderNotFound()
+            return order
+
+    def open_orders(self, account: str, symbol: Optional[str] = None) -> List[PaperOrder]:
+        with self._lock:
+            return [o for o in self._orders.values()
+                    if o.account == account and o.status == "NEW" and (symbol is None or o.symbol == symbol)]
+
+    def trades(self, account: str, symbol: str, from_id: Optional[int] = None, start_time: Optional[int] = None,
+               limit: int = 1000) -> List[dict]:
+        with self._lock:
+            rows = self._trades.get((account, symbol), [])
+            if from_id is not None:
+                rows = [t for t in rows if t["id"] >= from_id]
+            elif start_time is not None:
+                rows = [t for t in rows if t["time"] >= start_time]
+            return rows[:limit]
+
+    # --- Background feed -------------------------------------------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="paper-exchange", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                symbols = [symbol for symbol, book in self._books.items() if len(book)]
+            for symbol in symbols:
+                self.advance(symbol)
+            time.sleep(PAPER_TICK_SECS)
+
+
+paper_exchange = PaperExchange()
+
+
+class PaperExchangeClient:
+    """Same interface as BinanceExchangeClient, served by the in-process paper exchange."""
+
+    def __init__(self, api_key: str, api_secret: str = ""):
+        self.account = api_key
+        paper_exchange.start()
+
+    def get_live_price(self, symbol: str) -> float:
+        return paper_exchange.price(symbol)
+
+    def _result(self, order: PaperOrder, amount: float) -> dict:
+        avg_price = order.quote_qty / order.executed_qty if order.executed_qty else order.price
+        return {
+            "success": True,
+            "order_id": str(order.order_id),
+            "price": avg_price,
+            "amount": amount,
+            "quantity": order.quantity,
+            "filled_quantity": order.executed_qty,
+            "avg_entry_price": avg_price,
+            "last_entry_price": avg_price,
+            "status": order.status,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def place_market_order(self, symbol: str, amount: float, side: str = "buy") -> dict:
+        quantity = round(amount / paper_exchange.price(symbol), 8)
+        order = paper_exchange.submit(self.account, symbol, side, quantity)
+        print(f"[PAPER ORDER] Market {side} order for {amount} of {symbol} at price {order.price}")
+        return self._result(order, amount)
+
+    def place_limit_order(self, symbol: str, amount: float, price: float, side: str = "buy") -> dict:
+        quantity = round(amount / price, 8)
+        order = paper_exchange.submit(self.account, symbol, side, quantity, price)
+        print(f"[PAPER ORDER] Limit {side} order for {amount} of {symbol} at price {price}")
+        result = self._result(order, amount)
+        result["price"] = price
+        return result
+
+    def get_open_orders(self, symbol: str = None) -> list:
+        return [o.to_binance() for o in paper_exchange.open_orders(self.account, symbol)]
+
+    def get_my_trades(self, symbol: str, from_id: int = None, start_time: int = None, limit: int = 1000) -> list:
+        return paper_exchange.trades(self.account, symbol, from_id, start_time, limit)
+
+    def get_order(self, symbol: str, order_id) -> dict:
+        return paper_exchange.order(self.account, order_id).to_binance()
+
+    def cancel_order(self, symbol: str, order_id) -> dict:
+        return paper_exchange.cancel(self.account, order_id).to_binance()
+
+    def get_mock_balance(self) -> dict:
+        return dict(paper_exchange.balances(self.account))
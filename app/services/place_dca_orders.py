@@ -1,14 +1,18 @@
 # app/services/place_dca_orders.py
 
 from datetime import datetime
+from typing import Optional
 from app.services.exchange_client import get_exchange_client
 from app.supabase_client import supabase
 
 
-def place_dca_orders(dca_levels: list, exchange: str, keys: dict, symbol: str):
+def place_dca_orders(dca_levels: list, exchange: str, keys: dict, symbol: str, run_id: Optional[str] = None):
     """
     Step 4: Place all calculated DCA limit orders on the user's exchange
     and optionally log them to Supabase.
+
+    With a run_id the order row is keyed by the run's "dca" step, so placing
+    the ladder again updates it, and the order reconciler tracks it until it fills.
     """
     client = get_exchange_client(exchange, keys["api_key"], keys["api_secret"])
     placed_orders = []
@@ -24,6 +28,7 @@ def place_dca_orders(dca_levels: list, exchange: str, keys: dict, symbol: str):
 
             order_record = {
                 "step": dca["step"],
+                "order_id": order.get("order_id"),
                 "price": order["price"],
                 "amount": order["amount"],
                 "quantity": order.get("quantity"),
@@ -34,7 +39,7 @@ def place_dca_orders(dca_levels: list, exchange: str, keys: dict, symbol: str):
 
             # Optional: log to Supabase
             if "bot_id" in dca:
-                supabase.table("bot_trades").insert({
+                trade = {
                     "bot_id": dca["bot_id"],
                     "symbol": symbol,
                     "price": round(order["price"], 4),
@@ -43,8 +48,16 @@ def place_dca_orders(dca_levels: list, exchange: str, keys: dict, symbol: str):
                     "drop_pct": dca.get("drop_pct", 0),
                     "step": dca["step"],
                     "note": "DCA limit order",
+                    "order_id": order.get("order_id"),
+                    "order_status": "new",
+                    "filled_quantity": 0,
                     "created_at": datetime.utcnow().isoformat()
-                }).execute()
+                }
+                if run_id:
+                    trade.update({"run_id": run_id, "kind": "dca", "note": "DCA Order"})
+                    supabase.table("bot_trades").upsert(trade, on_conflict="bot_id,run_id,kind,step").execute()
+                else:
+                    supabase.table("bot_trades").insert(trade).execute()
 
         except Exception as e:
             print(f"[ERROR] Failed to place DCA order for step {dca['step']}: {e}")
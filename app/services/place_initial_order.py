@@ -1,41 +1,44 @@
 # place_initial_order.py
+from typing import Optional, Union
+from app.models.bot_config import BotConfig
 from app.services.exchange_client import get_exchange_client
+from app.services.order_netting import order_netter
+from app.services.position_ledger import position_ledgers
+from app.services.run_summaries import bump_run_summary
+from app.services import portfolio
 from app.supabase_client import supabase
 from datetime import datetime
+from app.utils.tracing import traced
+
+@traced()
+def place_initial_order(bot: Union[BotConfig, dict], keys: dict, run_id: Optional[str] = None,
+                        entry_key: Optional[str] = None) -> dict:
+    config = BotConfig.coerce(bot)
+    exchange = config.exchange
+    symbol = config.trading_pair
+    amount = config.initial_amount
+    order_type = config.order_type
 
-def place_initial_order(bot: dict, keys: dict) -> dict:
-    exchange = bot["exchange"]
-    symbol = bot["trading_pair"]
-    amount = bot["initial_amount"]
-    order_type = bot["order_type"]
-    
     # Handle both standard and conditional order types
-    if order_type in ["conditional_market", "market"]:
-        processed_order_type = "market"
-    elif order_type in ["conditional_limit", "limit"]:
-        processed_order_type = "limit"
-    else:
-        raise ValueError(f"Unsupported order type: '{order_type}'")
-    
-    # Handle limit price validation
-    limit_price = bot.get("limit_price")
-    try:
-        # Convert to float if it exists
-        limit_price = float(limit_price) if limit_price is not None else None
-    except (TypeError, ValueError):
-        limit_price = None
+    if order_type is None:
+        raise ValueError(f"Unsupported order type for bot '{config.bot_id}'")
+    processed_order_type = order_type.execution_type
+
+    # Limit price is already parsed to float (or None) by BotConfig
+    limit_price = config.limit_price
 
     client = get_exchange_client(exchange, keys["api_key"], keys["api_secret"])
 
     # Place the order based on processed order type
     if processed_order_type == "market":
-        order = client.place_market_order(symbol=symbol, amount=amount, side="buy")
+        # Concurrent same-symbol buys on this account share one exchange order
+        order = order_netter.place_market_order(client, exchange, keys["api_key"], symbol, amount, side="buy")
     
     elif processed_order_type == "limit":
         if limit_price is None or limit_price <= 0:
             raise ValueError(
                 f"Limit order requires valid price. "
-                f"Received: {bot.get('limit_price')} (parsed as {limit_price})"
+                f"Received: {limit_price}"
             )
         order = client.place_limit_order(
             symbol=symbol, 
@@ -47,28 +50,58 @@ def place_initial_order(bot: dict, keys: dict) -> dict:
     # Normalize values
     price = float(order["price"])
     filled_amount = float(order["amount"])
-    filled_quantity = filled_amount / price
+
+    # Market orders fill on placement; limit orders rest until the reconciler sees them fill
+    filled = processed_order_type == "market"
+
+    # The exchange client snaps quantities to the step size, so take its quantity when it reports one
+    reported_quantity = order.get("filled_quantity") if filled else order.get("quantity")
+    filled_quantity = float(reported_quantity) if reported_quantity else filled_amount / price
 
     # Log trade to Supabase
     trade_record = {
-        "bot_id": bot["bot_id"],
+        "bot_id": config.bot_id,
+        "run_id": run_id,
         "symbol": symbol,
         "price": round(price, 4),
         "amount": round(filled_amount, 4),
+        "quantity": round(filled_quantity, 6),
         "drop_pct": 0,
         "step": 0,
         "note": "Initial entry",
+        "order_id": order.get("order_id"),
+        "order_status": "filled" if filled else "new",
+        "filled_quantity": round(filled_quantity, 6) if filled else 0,
+        "avg_fill_price": price if filled else None,
         "created_at": datetime.utcnow().isoformat()
     }
+    if entry_key:
+        # Idempotency key of the journaled webhook that caused this entry
+        trade_record["entry_key"] = entry_key
     supabase.table("bot_trades").insert(trade_record).execute()
 
+    if filled:
+        portfolio.apply_fill(config.user_id, symbol, "buy", price, filled_quantity)
+
+    # Seed the run's position ledger; later fills update it incrementally.
+    # For a resting limit order the planned levels are based on its price until it fills.
+    avg_entry_price = last_entry_price = price
+    if run_id and filled:
+        ledger = position_ledgers.open(run_id, config)
+        ledger.apply_fill("buy", price, filled_quantity)
+        position_ledgers.mark_dirty(run_id)
+        avg_entry_price = ledger.avg_entry_price
+        last_entry_price = ledger.last_entry_price
+        bump_run_summary(run_id, config.bot_id, config.user_id, fills=1,
+                         quantity=filled_quantity, amount=price * filled_quantity)
+
     return {
         "success": True,
         "order_id": order.get("order_id"),
         "price": round(price, 4),
         "amount": round(filled_amount, 4),
         "filled_quantity": round(filled_quantity, 6),
-        "avg_entry_price": price,
-        "last_entry_price": price,
+        "avg_entry_price": avg_entry_price,
+        "last_entry_price": last_entry_price,
         "timestamp": order.get("timestamp") or datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    }
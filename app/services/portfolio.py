@@ -0,0 +1,208 @@
+# app/services/portfolio.py
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from binance.client import Client as BinanceClient
+
+from app.supabase_client import supabase
+
+PORTFOLIO_PRICE_TTL_SECS = float(os.getenv("PORTFOLIO_PRICE_TTL_SECS", "10"))
+PORTFOLIO_SNAPSHOT_SECS = float(os.getenv("PORTFOLIO_SNAPSHOT_SECS", "900"))
+PORTFOLIO_SNAPSHOT_PAGE = int(os.getenv("PORTFOLIO_SNAPSHOT_PAGE", "1000"))
+
+QTY_EPSILON = 1e-12
+
+
+def apply_fill(user_id: str, symbol: str, side: str, price: float, quantity: float, fee: float = 0.0):
+    """
+    Add one fill to the user's per-symbol aggregate (average-cost, in one RPC).
+    Never raises: the portfolio is a projection of fills, not the source of truth.
+    """
+    if not user_id or not symbol or not quantity:
+        return
+    try:
+        supabase.rpc("apply_portfolio_fill", {
+            "p_user_id": user_id,
+            "p_symbol": symbol.upper(),
+            "p_side": side,
+            "p_price": float(price),
+            "p_quantity": float(quantity),
+            "p_fee": float(fee or 0.0),
+        }).execute()
+    except Exception as e:
+        print(f"❌ Failed to update portfolio for user {user_id} {symbol}: {e}")
+
+
+class PriceCache:
+    """Last prices for all symbols, refreshed with one ticker request at most every TTL."""
+
+    def __init__(self, ttl_secs: float = PORTFOLIO_PRICE_TTL_SECS):
+        self.ttl_secs = ttl_secs
+        self._prices: Dict[str, float] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._client = None
+
+    def prices(self) -> Dict[str, float]:
+        with self._lock:
+            if time.monotonic() - self._fetched_at >= self.ttl_secs:
+                try:
+                    if self._client is None:
+                        self._client = BinanceClient()  # public market data, no keys needed
+                    tickers = self._client.get_all_tickers()
+                    self._prices = {t["symbol"]: float(t["price"]) for t in tickers}
+                except Exception as e:
+                    # Keep serving the last known prices
+                    print(f"❌ Failed to refresh prices: {e}")
+                self._fetched_at = time.monotonic()
+            return self._prices
+
+
+price_cache = PriceCache()
+
+
+def revalue(positions: List[dict], prices: Dict[str, float], include_closed: bool = False) -> dict:
+    """
+    Mark aggregates to market: per-symbol value, unrealized PnL and exposure share.
+    Totals cover every aggregate, so PnL realized on closed symbols still counts;
+    closed symbols are listed only with `include_closed`.
+    """
+    rows = []
+    totals = {"capital_deployed": 0.0, "market_value": 0.0, "unrealized_pnl": 0.0, "realized_pnl": 0.0}
+
+    for pos in positions:
+        quantity = float(pos.get("quantity") or 0.0)
+        cost_basis = float(pos.get("cost_basis") or 0.0)
+        realized = float(pos.get("realized_pnl") or 0.0)
+        totals["realized_pnl"] += realized
+        if quantity <= QTY_EPSILON and not include_closed:
+            continue
+        price = prices.get(pos["symbol"])
+        market_value = quantity * price if price is not None else None
+        unrealized = market_value - cost_basis if market_value is not None else None
+
+        rows.append({
+            "symbol": pos["symbol"],
+            "quantity": quantity,
+            "avg_entry_price": cost_basis / quantity if quantity > QTY_EPSILON else None,
+            "capital_deployed": round(cost_basis, 2),
+            "price": price,
+            "market_value": round(market_value, 2) if market_value is not None else None,
+            "unrealized_pnl": round(unrealized, 2) if unrealized is not None else None,
+            "realized_pnl": round(realized, 2),
+            "fees_paid": round(float(pos.get("fees_paid") or 0.0), 2),
+            "fill_count": int(pos.get("fill_count") or 0),
+        })
+        totals["capital_deployed"] += cost_basis
+        # Symbols without a price count at cost so exposure still adds up
+        totals["market_value"] += market_value if market_value is not None else cost_basis
+        totals["unrealized_pnl"] += unrealized or 0.0
+
+    for row in rows:
+        value = row["market_value"] if row["market_value"] is not None else row["capital_deployed"]
+        row["exposure_pct"] = round(value / totals["market_value"] * 100, 2) if totals["market_value"] > 0 else 0.0
+
+    return {
+        **{key: round(value, 2) for key, value in totals.items()},
+        "positions": sorted(rows, key=lambda r: r["exposure_pct"], reverse=True),
+        "priced_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def get_portfolio(user_id: str, include_closed: bool = False) -> dict:
+    """The user's aggregates in one read, revalued against cached prices."""
+    positions = supabase.table("portfolio_positions").select("*").eq("user_id", user_id).execute().data or []
+    return revalue(positions, price_cache.prices(), include_closed=include_closed)
+
+
+def get_portfolio_history(user_id: str, since: Optional[str] = None, limit: int = 500) -> list:
+    query = (
+        supabase.table("portfolio_snapshots")
+        .select("bucket, capital_deployed, market_value, unrealized_pnl, realized_pnl")
+        .eq("user_id", user_id)
+    )
+    if since:
+        query = query.gte("bucket", since)
+    return query.order("bucket", desc=True).limit(limit).execute().data or []
+
+
+class PortfolioSnapshotter:
+    """
+    Every PORTFOLIO_SNAPSHOT_SECS, revalues every user's aggregates and
+    upserts one row per user into portfolio_snapshots. Rows are keyed by the
+    interval bucket, so several workers snapshotting the same bucket is harmless.
+    """
+
+    def __init__(self, interval_secs: float = PORTFOLIO_SNAPSHOT_SECS):
+        self.interval_secs = interval_secs
+        self._thread = None
+
+    def bucket(self, now: Optional[float] = None) -> str:
+        now = now or time.time()
+        start = now - now % self.interval_secs
+        return datetime.fromtimestamp(start, tz=timezone.utc).isoformat()
+
+    def run_once(self) -> int:
+        bucket = self.bucket()
+        prices = price_cache.prices()
+
+        by_user: Dict[str, List[dict]] = {}
+        offset = 0
+        while True:
+            page = (
+                supabase.table("portfolio_positions")
+                .select("*")
+                .order("user_id")
+                .order("symbol")
+                .range(offset, offset + PORTFOLIO_SNAPSHOT_PAGE - 1)
+                .execute()
+                .data or []
+            )
+            for pos in page:
+                by_user.setdefault(pos["user_id"], []).append(pos)
+            if len(page) < PORTFOLIO_SNAPSHOT_PAGE:
+                break
+            offset += PORTFOLIO_SNAPSHOT_PAGE
+
+        rows = []
+        for user_id, positions in by_user.items():
+            valued = revalue(positions, prices)
+            rows.append({
+                "user_id": user_id,
+                "bucket": bucket,
+                "capital_deployed": valued["capital_deployed"],
+                "market_value": valued["market_value"],
+                "unrealized_pnl": valued["unrealized_pnl"],
+                "realized_pnl": valued["realized_pnl"],
+                "positions": valued["positions"],
+            })
+
+        for i in range(0, len(rows), PORTFOLIO_SNAPSHOT_PAGE):
+            supabase.table("portfolio_snapshots").upsert(
+                rows[i:i + PORTFOLIO_SNAPSHOT_PAGE], on_conflict="user_id,bucket"
+            ).execute()
+        print(f"📸 Portfolio snapshot {bucket}: {len(rows)} user(s)")
+        return len(rows)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="portfolio-snapshots", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            # Sleep to the start of the next bucket
+            now = time.time()
+            time.sleep(self.interval_secs - now % self.interval_secs)
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Portfolio snapshot failed: {e}")
+
+
+portfolio_snapshotter = PortfolioSnapshotter()
@@ -0,0 +1,245 @@
+# app/services/position_ledger.py
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Union
+
+from app.models.bot_config import BotConfig
+from app.supabase_client import supabase
+from app.services.calculate_take_profit import calculate_take_profit_levels
+from app.services.calculate_stop_pause import calculate_stop_pause_levels
+from app.services.log_bot_plan import log_bot_plan
+from app.services.run_summaries import bump_run_summary
+from app.services import portfolio
+
+SNAPSHOT_FLUSH_SECS = float(os.getenv("POSITION_SNAPSHOT_FLUSH_SECS", "5"))
+# Ledgers untouched this long are dropped from memory; the snapshot reloads them on demand
+LEDGER_IDLE_SECS = float(os.getenv("POSITION_LEDGER_IDLE_SECS", "3600"))
+QTY_EPSILON = 1e-12
+
+
+class PositionLedger:
+    """
+    Running position of one bot run. Every fill updates the sums in O(1);
+    average entry is derived from them instead of scanning bot_trades.
+    """
+    __slots__ = (
+        "run_id", "bot_id", "user_id", "symbol", "config",
+        "quantity", "cost_basis", "realized_pnl", "fees_paid",
+        "last_entry_price", "fill_count", "updated_at",
+    )
+
+    def __init__(self, run_id: str, config: Optional[BotConfig] = None, bot_id: str = "",
+                 user_id: str = "", symbol: str = ""):
+        self.run_id = run_id
+        self.config = config
+        self.bot_id = config.bot_id if config else bot_id
+        self.user_id = config.user_id if config else user_id
+        self.symbol = config.trading_pair if config else symbol
+        self.quantity = 0.0
+        self.cost_basis = 0.0
+        self.realized_pnl = 0.0
+        self.fees_paid = 0.0
+        self.last_entry_price = 0.0
+        self.fill_count = 0
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+
+    @property
+    def avg_entry_price(self) -> float:
+        return self.cost_basis / self.quantity if self.quantity > QTY_EPSILON else 0.0
+
+    def apply_fill(self, side: str, price: float, quantity: float, fee: float = 0.0) -> bool:
+        """
+        Apply one fill. Buys add to cost basis (fees included); sells realize
+        PnL against the current average. Returns True when the entry prices
+        changed, i.e. take-profit and stop/pause levels need recalculating.
+        """
+        price = float(price)
+        quantity = float(quantity)
+        fee = float(fee or 0.0)
+
+        self.fill_count += 1
+        self.fees_paid += fee
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+
+        if side.lower() == "buy":
+            self.quantity += quantity
+            self.cost_basis += price * quantity + fee
+            self.last_entry_price = price
+            return True
+
+        sold = min(quantity, self.quantity)
+        avg = self.avg_entry_price
+        self.realized_pnl += (price - avg) * sold - fee
+        self.cost_basis -= avg * sold
+        self.quantity -= sold
+        if self.quantity <= QTY_EPSILON:
+            self.quantity = 0.0
+            self.cost_basis = 0.0
+        return False
+
+    def exit_levels(self) -> dict:
+        """Take-profit and stop/pause levels for the current average and last entry."""
+        if self.config is None or self.quantity <= QTY_EPSILON:
+            return {"take_profit": [], "stop_pause": {"stop": [], "pause": []}}
+        return {
+            "take_profit": calculate_take_profit_levels(self.config, self.avg_entry_price),
+            "stop_pause": calculate_stop_pause_levels(self.config, self.avg_entry_price, self.last_entry_price),
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "bot_id": self.bot_id,
+            "user_id": self.user_id,
+            "symbol": self.symbol,
+            "quantity": self.quantity,
+            "cost_basis": self.cost_basis,
+            "avg_entry_price": self.avg_entry_price,
+            "last_entry_price": self.last_entry_price,
+            "realized_pnl": self.realized_pnl,
+            "fees_paid": self.fees_paid,
+            "fill_count": self.fill_count,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_snapshot(cls, row: dict, config: Optional[BotConfig] = None) -> "PositionLedger":
+        ledger = cls(row["run_id"], config, row.get("bot_id", ""), row.get("user_id", ""), row.get("symbol", ""))
+        ledger.quantity = float(row.get("quantity") or 0.0)
+        ledger.cost_basis = float(row.get("cost_basis") or 0.0)
+        ledger.realized_pnl = float(row.get("realized_pnl") or 0.0)
+        ledger.fees_paid = float(row.get("fees_paid") or 0.0)
+        ledger.last_entry_price = float(row.get("last_entry_price") or 0.0)
+        ledger.fill_count = int(row.get("fill_count") or 0)
+        ledger.updated_at = row.get("updated_at") or ledger.updated_at
+        return ledger
+
+
+class PositionLedgerRegistry:
+    """
+    In-memory ledgers per run. Changed ledgers are persisted to
+    position_snapshots in one batched upsert by a background flusher.
+    A ledger is dropped when its run finishes (close()), or by the flusher
+    once it is clean and idle for LEDGER_IDLE_SECS, so memory tracks live runs.
+    """
+
+    def __init__(self):
+        self._ledgers: Dict[str, PositionLedger] = {}
+        self._touched: Dict[str, float] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def open(self, run_id: str, config: BotConfig) -> PositionLedger:
+        with self._lock:
+            ledger = self._ledgers.get(run_id)
+            if ledger is None:
+                ledger = PositionLedger(run_id, config)
+                self._ledgers[run_id] = ledger
+            elif ledger.config is None:
+                ledger.config = config
+            self._touched[run_id] = time.monotonic()
+            return ledger
+
+    def get(self, run_id: str, config: Optional[BotConfig] = None) -> Optional[PositionLedger]:
+        """Return the run's ledger, loading its last snapshot (one point read) if needed."""
+        with self._lock:
+            ledger = self._ledgers.get(run_id)
+        if ledger is not None:
+            if config is not None and ledger.config is None:
+                ledger.config = config
+            return ledger
+
+        response = (
+            supabase.table("position_snapshots")
+            .select("*")
+            .eq("run_id", run_id)
+            .limit(1)
+            .execute()
+        )
+        if not response.data:
+            return None
+
+        ledger = PositionLedger.from_snapshot(response.data[0], config)
+        with self._lock:
+            self._touched[run_id] = time.monotonic()
+            return self._ledgers.setdefault(run_id, ledger)
+
+    def mark_dirty(self, run_id: str):
+        with self._lock:
+            self._dirty.add(run_id)
+            self._touched[run_id] = time.monotonic()
+
+    def close(self, run_id: str):
+        """Flush and forget a finished run."""
+        self.flush()
+        with self._lock:
+            self._ledgers.pop(run_id, None)
+            self._touched.pop(run_id, None)
+
+    def evict_idle(self, idle_secs: float = LEDGER_IDLE_SECS) -> int:
+        """Forget flushed ledgers not used for `idle_secs`."""
+        cutoff = time.monotonic() - idle_secs
+        with self._lock:
+            idle = [run_id for run_id, at in self._touched.items() if at < cutoff and run_id not in self._dirty]
+            for run_id in idle:
+                self._ledgers.pop(run_id, None)
+                self._touched.pop(run_id, None)
+        return len(idle)
+
+    def flush(self) -> int:
+        with self._lock:
+            rows = [self._ledgers[run_id].snapshot() for run_id in self._dirty if run_id in self._ledgers]
+            self._dirty.clear()
+        if not rows:
+            return 0
+        try:
+            supabase.table("position_snapshots").upsert(rows, on_conflict="run_id").execute()
+        except Exception as e:
+            print(f"❌ Failed to flush {len(rows)} position snapshot(s): {e}")
+            with self._lock:
+                self._dirty.update(row["run_id"] for row in rows)
+            return 0
+        return len(rows)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="position-snapshots", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(SNAPSHOT_FLUSH_SECS)
+            self.flush()
+            self.evict_idle()
+
+
+position_ledgers = PositionLedgerRegistry()
+
+
+def record_fill(run_id: str, bot: Union[BotConfig, dict], side: str, price: float, quantity: float,
+                fee: float = 0.0) -> PositionLedger:
+    """
+    Apply a fill to the run's ledger and re-plan only the levels that depend
+    on the entry prices (take-profit, stop, pause). The DCA ladder is left as is.
+    """
+    config = BotConfig.coerce(bot)
+    ledger = position_ledgers.get(run_id, config) or position_ledgers.open(run_id, config)
+
+    if ledger.apply_fill(side, price, quantity, fee):
+        levels = ledger.exit_levels()
+        log_bot_plan(
+            ledger.bot_id, ledger.symbol, [], levels["take_profit"], levels["stop_pause"],
+            run_id=run_id, kinds=["take_profit", "stop", "pause"],
+        )
+
+    position_ledgers.mark_dirty(run_id)
+    portfolio.apply_fill(ledger.user_id, ledger.symbol, side, price, quantity, fee)
+    is_buy = side.lower() == "buy"
+    bump_run_summary(run_id, ledger.bot_id, ledger.user_id, fills=1,
+                     quantity=float(quantity) if is_buy else 0.0, amount=float(price) * float(quantity) if is_buy else 0.0)
+    return ledger
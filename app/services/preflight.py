@@ -5,6 +5,7 @@ from cryptography.fernet import Fernet
 from app.supabase_client import supabase
 from app.services.supabase_queries import get_user_exchange_keys, is_bot_already_running
 from app.services.exchange_client import get_exchange_client
+from app.services.capital_calculator import calculate_ladder_capital
 
 
 FERNET_KEY = os.getenv("FERNET_KEY")
@@ -52,7 +53,7 @@ def validate_bot(bot_id: str, user_id: str) -> Tuple[bool, dict | None, List[str
     required_fields = [
         "trading_pair", "initial_amount", "order_type",
         "dca_orders", "max_dca_orders", "dca_amount_mode",
-        "required_capital", "take_profit"
+        "take_profit"
     ]
 
     if order_type in ["conditional_market", "conditional_limit"]:
@@ -74,6 +75,14 @@ def validate_bot(bot_id: str, user_id: str) -> Tuple[bool, dict | None, List[str
     if bot["dca_amount_mode"] == "progressive" and not bot.get("multiplier"):
         errors.append("Multiplier is required for progressive DCA mode.")
 
+    # 6b. Required capital is computed server-side from the DCA ladder,
+    #     the client-supplied required_capital is not trusted
+    capital = calculate_ladder_capital([bot])[0]
+    if capital["error"]:
+        errors.append(f"Invalid DCA configuration: {capital['error']}")
+    elif bot.get("required_capital") not in [None, ""] and abs(float(bot["required_capital"]) - capital["required_capital"]) > 0.01:
+        warnings.append(f"⚠️ Required capital recalculated as {capital['required_capital']} (bot config says {bot['required_capital']}).")
+
     # 7. Check exchange connection
     exchange_keys = None
     if not bot.get("exchange"):
@@ -108,7 +117,7 @@ def validate_bot(bot_id: str, user_id: str) -> Tuple[bool, dict | None, List[str
                 if balance < bot["initial_amount"]:
                     errors.append("❌ Insufficient balance to place initial order.")
 
-            if balance < bot["required_capital"]:
+            if capital["required_capital"] is not None and balance < capital["required_capital"]:
                 warnings.append("⚠️ Balance is below required capital. Bot will start but may not complete all DCA steps.")
 
         except Exception as e:
@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from typing import cast, Any, Optional
 from typing import Optional
 from app.supabase_client import supabase
+from app.models.bot_config import BotConfig, OrderType, normalize_order_type
 from app.services.status_transition import (
     update_bot_status,
     log_bot_event,
@@ -10,19 +11,22 @@ from app.services.status_transition import (
 )
 from app.services.place_initial_order import place_initial_order
 from app.services.fetch_and_validate import fetch_and_validate_bot
-from app.services.calculate_dca_levels import calculate_dca_levels
+from app.services.calculate_dca_levels import calculate_dca_levels, require_dca_inputs
 from app.services.calculate_take_profit import calculate_take_profit_levels
 from app.services.calculate_stop_pause import calculate_stop_pause_levels
 from app.services.log_bot_plan import log_bot_plan
+from app.utils.tracing import traced
 
 
-def run_dca_bot(bot_id: str, user_id: str):
+@traced()
+def run_dca_bot(bot_id: str, user_id: str, entry_key: Optional[str] = None):
     print(f"🚀 Running DCA bot for bot_id={bot_id}")
     run_id: Optional[str] = None
 
     try:
         # Step 1: Fetch bot config and exchange keys
         bot, exchange_keys = fetch_and_validate_bot(bot_id, user_id)
+        config = BotConfig.from_row(bot)
 
         # Step 2: Insert new run
         run_payload = {
@@ -31,6 +35,9 @@ def run_dca_bot(bot_id: str, user_id: str):
             "status": "running",
             "started_at": datetime.utcnow().isoformat(),
         }
+        if entry_key:
+            # Unique per journaled webhook, so a replay can tell the run already exists
+            run_payload["entry_key"] = entry_key
         run_resp = supabase.table("bot_runs").insert(run_payload).execute()
         if not run_resp.data:
             raise ValueError("❌ Failed to insert new run into bot_runs table")
@@ -42,21 +49,20 @@ def run_dca_bot(bot_id: str, user_id: str):
         update_bot_status(bot_id, "running")
         update_bot_run_status(run_id, "running")
 
-        trading_pair = bot.get("trading_pair")
-        order_type_raw = bot.get("order_type")
-        order_type = str(order_type_raw).strip().replace(" ", "_").lower() if order_type_raw else ""
-        limit_price = bot.get("limit_price")
+        trading_pair = config.trading_pair
+        order_type = config.order_type
 
-        valid_order_types = ["market", "limit", "conditional_market", "conditional_limit"]
-        if order_type not in valid_order_types:
-            raise ValueError(f"Invalid order type: '{order_type_raw}' (normalized: '{order_type}')")
+        if order_type is None:
+            order_type_raw = bot.get("order_type")
+            raise ValueError(f"Invalid order type: '{order_type_raw}' (normalized: '{normalize_order_type(order_type_raw)}')")
 
-        if order_type in ["market", "limit"]:
-            if order_type == "limit" and not limit_price:
+        if not order_type.is_conditional:
+            if order_type == OrderType.LIMIT and not config.limit_price:
                 raise ValueError("Limit price required for limit order")
+            require_dca_inputs(config)
 
             # Step 3: Place initial order
-            order_result = place_initial_order(bot, exchange_keys)
+            order_result = place_initial_order(config, exchange_keys, run_id=run_id)
 
             log_bot_event(run_id, bot_id, user_id, "initial_order_placed", order_result)
 
@@ -70,12 +76,12 @@ def run_dca_bot(bot_id: str, user_id: str):
             last_entry = float(last_entry_raw)
 
             # Step 4: Calculate full logic levels
-            dca_levels = calculate_dca_levels(bot, last_entry)
-            tp_levels = calculate_take_profit_levels(bot, avg_entry)
-            stop_pause_levels = calculate_stop_pause_levels(bot, avg_entry, last_entry)
+            dca_levels = calculate_dca_levels(config, last_entry)
+            tp_levels = calculate_take_profit_levels(config, avg_entry)
+            stop_pause_levels = calculate_stop_pause_levels(config, avg_entry, last_entry)
 
             # Step 5: Log plan
-            log_bot_plan(bot_id, trading_pair, dca_levels, tp_levels, stop_pause_levels)
+            log_bot_plan(bot_id, trading_pair, dca_levels, tp_levels, stop_pause_levels, run_id=run_id)
 
             return {
                 "status": "running",
@@ -83,56 +89,61 @@ def run_dca_bot(bot_id: str, user_id: str):
                 "initial_order": order_result
             }
 
-        elif order_type in ["conditional_market", "conditional_limit"]:
-            print(f"⏳ Waiting for webhook to trigger {order_type.upper().replace('_', ' ')} order")
+        else:
+            print(f"⏳ Waiting for webhook to trigger {order_type.value.upper().replace('_', ' ')} order")
+            try:
+                # Kline sync picks volatility bots up by itself; warn now if the entry would be rejected
+                require_dca_inputs(config)
+            except ValueError as e:
+                print(f"⚠️ {e}; entry will be rejected until the data is available")
             log_bot_event(run_id, bot_id, user_id, "waiting_for_condition", {
-                "order_type": order_type
+                "order_type": order_type.value
             })
             update_bot_run_status(run_id, "waiting")
             return {
                 "status": "waiting",
-                "reason": order_type,
+                "reason": order_type.value,
                 "run_id": run_id
             }
 
     except Exception as e:
         print(f"❌ Bot execution failed: {e}")
         if run_id:
-            update_bot_run_status(run_id, "failed")
-            update_bot_status(bot_id, "error")
-            log_bot_event(run_id, bot_id, user_id, "error", {"message": str(e)})
+            # Best effort: when the database itself is failing these fail fast
+            # (open circuit) instead of masking the original error
+            try:
+                update_bot_run_status(run_id, "failed")
+                update_bot_status(bot_id, "error")
+                log_bot_event(run_id, bot_id, user_id, "error", {"message": str(e)})
+            except Exception as status_error:
+                print(f"❌ Failed to record failure for run {run_id}: {status_error}")
         return {"error": str(e)}
     
 from app.services.fetch_and_validate import fetch_and_validate_bot
 
-def trigger_bot_condition(bot_id: str, user_id: str, run_id: Optional[str] = None):
+@traced()
+def trigger_bot_condition(bot_id: str, user_id: str, run_id: Optional[str] = None,
+                          entry_key: Optional[str] = None):
     now_utc = datetime.now(timezone.utc).isoformat()
     print(f"🚀 Triggering entry condition for bot_id: {bot_id}, user_id: {user_id}, run_id: {run_id}")
 
     # ✅ Use same logic as non-webhook bot to fetch bot and decrypted keys
     try:
         bot, keys = fetch_and_validate_bot(bot_id, user_id, allow_running=True)
+        config = BotConfig.from_row(bot)
     except Exception as e:
         print(f"❌ Failed to fetch bot or exchange keys: {e}")
         return {"error": str(e)}
 
-    # ✅ Mark entry condition as triggered
-    condition_update = supabase.table("bot_conditions").update({
-        "status": "triggered",
-        "triggered_at": now_utc,
-        "updated_at": now_utc
-    }).match({
-        "bot_id": bot_id,
-        "type": "entry",
-        "status": "waiting"
-    }).execute()
-
-    if getattr(condition_update, "error", None):
-        print(f"❌ Failed to update bot_conditions: {condition_update.error}")
-    else:
-        print(f"✅ Updated {len(condition_update.data)} condition(s) to status=triggered")
+    # ✅ Checked before anything is marked triggered or ordered
+    try:
+        require_dca_inputs(config)
+    except ValueError as e:
+        print(f"❌ Cannot enter bot {bot_id}: {e}")
+        return {"error": str(e)}
 
-    # ✅ Resolve run_id if not provided
+    # ✅ Resolve run_id if not provided; the order, trades and plan all hang off
+    # the run, so without one nothing is triggered or ordered
     if not run_id:
         run_resp = (
             supabase.table("bot_runs")
@@ -146,24 +157,40 @@ def trigger_bot_condition(bot_id: str, user_id: str, run_id: Optional[str] = Non
         )
         if getattr(run_resp, "error", None):
             print(f"❌ Error fetching bot_runs: {run_resp.error}")
-        elif run_resp.data:
-            run_id = run_resp.data[0]["run_id"]
-            print(f"🔁 Resolved run_id from waiting: {run_id}")
-        else:
+            return {"error": f"Failed to resolve waiting run: {run_resp.error}"}
+        if not run_resp.data:
             print("⚠️ No waiting bot_run found for this bot")
+            return {"error": "No waiting run_id found"}
+        run_id = run_resp.data[0]["run_id"]
+        print(f"🔁 Resolved run_id from waiting: {run_id}")
+
+    # ✅ Mark entry condition as triggered
+    condition_update = supabase.table("bot_conditions").update({
+        "status": "triggered",
+        "triggered_at": now_utc,
+        "updated_at": now_utc
+    }).match({
+        "bot_id": bot_id,
+        "type": "entry",
+        "status": "waiting"
+    }).execute()
+
+    if getattr(condition_update, "error", None):
+        print(f"❌ Failed to update bot_conditions: {condition_update.error}")
+    else:
+        print(f"✅ Updated {len(condition_update.data)} condition(s) to status=triggered")
 
     # ✅ Update bot_run and bot status
-    if run_id:
-        update_bot_run_status(run_id, "running")
-        log_bot_event(run_id, bot_id, user_id, "entry_triggered", {
-            "message": "Entry condition triggered by webhook"
-        })
+    update_bot_run_status(run_id, "running")
+    log_bot_event(run_id, bot_id, user_id, "entry_triggered", {
+        "message": "Entry condition triggered by webhook"
+    })
 
-    if bot.get("status") != "running":
+    if config.status != "running":
         update_bot_status(bot_id, "running")
 
     # ✅ Place the initial order
-    order_result = place_initial_order(bot, keys)
+    order_result = place_initial_order(config, keys, run_id=run_id, entry_key=entry_key)
     print("✅ Initial order placement complete")
 
     # ✅ Post-order logic
@@ -177,13 +204,13 @@ def trigger_bot_condition(bot_id: str, user_id: str, run_id: Optional[str] = Non
     last_entry = float(last_entry_raw)
 
     # ✅ Calculate logic levels
-    dca_levels = calculate_dca_levels(bot, last_entry)
-    tp_levels = calculate_take_profit_levels(bot, avg_entry)
-    stop_pause_levels = calculate_stop_pause_levels(bot, avg_entry, last_entry)
+    dca_levels = calculate_dca_levels(config, last_entry)
+    tp_levels = calculate_take_profit_levels(config, avg_entry)
+    stop_pause_levels = calculate_stop_pause_levels(config, avg_entry, last_entry)
 
     # ✅ Log plan
-    trading_pair = bot.get("trading_pair") or "UNKNOWN"
-    log_bot_plan(bot_id, trading_pair, dca_levels, tp_levels, stop_pause_levels)
+    trading_pair = config.trading_pair or "UNKNOWN"
+    log_bot_plan(bot_id, trading_pair, dca_levels, tp_levels, stop_pause_levels, run_id=run_id)
 
     return {
         "status": "running",
@@ -0,0 +1,83 @@
+# app/services/run_summaries.py
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.supabase_client import supabase, read_router
+
+# Run status implied by a bot event; events not listed leave the status unchanged.
+# "started" is logged by /bots/start after the run exists as either running or
+# waiting (set by the events below), so it must not imply a status of its own.
+EVENT_STATUS = {
+    "initial_order_placed": "running",
+    "waiting_for_condition": "waiting",
+    "entry_triggered": "running",
+    "entry_executed": "executed",
+    "paused": "paused",
+    "resumed": "running",
+    "stopped": "stopped",
+    "error": "failed",
+}
+
+ENDED_STATUSES = ("stopped", "failed", "completed")
+
+
+def bump_run_summary(run_id: Optional[str], bot_id: str, user_id: Optional[str] = None,
+                     event: Optional[str] = None, status: Optional[str] = None, fills: int = 0,
+                     quantity: float = 0.0, amount: float = 0.0, plan_levels: Optional[int] = None):
+    """
+    Apply one change to the run's bot_run_summaries row in a single RPC.
+    Counters are added, last-* fields replaced. Never raises: the summary is a
+    projection and must not fail the trading path that feeds it.
+    """
+    if not run_id:
+        return
+    try:
+        supabase.rpc("bump_run_summary", {
+            "p_run_id": run_id,
+            "p_bot_id": bot_id,
+            "p_user_id": user_id,
+            "p_event": event,
+            "p_status": status or (EVENT_STATUS.get(event) if event else None),
+            "p_fills": fills,
+            "p_quantity": quantity,
+            "p_amount": amount,
+            "p_plan_levels": plan_levels,
+            "p_error": event == "error",
+            "p_at": datetime.now(timezone.utc).isoformat(),
+        }).execute()
+    except Exception as e:
+        print(f"❌ Failed to update run summary for run_id={run_id}: {e}")
+
+
+def _with_derived(row: dict) -> dict:
+    started = datetime.fromisoformat(str(row["started_at"]).replace("Z", "+00:00"))
+    ended = row.get("ended_at")
+    end = datetime.fromisoformat(str(ended).replace("Z", "+00:00")) if ended else datetime.now(timezone.utc)
+    if started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    quantity = float(row.get("bought_quantity") or 0.0)
+    row["duration_secs"] = max(int((end - started).total_seconds()), 0)
+    row["avg_entry_price"] = float(row.get("bought_amount") or 0.0) / quantity if quantity > 0 else None
+    row["active"] = row.get("status") not in ENDED_STATUSES
+    return row
+
+
+def get_user_run_summaries(user_id: str, status: Optional[str] = None, bot_id: Optional[str] = None,
+                           limit: int = 50) -> list:
+    """A user's runs, newest first, from one read on (user_id, started_at)."""
+    query = (
+        read_router.client_for("run_summaries.list_user", bot_id=bot_id, user_id=user_id)
+        .table("bot_run_summaries")
+        .select("*")
+        .eq("user_id", user_id)
+    )
+    if status:
+        query = query.eq("status", status)
+    if bot_id:
+        query = query.eq("bot_id", bot_id)
+    response = query.order("started_at", desc=True).limit(limit).execute()
+    return [_with_derived(row) for row in response.data or []]
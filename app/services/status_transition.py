@@ -1,5 +1,11 @@
 from datetime import datetime, timezone
 from app.supabase_client import supabase
+from app.services.run_summaries import bump_run_summary
+from app.services.position_ledger import position_ledgers
+from app.utils.tracing import traced, current_trace_id
+
+# Runs in these states take no more fills, so their in-memory position is released
+FINISHED_RUN_STATUSES = ("stopped", "completed", "failed")
 
 def uses_webhook(bot_id: str) -> bool:
     try:
@@ -20,6 +26,7 @@ def uses_webhook(bot_id: str) -> bool:
         print(f"❌ Exception in uses_webhook(): {e}")
         return False
 
+@traced()
 def update_bot_status(bot_id: str, new_status: str):
     try:
         update_payload = {
@@ -41,8 +48,12 @@ def update_bot_status(bot_id: str, new_status: str):
     except Exception as e:
         print(f"❌ Exception while updating bot status for bot_id={bot_id}: {e}")
 
+@traced()
 def log_bot_event(run_id: str, bot_id: str, user_id: str, event_type: str, metadata: dict = {}):
     try:
+        trace_id = current_trace_id()
+        if trace_id:
+            metadata = {**(metadata or {}), "trace_id": trace_id}
         payload = {
             "run_id": run_id,
             "bot_id": bot_id,
@@ -57,9 +68,11 @@ def log_bot_event(run_id: str, bot_id: str, user_id: str, event_type: str, metad
             print(f"❌ Failed to log bot event '{event_type}': {getattr(response, 'error', 'Unknown error')}")
         else:
             print(f"📋 Logged bot event: {event_type}")
+            bump_run_summary(run_id, bot_id, user_id, event=event_type)
     except Exception as e:
         print(f"❌ Exception while logging bot event '{event_type}': {e}")
 
+@traced()
 def update_bot_run_status(run_id: str, new_status: str):
     try:
         response = (
@@ -75,6 +88,11 @@ def update_bot_run_status(run_id: str, new_status: str):
             print(f"❌ Failed to update bot_run status: {getattr(response, 'error', 'Unknown error')}")
         else:
             print(f"✅ Bot run status updated to '{new_status}' for run_id={run_id}")
+            if response.data:
+                bump_run_summary(run_id, response.data[0].get("bot_id"), response.data[0].get("user_id"),
+                                 status=new_status)
+            if new_status in FINISHED_RUN_STATUSES:
+                position_ledgers.close(run_id)
     except Exception as e:
         print(f"❌ Exception while updating bot run status: {e}")
 
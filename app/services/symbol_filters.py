@@ -0,0 +1,210 @@
+# app/services/symbol_filters.py
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+import numpy as np
+from binance.client import Client as BinanceClient
+
+SYMBOL_FILTERS_SNAPSHOT = os.getenv("SYMBOL_FILTERS_SNAPSHOT", "data/symbol_filters.json")
+SYMBOL_FILTERS_REFRESH_SECS = float(os.getenv("SYMBOL_FILTERS_REFRESH_SECS", "3600"))
+# Minimum gap between on-demand fetches when a symbol is missing from the cache
+SYMBOL_FILTERS_RETRY_SECS = float(os.getenv("SYMBOL_FILTERS_RETRY_SECS", "60"))
+
+UNITS_EPSILON = 1e-9  # absorbs float error when a value already sits on a tick/step
+
+
+def decimals(increment: str) -> int:
+    """'0.01000000' -> 2, '1.00000000' -> 0"""
+    _, _, fraction = str(increment).partition(".")
+    return len(fraction.rstrip("0"))
+
+
+def snap(values, increment: float, precision: int, mode: str = "nearest") -> np.ndarray:
+    """Snap every value onto the increment grid; mode is 'nearest', 'down' or 'up'."""
+    values = np.asarray(values, dtype=np.float64)
+    if increment <= 0:
+        return values
+    units = values / increment
+    if mode == "down":
+        units = np.floor(units + UNITS_EPSILON)
+    elif mode == "up":
+        units = np.ceil(units - UNITS_EPSILON)
+    else:
+        units = np.floor(units + 0.5)
+    return np.round(units * increment, precision)
+
+
+@dataclass(frozen=True, slots=True)
+class SymbolFilters:
+    symbol: str
+    tick_size: float = 0.0
+    price_precision: int = 8
+    min_price: float = 0.0
+    max_price: float = 0.0
+    step_size: float = 0.0
+    quantity_precision: int = 8
+    min_qty: float = 0.0
+    max_qty: float = 0.0
+    min_notional: float = 0.0
+
+    @classmethod
+    def from_symbol_info(cls, info: dict) -> "SymbolFilters":
+        """Parse one entry of Binance exchange_info()["symbols"]."""
+        fields = {"symbol": info["symbol"]}
+        for f in info.get("filters", []):
+            kind = f.get("filterType")
+            if kind == "PRICE_FILTER":
+                fields.update(
+                    tick_size=float(f["tickSize"]), price_precision=decimals(f["tickSize"]),
+                    min_price=float(f["minPrice"]), max_price=float(f["maxPrice"]),
+                )
+            elif kind == "LOT_SIZE":
+                fields.update(
+                    step_size=float(f["stepSize"]), quantity_precision=decimals(f["stepSize"]),
+                    min_qty=float(f["minQty"]), max_qty=float(f["maxQty"]),
+                )
+            elif kind in ("MIN_NOTIONAL", "NOTIONAL"):
+                fields["min_notional"] = float(f.get("minNotional") or 0.0)
+        return cls(**fields)
+
+    def quantize_prices(self, prices, mode: str = "nearest") -> np.ndarray:
+        snapped = snap(prices, self.tick_size, self.price_precision, mode)
+        if self.min_price > 0:
+            snapped = np.maximum(snapped, self.min_price)
+        if self.max_price > 0:
+            snapped = np.minimum(snapped, self.max_price)
+        return snapped
+
+    def quantize_quantities(self, quantities) -> np.ndarray:
+        """Quantities are always rounded down so an order never spends more than its amount."""
+        snapped = snap(quantities, self.step_size, self.quantity_precision, "down")
+        if self.max_qty > 0:
+            snapped = np.minimum(snapped, self.max_qty)
+        return snapped
+
+    def quantities_for(self, amounts, prices) -> np.ndarray:
+        """Quote amounts at given prices -> valid base quantities."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw = np.where(np.asarray(prices) > 0, np.asarray(amounts, dtype=np.float64) / np.asarray(prices), 0.0)
+        return self.quantize_quantities(raw)
+
+    def valid(self, prices, quantities) -> np.ndarray:
+        """Mask of orders that pass LOT_SIZE minimum and MIN_NOTIONAL."""
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        return (quantities >= max(self.min_qty, UNITS_EPSILON)) & (prices * quantities >= self.min_notional)
+
+    def check_order(self, price: float, quantity: float):
+        if not self.valid([price], [quantity])[0]:
+            raise ValueError(
+                f"{self.symbol} order of {quantity} @ {price} is below the exchange minimum "
+                f"(min qty {self.min_qty}, min notional {self.min_notional})"
+            )
+
+
+class SymbolFilterCache:
+    """
+    Trading filters for every symbol, from one exchange_info request.
+    Loaded from the local snapshot when available (fast startup, no request
+    weight) and refreshed in the background. An unknown symbol never blocks
+    its caller on the network: get() returns None right away (callers fall
+    back to plain rounding) and schedules a background re-fetch, at most every
+    SYMBOL_FILTERS_RETRY_SECS. Symbols of other venues (e.g. paper pairs not
+    listed on Binance) therefore cost nothing on the order path.
+    """
+
+    def __init__(self, snapshot_path: str = SYMBOL_FILTERS_SNAPSHOT):
+        self.snapshot_path = snapshot_path
+        self.loaded_at = 0.0
+        self._filters: Dict[str, SymbolFilters] = {}
+        self._last_fetch = 0.0
+        self._fetching = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self, symbol: str) -> Optional[SymbolFilters]:
+        """Filters for a symbol, or None if they can't be loaded (callers fall back to plain rounding)."""
+        symbol = (symbol or "").upper()
+        filters = self._filters.get(symbol)
+        if filters is not None:
+            return filters
+        if not self._filters:
+            self.load_snapshot()
+        filters = self._filters.get(symbol)
+        if filters is None:
+            self._refresh_in_background()
+        return filters
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._fetching or time.monotonic() - self._last_fetch < SYMBOL_FILTERS_RETRY_SECS:
+                return
+            self._fetching = True
+            self._last_fetch = time.monotonic()
+        threading.Thread(target=self._fetch_missing, name="symbol-filters-fetch", daemon=True).start()
+
+    def _fetch_missing(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"❌ Failed to fetch exchange filters: {e}")
+        finally:
+            with self._lock:
+                self._fetching = False
+
+    def load_snapshot(self) -> bool:
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        filters = {row["symbol"]: SymbolFilters(**row) for row in data.get("symbols", [])}
+        with self._lock:
+            self._filters = filters
+            self.loaded_at = float(data.get("fetched_at") or 0.0)
+        return True
+
+    def refresh(self, client=None) -> int:
+        """One exchange_info request for all symbols; the snapshot is replaced atomically."""
+        with self._lock:
+            self._last_fetch = time.monotonic()
+        info = (client or BinanceClient()).get_exchange_info()
+        filters = {s["symbol"]: SymbolFilters.from_symbol_info(s) for s in info.get("symbols", [])}
+        fetched_at = time.time()
+
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fetched_at": fetched_at, "symbols": [asdict(v) for v in filters.values()]}, f)
+        os.replace(tmp, self.snapshot_path)
+
+        with self._lock:
+            self._filters = filters
+            self.loaded_at = fetched_at
+        print(f"📏 Loaded trading filters for {len(filters)} symbols")
+        return len(filters)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="symbol-filters", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                # Another worker may have refreshed the shared snapshot already
+                self.load_snapshot()
+                if time.time() - self.loaded_at >= SYMBOL_FILTERS_REFRESH_SECS:
+                    self.refresh()
+            except Exception as e:
+                print(f"❌ Symbol filter refresh failed: {e}")
+            time.sleep(max(self.loaded_at + SYMBOL_FILTERS_REFRESH_SECS - time.time(), SYMBOL_FILTERS_RETRY_SECS))
+
+
+symbol_filters = SymbolFilterCache()
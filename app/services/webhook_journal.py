@@ -0,0 +1,297 @@
+# app/services/webhook_journal.py
+
+import asyncio
+import fcntl
+import inspect
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+JOURNAL_DIR = os.getenv("WEBHOOK_JOURNAL_DIR", "data/journal")
+JOURNAL_SEGMENT_BYTES = int(os.getenv("WEBHOOK_JOURNAL_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+JOURNAL_FLUSH_MS = float(os.getenv("WEBHOOK_JOURNAL_FLUSH_MS", "2"))
+JOURNAL_MAX_BATCH = int(os.getenv("WEBHOOK_JOURNAL_MAX_BATCH", "1000"))
+JOURNAL_MAX_SLOTS = int(os.getenv("WEBHOOK_JOURNAL_MAX_SLOTS", "64"))
+
+HEADER = struct.Struct("<II")  # payload length, crc32
+
+Offset = Tuple[int, int]  # (segment number, byte position after the record)
+
+
+class WebhookJournal:
+    """
+    Append-only, fsync'd journal of accepted webhooks.
+
+    append() returns only after the record is durable. Concurrent appends are
+    group-committed: a writer thread writes everything queued within
+    WEBHOOK_JOURNAL_FLUSH_MS and fsyncs once. Processed records are committed
+    through commit(offset); the committed offset only advances past a
+    contiguous prefix, so on restart replay() re-runs exactly the records whose
+    processing never finished.
+
+    Each worker process claims its own slot directory (journal/0, journal/1, ...)
+    with an flock, so workers never share a file. At startup a worker replays
+    its own slot and every other slot whose lock it can take, so slots left
+    behind when the worker count shrinks are still replayed.
+    """
+
+    def __init__(self, root: str = JOURNAL_DIR):
+        self.root = root
+        self.dir: Optional[str] = None
+        self._handlers: Dict[str, Callable] = {}
+        self._queue: "queue.Queue[Tuple[bytes, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._slot_lock = None
+        self._segment = 0
+        self._file = None
+        self._position = 0
+        self._pending: deque = deque()  # offsets appended but not yet committed, in order
+        self._done = set()
+        self._committed: Offset = (0, 0)
+        self._committed_dirty = False
+        self._thread = None
+
+    # --- Setup -----------------------------------------------------------
+
+    def register(self, kind: str, handler: Callable):
+        """Handler used by replay() for records of this kind (sync or async)."""
+        self._handlers[kind] = handler
+
+    def open(self):
+        if self.dir:
+            return
+        self.dir = self._claim_slot()
+        self._committed = self._read_committed()
+        # New appends always start a fresh segment; older ones are left for replay()
+        segments = self._segments()
+        self._open_segment((segments[-1] if segments else self._committed[0]) + 1)
+        self._thread = threading.Thread(target=self._writer_loop, name="webhook-journal", daemon=True)
+        self._thread.start()
+        print(f"📓 Webhook journal open at {self.dir} (committed={self._committed})")
+
+    def _claim_slot(self) -> str:
+        for slot in range(JOURNAL_MAX_SLOTS):
+            path = os.path.join(self.root, str(slot))
+            os.makedirs(path, exist_ok=True)
+            lock = open(os.path.join(path, ".lock"), "w")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                continue
+            self._slot_lock = lock
+            return path
+        raise RuntimeError("No free webhook journal slot")
+
+    def _segments(self, directory: Optional[str] = None) -> list:
+        return sorted(int(name[:-4]) for name in os.listdir(directory or self.dir) if name.endswith(".log"))
+
+    def _segment_path(self, segment: int, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.dir, f"{segment:012d}.log")
+
+    def _open_segment(self, segment: int):
+        if self._file:
+            self._file.close()
+        self._segment = segment
+        self._file = open(self._segment_path(segment), "ab")
+        self._position = self._file.tell()
+
+    # --- Offsets ---------------------------------------------------------
+
+    def _read_committed(self, directory: Optional[str] = None) -> Offset:
+        try:
+            with open(os.path.join(directory or self.dir, "committed.json")) as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["position"])
+        except (FileNotFoundError, ValueError, KeyError):
+            return (0, 0)
+
+    def _write_committed(self, directory: Optional[str] = None, committed: Optional[Offset] = None):
+        directory = directory or self.dir
+        committed = committed or self._committed
+        path = os.path.join(directory, "committed.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": committed[0], "position": committed[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        # Segments fully behind the committed offset are no longer needed
+        for segment in self._segments(directory):
+            if segment < committed[0]:
+                os.remove(self._segment_path(segment, directory))
+
+    def commit(self, offset: Optional[Offset]):
+        """Mark a record as processed. Persisted by the writer thread."""
+        if offset is None:
+            return
+        with self._lock:
+            self._done.add(offset)
+            while self._pending and self._pending[0] in self._done:
+                head = self._pending.popleft()
+                self._done.discard(head)
+                self._committed = head
+                self._committed_dirty = True
+
+    # --- Append ----------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]) -> Future:
+        """Queue a record; the returned future resolves to its offset once fsync'd."""
+        if not self.dir:
+            self.open()
+        payload = json.dumps(record, default=str).encode()
+        future: Future = Future()
+        self._queue.put((HEADER.pack(len(payload), zlib.crc32(payload)) + payload, future))
+        return future
+
+    async def append_async(self, record: Dict[str, Any]) -> Offset:
+        return await asyncio.wrap_future(self.append(record))
+
+    def _writer_loop(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                self._flush_committed()
+                continue
+
+            # Group commit: gather whatever else arrives within the flush window
+            deadline = time.monotonic() + JOURNAL_FLUSH_MS / 1000
+            while len(batch) < JOURNAL_MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                offsets = []
+                for data, _ in batch:
+                    if self._position >= JOURNAL_SEGMENT_BYTES:
+                        self._file.flush()
+                        os.fsync(self._file.fileno())
+                        self._open_segment(self._segment + 1)
+                    self._file.write(data)
+                    self._position += len(data)
+                    offsets.append((self._segment, self._position))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self._pending.extend(offsets)
+            for (_, future), offset in zip(batch, offsets):
+                future.set_result(offset)
+            self._flush_committed()
+
+    def _flush_committed(self):
+        with self._lock:
+            if not self._committed_dirty:
+                return
+            self._committed_dirty = False
+        try:
+            self._write_committed()
+        except Exception as e:
+            print(f"❌ Failed to persist webhook journal offset: {e}")
+
+    # --- Replay ----------------------------------------------------------
+
+    def _read_from(self, start: Offset, directory: Optional[str] = None):
+        """Yield (offset, record) after `start`; stops at a torn or corrupt tail."""
+        for segment in self._segments(directory):
+            if segment < start[0]:
+                continue
+            position = start[1] if segment == start[0] else 0
+            with open(self._segment_path(segment, directory), "rb") as f:
+                f.seek(position)
+                while True:
+                    header = f.read(HEADER.size)
+                    if len(header) < HEADER.size:
+                        break
+                    length, crc = HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        print(f"⚠️ Webhook journal: torn record in segment {segment} at {position}, stopping replay")
+                        return
+                    position += HEADER.size + length
+                    yield (segment, position), json.loads(payload)
+
+    async def _run_handler(self, offset: Offset, record: dict) -> bool:
+        """Run one record's handler; sync handlers go to the threadpool so the event loop stays free."""
+        handler = self._handlers.get(record.get("kind"))
+        try:
+            if handler is None:
+                print(f"⚠️ No journal handler for kind={record.get('kind')}, skipping")
+                return False
+            if inspect.iscoroutinefunction(handler):
+                await handler(record)
+            else:
+                result = await run_in_threadpool(handler, record)
+                if inspect.isawaitable(result):
+                    await result
+            return True
+        except Exception as e:
+            print(f"❌ Replay of journal record {offset} failed: {e}")
+            return False
+
+    async def replay(self) -> int:
+        """
+        Re-run every record after the committed offset, in order, then the
+        records of every unowned slot. Run at startup before requests are served.
+        """
+        if not self.dir:
+            self.open()
+        records = [(offset, record) for offset, record in self._read_from(self._committed)
+                   if offset[0] < self._segment]
+        with self._lock:
+            # Older segments sort before anything appended since open()
+            self._pending.extendleft(offset for offset, _ in reversed(records))
+
+        replayed = 0
+        for offset, record in records:
+            replayed += await self._run_handler(offset, record)
+            self.commit(offset)
+        self._flush_committed()
+
+        replayed += await self._replay_unowned()
+        print(f"📓 Replayed {replayed} webhook(s) from journal")
+        return replayed
+
+    async def _replay_unowned(self) -> int:
+        """Replay and commit slots no live worker holds, e.g. after the worker count went down."""
+        replayed = 0
+        for slot in range(JOURNAL_MAX_SLOTS):
+            path = os.path.join(self.root, str(slot))
+            if path == self.dir or not os.path.isdir(path):
+                continue
+            lock = open(os.path.join(path, ".lock"), "w")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                continue
+            try:
+                for offset, record in self._read_from(self._read_committed(path), path):
+                    replayed += await self._run_handler(offset, record)
+                    self._write_committed(path, offset)
+            finally:
+                lock.close()
+        return replayed
+
+
+webhook_journal = WebhookJournal()
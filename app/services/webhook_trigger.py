@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from typing import cast
 from app.supabase_client import supabase
+from app.models.bot_config import BotConfig
 from app.services.status_transition import (
     update_bot_run_status,
     update_bot_status,
@@ -79,8 +80,10 @@ def trigger_bot_condition(bot_id: str, user_id: str, run_id: Optional[str] = Non
         "message": "Webhook triggered entry execution"
     })
 
+    config = BotConfig.from_row(bot)
+
     # ✅ Place the initial order
-    order_result = place_initial_order(bot, keys)
+    order_result = place_initial_order(config, keys, run_id=run_id)
     if not order_result:
         return {"error": "Order placement failed"}
 
@@ -94,13 +97,13 @@ def trigger_bot_condition(bot_id: str, user_id: str, run_id: Optional[str] = Non
     last_entry = float(last_entry_raw)
 
     # ✅ Calculate logic
-    dca_levels = calculate_dca_levels(bot, last_entry)
-    tp_levels = calculate_take_profit_levels(bot, avg_entry)
-    stop_levels = calculate_stop_pause_levels(bot, avg_entry, last_entry)
+    dca_levels = calculate_dca_levels(config, last_entry)
+    tp_levels = calculate_take_profit_levels(config, avg_entry)
+    stop_levels = calculate_stop_pause_levels(config, avg_entry, last_entry)
 
     # ✅ Log full plan
-    trading_pair = bot.get("trading_pair") or "UNKNOWN"
-    log_bot_plan(bot_id, trading_pair, dca_levels, tp_levels, stop_levels)
+    trading_pair = config.trading_pair or "UNKNOWN"
+    log_bot_plan(bot_id, trading_pair, dca_levels, tp_levels, stop_levels, run_id=run_id)
 
     return {
         "status": "running",
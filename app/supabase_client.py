@@ -1,14 +1,43 @@
-from supabase import create_client, Client
 from dotenv import load_dotenv
-import os
 
+# Before the app imports below: they read their settings from the environment at import time
 load_dotenv()
 
+from supabase import create_client, Client
+from app.utils.db_policy import ResilientClient
+from app.utils.read_routing import ReadRouter
+from app.utils.etag import validator_cache
+import os
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+# Optional read-only endpoint (replica) for dashboard reads
+SUPABASE_READ_URL = os.getenv("SUPABASE_READ_URL")
+SUPABASE_READ_KEY = os.getenv("SUPABASE_READ_KEY") or SUPABASE_KEY
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise RuntimeError("Supabase credentials not found in .env")
 
 # Tell Pylance: these are definitely strings
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)  # type: ignore
+raw_client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)  # type: ignore
+
+# Every query goes through retries, hedged reads and per-table circuit breakers
+supabase = ResilientClient(raw_client)
+
+supabase_replica = (
+    ResilientClient(create_client(SUPABASE_READ_URL, SUPABASE_READ_KEY))  # type: ignore
+    if SUPABASE_READ_URL else None
+)
+
+# Routes named read queries to the replica; writes through `supabase` make the
+# touched bot/user stick to the primary for READ_YOUR_WRITES_SECS
+read_router = ReadRouter(supabase, supabase_replica)
+
+
+def _on_write(keys: set):
+    read_router.mark_write(keys)
+    # Cached ETags of the touched bots are no longer current
+    validator_cache.invalidate(keys)
+
+
+supabase.on_write = _on_write
@@ -0,0 +1,45 @@
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+
+def archive_path(category: str, name: str, suffix: str = "jsonl.gz") -> str:
+    """archive/<category>/<name>-<YYYYmmddTHHMMSS>.<suffix>"""
+    folder = os.path.join(ARCHIVE_DIR, category)
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return os.path.join(folder, f"{name}-{stamp}.{suffix}")
+
+
+def append_rows(path: str, rows: list) -> int:
+    """
+    Append rows as gzip-compressed JSON lines.
+    Each call adds a new gzip member, so batches can be appended to the same file.
+    """
+    if not rows:
+        return 0
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + "\n")
+    return len(rows)
+
+
+def write_columnar(path: str, rows: list) -> int:
+    """
+    Write rows as a gzip-compressed column-oriented JSON document:
+    {"columns": {"col": [v1, v2, ...], ...}, "count": n}
+    """
+    if not rows:
+        return 0
+    names = []
+    for row in rows:
+        for name in row:
+            if name not in names:
+                names.append(name)
+    columns = {name: [row.get(name) for row in rows] for name in names}
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"columns": columns, "count": len(rows)}, f, default=str)
+    return len(rows)
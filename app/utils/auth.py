@@ -1,6 +1,97 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
 import jwt
 from fastapi import Header, HTTPException
-from typing import Optional
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or (
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_CACHE_SECS = int(os.getenv("JWKS_CACHE_SECS", "600"))
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+ALLOWED_ALGORITHMS = ["HS256", "RS256", "ES256"]
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+class TokenCache:
+    """
+    Bounded LRU of sha256(token) -> (user_id, exp).
+    Entries expire at the token's own `exp`, so a cached token is never
+    accepted after it would have failed verification.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def put(self, token: str, user_id: str, exp: float):
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (user_id, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+# PyJWKClient caches the key set for JWKS_CACHE_SECS and refetches it when a
+# token carries an unknown `kid`, which covers key rotation.
+_jwks_client = (
+    jwt.PyJWKClient(SUPABASE_JWKS_URL, cache_keys=True, lifespan=JWKS_CACHE_SECS)
+    if SUPABASE_JWKS_URL else None
+)
+
+
+def verify_token(token: str) -> dict:
+    """Verify signature, expiry and audience; HS* tokens use the project JWT secret, others use JWKS."""
+    algorithm = jwt.get_unverified_header(token).get("alg", "")
+    if algorithm not in ALLOWED_ALGORITHMS:
+        raise ValueError(f"Unsupported token algorithm: {algorithm}")
+
+    if algorithm.startswith("HS"):
+        if not SUPABASE_JWT_SECRET:
+            raise ValueError("SUPABASE_JWT_SECRET is not configured")
+        key = SUPABASE_JWT_SECRET
+    else:
+        if _jwks_client is None:
+            raise ValueError("JWKS URL is not configured")
+        key = _jwks_client.get_signing_key_from_jwt(token).key
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]},
+    )
+
 
 def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
     if not authorization:
@@ -11,12 +102,26 @@ def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
         if scheme.lower() != "bearer":
             raise ValueError("Invalid auth scheme")
 
-        decoded = jwt.decode(token, options={"verify_signature": False})
+        # Repeat calls from the same session skip the signature check
+        user_id = token_cache.get(token)
+        if user_id:
+            return user_id
+
+        decoded = verify_token(token)
         user_id = decoded.get("sub")
         if not user_id:
             raise ValueError("User ID (sub) not found in token")
 
+        token_cache.put(token, user_id, float(decoded["exp"]))
         return user_id
 
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid authorization token: {str(e)}")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard for operator endpoints; they do not exist unless ADMIN_TOKEN is set."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -0,0 +1,360 @@
+# app/utils/db_policy.py
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.tracing import span
+
+DB_HEDGE_WORKERS = int(os.getenv("DB_HEDGE_WORKERS", "16"))
+DB_LATENCY_SAMPLES = int(os.getenv("DB_LATENCY_SAMPLES", "200"))
+# JSON overrides per table, e.g. {"bot_logs": {"read_retries": 0}, "bots": {"hedge_percentile": 0.9}}
+DB_TABLE_POLICIES = os.getenv("DB_TABLE_POLICIES", "")
+
+
+@dataclass(frozen=True)
+class TablePolicy:
+    read_retries: int = 2               # extra attempts for reads after a transient error
+    backoff_base_ms: float = 50         # full-jitter backoff: random(0, base * 2^attempt)
+    backoff_max_ms: float = 1000
+    hedge: bool = True                  # send a duplicate read once the first is slower than the percentile
+    hedge_percentile: float = 0.95
+    hedge_min_ms: float = 20            # never hedge sooner than this
+    hedge_min_samples: int = 20         # latency samples needed before hedging starts
+    failure_threshold: int = 5          # consecutive transient failures that open the breaker
+    open_secs: float = 10               # how long the breaker fails fast before a trial call
+
+
+DEFAULT_POLICY = TablePolicy()
+
+TABLE_POLICIES: Dict[str, TablePolicy] = {
+    # Hot path of /bots/start and webhooks: hedge early, retry reads harder
+    "bots": replace(DEFAULT_POLICY, read_retries=3, hedge_percentile=0.9),
+    "exchange_keys": replace(DEFAULT_POLICY, read_retries=3),
+    # Log tables are large and read from the dashboard only; don't pile on duplicates
+    "bot_logs": replace(DEFAULT_POLICY, hedge=False, read_retries=1),
+    "webhook_logs": replace(DEFAULT_POLICY, hedge=False, read_retries=1),
+}
+
+for _table, _overrides in (json.loads(DB_TABLE_POLICIES) if DB_TABLE_POLICIES else {}).items():
+    TABLE_POLICIES[_table] = replace(TABLE_POLICIES.get(_table, DEFAULT_POLICY), **_overrides)
+
+
+def policy_for(table: str) -> TablePolicy:
+    return TABLE_POLICIES.get(table, DEFAULT_POLICY)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the database while a table's breaker is open."""
+
+    def __init__(self, table: str, retry_after: float):
+        super().__init__(f"Database circuit open for '{table}', retry in {retry_after:.1f}s")
+        self.table = table
+        self.retry_after = retry_after
+
+
+# Columns reported to the client's on_write hook (read-your-writes stickiness)
+WRITE_KEY_COLUMNS = ("bot_id", "user_id")
+
+# PostgREST / Postgres codes worth retrying: HTTP 5xx, connection and pool errors,
+# statement timeout, serialization failure, insufficient resources
+TRANSIENT_CODE_PREFIXES = ("5", "08", "53", "57014", "40001", "PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+def is_transient(error: Exception) -> bool:
+    """Network and server-side failures; constraint or query errors are not retried."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__module__.split(".")[0] in ("httpx", "httpcore"):
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        # Bare HTTP status: the error body was not PostgREST JSON (e.g. a proxy's 502 page)
+        return code >= 500
+    return isinstance(code, str) and code.startswith(TRANSIENT_CODE_PREFIXES)
+
+
+class LatencyTracker:
+    """Rolling window of successful read latencies for one table."""
+
+    def __init__(self, size: int = DB_LATENCY_SAMPLES):
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._cached: Dict[float, float] = {}
+        self._since_cache = 0
+
+    def record(self, secs: float):
+        with self._lock:
+            self._samples.append(secs)
+            self._since_cache += 1
+            # Percentiles are re-sorted every 10 samples, not on every read
+            if self._since_cache >= 10:
+                self._cached.clear()
+                self._since_cache = 0
+
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            if q not in self._cached:
+                ordered = sorted(self._samples)
+                self._cached[q] = ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+            return self._cached[q]
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive transient failures;
+    open fails fast for `open_secs`, then half_open lets one trial call through.
+    """
+
+    def __init__(self, table: str, policy: TablePolicy):
+        self.table = table
+        self.policy = policy
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self.opened_at + self.policy.open_secs - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(self.table, max(remaining, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != "closed":
+                print(f"✅ Database circuit for '{self.table}' closed")
+            self.state = "closed"
+
+    def record_failure(self, error: Exception):
+        if not is_transient(error):
+            # The database answered; the query itself was wrong
+            self.record_success()
+            return
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.policy.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    print(f"🛑 Database circuit for '{self.table}' opened after {self.failures} failure(s): {error}")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def status(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+
+class DatabasePolicy:
+    """Per-table breakers and latency trackers shared by every query."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=DB_HEDGE_WORKERS, thread_name_prefix="db-hedge")
+
+    def breaker(self, table: str) -> CircuitBreaker:
+        with self._lock:
+            if table not in self._breakers:
+                self._breakers[table] = CircuitBreaker(table, policy_for(table))
+            return self._breakers[table]
+
+    def latency(self, table: str) -> LatencyTracker:
+        with self._lock:
+            if table not in self._latency:
+                self._latency[table] = LatencyTracker()
+            return self._latency[table]
+
+    def execute(self, table: str, build: Callable[[], Any], is_read: bool):
+        """
+        Run one query under the table's policy. `build` returns a fresh request
+        builder so retries and hedges never share state with the first attempt.
+        Writes are attempted once (they are not assumed idempotent).
+        """
+        policy = policy_for(table)
+        breaker = self.breaker(table)
+        attempts = 1 + (policy.read_retries if is_read else 0)
+
+        for attempt in range(attempts):
+            breaker.before_call()
+            try:
+                if is_read:
+                    result = self._read(table, build, policy)
+                else:
+                    result = build().execute()
+            except Exception as e:
+                breaker.record_failure(e)
+                if attempt + 1 >= attempts or not is_transient(e):
+                    raise
+                cap = min(policy.backoff_max_ms, policy.backoff_base_ms * (2 ** attempt))
+                time.sleep(random.uniform(0, cap) / 1000)
+                continue
+            breaker.record_success()
+            return result
+
+    def _timed(self, table: str, build: Callable[[], Any]):
+        started = time.monotonic()
+        result = build().execute()
+        self.latency(table).record(time.monotonic() - started)
+        return result
+
+    def _read(self, table: str, build: Callable[[], Any], policy: TablePolicy):
+        tracker = self.latency(table)
+        if not policy.hedge or tracker.count() < policy.hedge_min_samples:
+            return self._timed(table, build)
+
+        delay = max(tracker.percentile(policy.hedge_percentile) or 0.0, policy.hedge_min_ms / 1000)
+        first = self._pool.submit(self._timed, table, build)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        # First read is slower than usual: race a duplicate and take whichever answers first
+        pending = {first, self._pool.submit(self._timed, table, build)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def is_open(self, table: str) -> bool:
+        with self._lock:
+            breaker = self._breakers.get(table)
+        return breaker is not None and breaker.state != "closed"
+
+    def health(self) -> dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+        tables = {}
+        for table, breaker in breakers.items():
+            p95 = self.latency(table).percentile(0.95)
+            tables[table] = {**breaker.status(), "p95_ms": round(p95 * 1000, 1) if p95 is not None else None}
+        degraded = any(t["state"] != "closed" for t in tables.values())
+        return {"status": "degraded" if degraded else "ok", "tables": tables}
+
+
+class PolicyQuery:
+    """
+    Records a PostgREST builder chain (.table(...).select(...).eq(...)) and
+    replays it on every attempt when executed through the policy.
+    """
+
+    def __init__(self, policy: DatabasePolicy, table: str, root: Callable[[], Any], chain: tuple = (),
+                 is_read: Optional[bool] = None, on_write: Optional[Callable] = None, written: frozenset = frozenset()):
+        self._policy = policy
+        self._table = table
+        self._root = root
+        self._chain = chain
+        self._is_read = is_read
+        self._on_write = on_write
+        self._written = written
+
+    def _with(self, chain: tuple, is_read: Optional[bool]) -> "PolicyQuery":
+        return PolicyQuery(self._policy, self._table, self._root, chain, is_read, self._on_write, self._written)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        is_read = self._is_read if self._is_read is not None else name == "select"
+        return self._with(self._chain + ((name, None),), is_read)
+
+    def __call__(self, *args, **kwargs):
+        name, _ = self._chain[-1]
+        return self._with(self._chain[:-1] + ((name, (args, kwargs)),), self._is_read)
+
+    def _written_keys(self, result=None) -> set:
+        """
+        (column, value) pairs for bot_id/user_id found in the write's filters,
+        payload and returned rows. The returned rows add the owner of a bot
+        written by bot_id alone, so the owner's listings stick too.
+        """
+        keys = set(self._written)
+        returned = getattr(result, "data", None)
+        if isinstance(returned, list):
+            for row in returned:
+                if isinstance(row, dict):
+                    keys.update((column, str(row[column])) for column in WRITE_KEY_COLUMNS if row.get(column))
+        for name, call in self._chain:
+            if call is None or not call[0]:
+                continue
+            args = call[0]
+            if name == "eq" and len(args) == 2 and args[0] in WRITE_KEY_COLUMNS:
+                keys.add((args[0], str(args[1])))
+            elif name in ("insert", "upsert", "update"):
+                rows = args[0] if isinstance(args[0], list) else [args[0]]
+                for row in rows:
+                    if isinstance(row, dict):
+                        keys.update((column, str(row[column])) for column in WRITE_KEY_COLUMNS if row.get(column))
+        return keys
+
+    def _build(self):
+        builder = self._root()
+        for name, call in self._chain:
+            builder = getattr(builder, name)
+            if call is not None:
+                builder = builder(*call[0], **call[1])
+        return builder
+
+    def execute(self):
+        operation = self._chain[0][0] if self._chain and not self._table.startswith("rpc:") else "call"
+        with span(f"db.{operation}", table=self._table):
+            result = self._policy.execute(self._table, self._build, bool(self._is_read))
+        if not self._is_read and self._on_write is not None:
+            self._on_write(self._written_keys(result))
+        return result
+
+
+class ResilientClient:
+    """
+    Drop-in wrapper for the Supabase client: table() and rpc() queries go
+    through retries, hedged reads and per-table circuit breakers; everything
+    else is passed through.
+    """
+
+    def __init__(self, client, policy: Optional[DatabasePolicy] = None):
+        self._client = client
+        self.policy = policy or DatabasePolicy()
+        # Called with the bot_id/user_id keys touched by each successful write
+        self.on_write: Optional[Callable[[set], None]] = None
+
+    def table(self, name: str) -> PolicyQuery:
+        return PolicyQuery(self.policy, name, lambda: self._client.table(name), on_write=self.on_write)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, **kwargs) -> PolicyQuery:
+        # RPCs may have side effects, so they are never retried or hedged
+        params = params or {}
+        written = frozenset(
+            (column, str(params[name]))
+            for column in WRITE_KEY_COLUMNS for name in (column, f"p_{column}")
+            if params.get(name)
+        )
+        return PolicyQuery(self.policy, f"rpc:{fn}", lambda: self._client.rpc(fn, params, **kwargs),
+                           is_read=False, on_write=self.on_write, written=written)
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
@@ -0,0 +1,109 @@
+# app/utils/etag.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+VALIDATOR_CACHE_SIZE = int(os.getenv("VALIDATOR_CACHE_SIZE", "10000"))
+# Bounds staleness for writes this process never sees (other workers, direct table edits)
+VALIDATOR_TTL_SECS = float(os.getenv("VALIDATOR_TTL_SECS", "15"))
+
+
+def make_etag(payload: Any) -> str:
+    """Strong validator: hash of the canonical JSON body, so equal bodies always share a tag."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: a list of tags, W/ prefixes ignored, or '*'."""
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+class ValidatorCache:
+    """
+    LRU of resource key -> current ETag, so a poll carrying a still-current
+    If-None-Match is answered 304 without touching the database. Entries are
+    dropped when a write through the Supabase client touches their bot_id
+    (see supabase.on_write) and expire after VALIDATOR_TTL_SECS regardless.
+    A per-bot generation keeps a read that raced a write from caching its
+    stale tag.
+    """
+
+    def __init__(self, max_size: int = VALIDATOR_CACHE_SIZE, ttl_secs: float = VALIDATOR_TTL_SECS):
+        self.max_size = max_size
+        self.ttl_secs = ttl_secs
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (etag, bot_id, expires)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def generation(self, bot_id: str) -> int:
+        with self._lock:
+            return self._generations.get(str(bot_id), 0)
+
+    def put(self, key: tuple, bot_id: str, etag: str, generation: int):
+        bot_id = str(bot_id)
+        with self._lock:
+            if self._generations.get(bot_id, 0) != generation:
+                return
+            self._entries[key] = (etag, bot_id, time.monotonic() + self.ttl_secs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: set):
+        """on_write hook: `keys` are (column, value) pairs touched by a write."""
+        bot_ids = {value for column, value in keys if column == "bot_id"}
+        if not bot_ids:
+            return
+        with self._lock:
+            for bot_id in bot_ids:
+                self._generations[bot_id] = self._generations.get(bot_id, 0) + 1
+            for key in [k for k, entry in self._entries.items() if entry[1] in bot_ids]:
+                del self._entries[key]
+            if len(self._generations) > self.max_size:
+                self._generations.clear()  # only makes in-flight reads skip caching
+
+
+validator_cache = ValidatorCache()
+
+
+def conditional_get(request: Request, key: tuple, bot_id: str, load: Callable[[], Any]) -> Response:
+    """
+    Serve `load()` as JSON with an ETag, or 304 when the client's
+    If-None-Match is current. A cached validator answers without calling `load`.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        cached = validator_cache.get(key)
+        if cached and etag_matches(if_none_match, cached):
+            return Response(status_code=304, headers={"ETag": cached})
+
+    generation = validator_cache.generation(bot_id)
+    payload = load()
+    etag = make_etag(payload)
+    validator_cache.put(key, bot_id, etag, generation)
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content=payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
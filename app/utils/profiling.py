@@ -0,0 +1,306 @@
+# app/utils/profiling.py
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import hmac
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi.routing import APIRoute
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+# Key for X-Profile headers: "<unix expiry>.<hex hmac-sha256(key, expiry)>"
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_STACK = int(os.getenv("PROFILE_MAX_STACK", "64"))
+MEMORY_SNAPSHOTS_KEPT = int(os.getenv("MEMORY_SNAPSHOTS_KEPT", "5"))
+
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+# Profiling session of the request being handled; copied into threadpool calls with the context
+_request_session: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("profile_session", default=None)
+
+
+def sign_profile_header(expires_at: int, secret: str = PROFILE_SECRET) -> str:
+    """Value for the X-Profile header, valid until `expires_at` (unix seconds)."""
+    digest = hmac.new(secret.encode(), str(expires_at).encode(), hashlib.sha256).hexdigest()
+    return f"{expires_at}.{digest}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: while at least one session is open, a daemon thread
+    samples the stacks of each session's threads every PROFILE_INTERVAL_MS and
+    counts them into that session as collapsed stacks ("thread;outer;...;inner").
+    A session covers the thread that opened it plus threads attached to it
+    while they work for it, so background workers do not show up in a
+    request's profile. The thread idles on an event when nothing is being profiled.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._sessions: Dict[int, Tuple[Set[int], Counter]] = {}  # session -> (thread idents, stacks)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def begin(self, thread_ident: Optional[int] = None) -> int:
+        """Open a session sampling `thread_ident` (default: the calling thread)."""
+        thread_ident = thread_ident or threading.get_ident()
+        with self._lock:
+            session = next(self._ids)
+            self._sessions[session] = ({thread_ident}, Counter())
+            self._active.set()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def attach(self, session: int, thread_ident: Optional[int] = None):
+        """Also sample `thread_ident` (default: the calling thread) for an open session."""
+        with self._lock:
+            if session in self._sessions:
+                self._sessions[session][0].add(thread_ident or threading.get_ident())
+
+    def detach(self, session: int, thread_ident: Optional[int] = None):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions[session][0].discard(thread_ident or threading.get_ident())
+
+    def end(self, session: int) -> Counter:
+        with self._lock:
+            _, stacks = self._sessions.pop(session, (None, Counter()))
+            if not self._sessions:
+                self._active.clear()
+        return stacks
+
+    def _sample(self, idents: Set[int]) -> Dict[int, str]:
+        """Collapsed stack of each thread in `idents` that is still alive."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = {}
+        for ident, frame in sys._current_frames().items():
+            if ident not in idents:
+                continue
+            frames = []
+            while frame is not None and len(frames) < PROFILE_MAX_STACK:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            frames.append(names.get(ident, str(ident)))
+            stacks[ident] = ";".join(reversed(frames))
+        return stacks
+
+    def _loop(self):
+        while True:
+            self._active.wait()
+            with self._lock:
+                idents = set().union(*(session_idents for session_idents, _ in self._sessions.values()))
+            stacks = self._sample(idents)
+            with self._lock:
+                for session_idents, counter in self._sessions.values():
+                    for ident in session_idents:
+                        if ident in stacks:
+                            counter[stacks[ident]] += 1
+            time.sleep(self.interval)
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and writes their collapsed stacks to
+    PROFILE_DIR (flamegraph.pl / speedscope input). A request is profiled when
+    it carries a valid signed X-Profile header, or when an admin has switched
+    on sampling for a path prefix. When neither applies the check is one
+    header lookup and one float comparison.
+
+    A session samples the event-loop thread that opened it (middleware and
+    async handlers) and, through ProfiledRoute, the threadpool thread that
+    runs a sync `def` handler for the duration of the call. The admin toggle
+    is per-process: with several workers it applies only to the worker that
+    served the toggle request.
+    """
+
+    def __init__(self, root: str = PROFILE_DIR):
+        self.root = root
+        self.sampler = SamplingProfiler()
+        self.sample_rate = 0.0
+        self.path_prefix = "/"
+        self.until = 0.0
+
+    def configure(self, sample_rate: float, path_prefix: str = "/", duration_secs: float = 600) -> dict:
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.path_prefix = path_prefix or "/"
+        self.until = time.time() + duration_secs if self.sample_rate > 0 else 0.0
+        return self.status()
+
+    def status(self) -> dict:
+        active = self.sample_rate > 0 and time.time() < self.until
+        return {
+            "sample_rate": self.sample_rate if active else 0.0,
+            "path_prefix": self.path_prefix,
+            "until": self.until if active else None,
+            "signed_header": bool(PROFILE_SECRET),
+            "directory": self.root,
+            # configure() only reaches the worker process that handled it
+            "scope": "process",
+            "pid": os.getpid(),
+        }
+
+    def _valid_header(self, value: str) -> bool:
+        if not PROFILE_SECRET:
+            return False
+        expires_at = value.partition(".")[0]
+        if not expires_at.isdigit() or int(expires_at) < time.time():
+            return False
+        return hmac.compare_digest(sign_profile_header(int(expires_at)), value)
+
+    def should_profile(self, method: str, path: str, header: Optional[str]) -> bool:
+        if header is None and not self.sample_rate:
+            return False
+        if header is not None:
+            return self._valid_header(header)
+        if time.time() >= self.until:
+            self.sample_rate = 0.0
+            return False
+        return path.startswith(self.path_prefix) and random.random() < self.sample_rate
+
+    def begin(self) -> int:
+        session = self.sampler.begin()
+        _request_session.set(session)
+        return session
+
+    @contextmanager
+    def thread(self):
+        """Sample the calling thread as part of the current request's session, if it is profiled."""
+        session = _request_session.get()
+        if session is None:
+            yield
+            return
+        self.sampler.attach(session)
+        try:
+            yield
+        finally:
+            self.sampler.detach(session)
+
+    def finish(self, session: int, method: str, path: str, elapsed_ms: float) -> Optional[str]:
+        """Close the session and save its stacks. Returns the file name, None when nothing was sampled."""
+        stacks = self.sampler.end(session)
+        if not stacks:
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        name = f"{int(time.time() * 1000)}_{method}_{_SLUG.sub('_', path).strip('_')[:60]}_{int(elapsed_ms)}ms.folded"
+        with open(os.path.join(self.root, name), "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"🔥 Profiled {method} {path} in {elapsed_ms:.0f}ms -> {name}")
+        return name
+
+
+request_profiler = RequestProfiler()
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose sync endpoints join the request's profiling session on the
+    threadpool thread that runs them. Async endpoints run on the event loop,
+    which the session samples already.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            sync_endpoint = endpoint
+
+            @functools.wraps(sync_endpoint)
+            def endpoint(*args, **kw):
+                with request_profiler.thread():
+                    return sync_endpoint(*args, **kw)
+
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _stat_row(stat) -> dict:
+    row = {
+        "location": str(stat.traceback[0]) if stat.traceback else "?",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+    if hasattr(stat, "size_diff"):
+        row["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+        row["count_diff"] = stat.count_diff
+    return row
+
+
+class MemoryTracker:
+    """tracemalloc snapshots for leak hunting. Tracing costs memory and CPU, so it is off until started."""
+
+    def __init__(self, kept: int = MEMORY_SNAPSHOTS_KEPT):
+        self.kept = kept
+        self._snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 25) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> dict:
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+        return self.status()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "snapshots": [{"id": i, "taken_at": taken_at} for i, (taken_at, _) in self._snapshots.items()],
+        }
+
+    def snapshot(self, limit: int = 25, key_type: str = "lineno") -> dict:
+        if not tracemalloc.is_tracing():
+            raise ValueError("Memory tracing is not started")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self._snapshots) > self.kept:
+                self._snapshots.popitem(last=False)
+        return {
+            "id": snapshot_id,
+            "top": [_stat_row(s) for s in snapshot.statistics(key_type)[:limit]],
+        }
+
+    def diff(self, base_id: int, target_id: Optional[int] = None, limit: int = 25, key_type: str = "lineno") -> dict:
+        with self._lock:
+            if base_id not in self._snapshots or (target_id is not None and target_id not in self._snapshots):
+                raise KeyError("Snapshot not found")
+            base = self._snapshots[base_id][1]
+            target_id = target_id if target_id is not None else next(reversed(self._snapshots))
+            target = self._snapshots[target_id][1]
+        stats = target.compare_to(base, key_type)
+        return {
+            "base": base_id,
+            "target": target_id,
+            "size_diff_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+            "top": [_stat_row(s) for s in stats[:limit]],
+        }
+
+
+memory_tracker = MemoryTracker()
@@ -0,0 +1,135 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | shm
+RATE_LIMIT_SHM_PATH = os.getenv("RATE_LIMIT_SHM_PATH", "/dev/shm/dca-bot-rate-limit")
+RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+
+# scope -> (tokens per second, burst)
+RATE_LIMITS = {
+    "ip": (float(os.getenv("RATE_LIMIT_IP_RATE", "5")), float(os.getenv("RATE_LIMIT_IP_BURST", "20"))),
+    "bot": (float(os.getenv("RATE_LIMIT_BOT_RATE", "0.5")), float(os.getenv("RATE_LIMIT_BOT_BURST", "5"))),
+    "token": (float(os.getenv("RATE_LIMIT_TOKEN_RATE", "0.5")), float(os.getenv("RATE_LIMIT_TOKEN_BURST", "5"))),
+}
+
+
+def _refill(tokens: float, last: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + (now - last) * rate)
+
+
+def _take(tokens: float, rate: float) -> Tuple[bool, float, float]:
+    """Returns (allowed, tokens_left, retry_after_secs)."""
+    if tokens >= 1.0:
+        return True, tokens - 1.0, 0.0
+    return False, tokens, (1.0 - tokens) / rate if rate > 0 else 60.0
+
+
+class MemoryBackend:
+    """Per-process buckets; least recently used keys are evicted past RATE_LIMIT_MAX_KEYS."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            allowed, tokens, retry_after = _take(_refill(tokens, last, now, rate, burst), rate)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SharedMemoryBackend:
+    """
+    Buckets in a fixed-size memory-mapped file shared by all workers on the host.
+    Each slot holds (key hash, tokens, last refill) and is locked with a byte-range
+    lock. A key that hashes to a slot owned by another key takes it over with a
+    full bucket, so collisions only ever make limiting more lenient.
+    """
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path: str = RATE_LIMIT_SHM_PATH, slots: int = RATE_LIMIT_SHM_SLOTS):
+        self.slots = slots
+        size = self.SLOT.size * slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._thread_lock = threading.Lock()  # byte-range locks are per process
+
+    def acquire(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        offset = (digest % self.slots) * self.SLOT.size
+        now = time.time()  # wall clock, shared between processes
+
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+            try:
+                owner, tokens, last = self.SLOT.unpack_from(self._map, offset)
+                if owner != digest:
+                    tokens, last = burst, now
+                allowed, tokens, retry_after = _take(_refill(tokens, last, now, rate, burst), rate)
+                self.SLOT.pack_into(self._map, offset, digest, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+        return allowed, retry_after
+
+
+def _create_backend():
+    if RATE_LIMIT_BACKEND == "shm":
+        try:
+            return SharedMemoryBackend()
+        except OSError as e:
+            print(f"⚠️ Shared rate limit backend unavailable ({e}), using in-memory buckets")
+    return MemoryBackend()
+
+
+backend = _create_backend()
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def admit(request: Request, bot_id: Optional[str] = None, token: Optional[str] = None):
+    """
+    Token-bucket admission for webhook endpoints, checked before any database access.
+    Raises 429 with a Retry-After header when the client IP, bot or token is over its limit.
+    """
+    checks = [("ip", client_ip(request))]
+    if bot_id:
+        checks.append(("bot", bot_id))
+    if token:
+        checks.append(("token", token))
+
+    for scope, value in checks:
+        rate, burst = RATE_LIMITS[scope]
+        allowed, retry_after = backend.acquire(f"{scope}:{value}", rate, burst)
+        if not allowed:
+            retry_secs = max(1, math.ceil(retry_after))
+            raise HTTPException(
+                status_code=429,
+                detail={"message": f"Too many requests for this {scope}", "retry_after": retry_secs},
+                headers={"Retry-After": str(retry_secs)},
+            )
@@ -0,0 +1,159 @@
+# app/utils/read_routing.py
+
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+READ_YOUR_WRITES_SECS = float(os.getenv("READ_YOUR_WRITES_SECS", "5"))
+# shm: shared by all workers on the host | memory: per process, refused with more than one worker
+READ_STICKY_BACKEND = os.getenv("READ_STICKY_BACKEND", "shm")
+READ_STICKY_SHM_PATH = os.getenv("READ_STICKY_SHM_PATH", "/dev/shm/dca-bot-read-sticky")
+READ_STICKY_SHM_SLOTS = int(os.getenv("READ_STICKY_SHM_SLOTS", "65536"))
+# JSON overrides, e.g. {"bots.get": "primary"}
+READ_ROUTES_OVERRIDE = os.getenv("READ_ROUTES", "")
+
+# Named read queries -> (target, table). Anything not listed reads from the primary.
+READ_ROUTES: Dict[str, tuple] = {
+    "bots.get": ("replica", "bots"),
+    "bots.list_all": ("replica", "bots"),
+    "bots.list_user": ("replica", "bots"),
+    "bot_logs.list": ("replica", "bot_logs"),
+    "run_summaries.list_user": ("replica", "bot_run_summaries"),
+}
+
+for _name, _target in (json.loads(READ_ROUTES_OVERRIDE) if READ_ROUTES_OVERRIDE else {}).items():
+    READ_ROUTES[_name] = (_target, READ_ROUTES.get(_name, (None, _name.split(".")[0]))[1])
+
+
+class MemoryStickiness:
+    """Per-process (column, value) -> sticky-until; expired keys are pruned past 10000 entries."""
+
+    def __init__(self):
+        self._written: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, keys: Iterable[tuple], secs: float):
+        until = time.monotonic() + secs
+        with self._lock:
+            for key in keys:
+                self._written[key] = until
+            if len(self._written) > 10000:
+                now = time.monotonic()
+                self._written = {k: v for k, v in self._written.items() if v > now}
+
+    def any_sticky(self, keys: Iterable[tuple]) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return any(self._written.get(key, 0.0) > now for key in keys)
+
+
+class SharedStickiness:
+    """
+    Sticky-until times in a memory-mapped file shared by all workers on the
+    host, one wall-clock deadline per hashed slot, locked with a byte-range
+    lock as in the shared rate limiter. Slots are not owned: keys that collide
+    share a deadline, so collisions only send more reads to the primary.
+    """
+    SLOT = struct.Struct("<d")
+
+    def __init__(self, path: str = READ_STICKY_SHM_PATH, slots: int = READ_STICKY_SHM_SLOTS):
+        self.slots = slots
+        size = self.SLOT.size * slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._thread_lock = threading.Lock()  # byte-range locks are per process
+
+    def _offset(self, key: tuple) -> int:
+        digest = hashlib.blake2b(f"{key[0]}:{key[1]}".encode(), digest_size=8).digest()
+        return (int.from_bytes(digest, "little") % self.slots) * self.SLOT.size
+
+    def mark(self, keys: Iterable[tuple], secs: float):
+        until = time.time() + secs  # wall clock, shared between processes
+        with self._thread_lock:
+            for offset in sorted({self._offset(key) for key in keys}):
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+                try:
+                    current, = self.SLOT.unpack_from(self._map, offset)
+                    self.SLOT.pack_into(self._map, offset, max(current, until))
+                finally:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+
+    def any_sticky(self, keys: Iterable[tuple]) -> bool:
+        now = time.time()
+        with self._thread_lock:
+            for key in keys:
+                offset = self._offset(key)
+                fcntl.lockf(self._fd, fcntl.LOCK_SH, self.SLOT.size, offset)
+                try:
+                    until, = self.SLOT.unpack_from(self._map, offset)
+                finally:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+                if until > now:
+                    return True
+        return False
+
+
+def _create_stickiness():
+    if READ_STICKY_BACKEND == "shm":
+        try:
+            return SharedStickiness()
+        except OSError as e:
+            reason = f"shared read stickiness unavailable ({e})"
+    else:
+        reason = f"READ_STICKY_BACKEND={READ_STICKY_BACKEND}"
+    # Per-process state would let a worker read its own write from a lagging replica
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        raise RuntimeError(f"{reason}: per-process read stickiness is wrong with several workers")
+    print(f"⚠️ {reason}, using per-process read stickiness")
+    return MemoryStickiness()
+
+
+class ReadRouter:
+    """
+    Picks the client for a named read query. Dashboard reads go to the read
+    replica, except for a short window after a write touching the same bot
+    (or user), so callers always see their own writes despite replica lag.
+    Falls back to the primary when no replica is configured or the replica's
+    breaker for the table is open.
+
+    Sticky windows live in shared memory (READ_STICKY_BACKEND=shm), so all
+    workers on the host see them; across hosts, route those reads to the
+    primary with READ_ROUTES. The per-process memory backend is refused when
+    WEB_CONCURRENCY says there is more than one worker.
+    """
+
+    def __init__(self, primary, replica=None, sticky_secs: float = READ_YOUR_WRITES_SECS, sticky=None):
+        self.primary = primary
+        self.replica = replica
+        self.sticky_secs = sticky_secs
+        # Stickiness only matters when reads can go to a replica
+        self._sticky = sticky or (_create_stickiness() if replica is not None else MemoryStickiness())
+
+    def mark_write(self, keys: set):
+        """Hook for the primary client: `keys` are (column, value) pairs touched by a write."""
+        if not keys or self.replica is None:
+            return
+        self._sticky.mark(keys, self.sticky_secs)
+
+    def is_sticky(self, bot_id: Optional[str] = None, user_id: Optional[str] = None) -> bool:
+        keys = [key for key in (("bot_id", str(bot_id)) if bot_id else None,
+                                ("user_id", str(user_id)) if user_id else None) if key]
+        return bool(keys) and self._sticky.any_sticky(keys)
+
+    def client_for(self, query: str, bot_id: Optional[str] = None, user_id: Optional[str] = None):
+        target, table = READ_ROUTES.get(query, ("primary", None))
+        if target != "replica" or self.replica is None:
+            return self.primary
+        if self.is_sticky(bot_id, user_id):
+            return self.primary
+        if table and self.replica.policy.is_open(table):
+            return self.primary
+        return self.replica
@@ -0,0 +1,238 @@
+# app/utils/tracing.py
+
+import contextvars
+import functools
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# off | file | otlp; off unless asked for, spans of every request add up quickly
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "off")
+TRACE_FILE = os.getenv("TRACE_FILE", "data/traces/spans.jsonl")
+# File mode keeps the current file plus one rotated TRACE_FILE.1, each up to this size
+TRACE_FILE_MAX_MB = float(os.getenv("TRACE_FILE_MAX_MB", "100"))
+# OTLP/HTTP JSON endpoint of a collector, e.g. http://localhost:4318/v1/traces
+TRACE_OTLP_URL = os.getenv("TRACE_OTLP_URL", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "dca-bot-backend")
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "256"))
+TRACE_FLUSH_SECS = float(os.getenv("TRACE_FLUSH_SECS", "2"))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+# The innermost open span of the current request/thread/task. Starlette copies
+# the context into threadpool workers and background tasks, so sync handlers
+# and the pipeline they call inherit the request's trace.
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """(trace_id, parent span_id) from a W3C traceparent header, None when absent or malformed."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    return match.groups() if match else None
+
+
+@contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes):
+    """
+    Open a child of the current span (or a new trace, continuing `traceparent`
+    when given). Exceptions are recorded on the span and re-raised.
+    """
+    if TRACE_EXPORT == "off":
+        yield None
+        return
+
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if parent is None else None
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    elif remote:
+        trace_id, parent_id = remote
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    current = Span(name, trace_id, parent_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        exporter.export(current)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: run the function inside a span named after it."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracedClient:
+    """Wraps an exchange client so every method call is an `exchange.<method>` span."""
+
+    def __init__(self, client, exchange: str):
+        self._client = client
+        self._exchange = exchange
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with span(f"exchange.{name}", exchange=self._exchange, symbol=kwargs.get("symbol", args[0] if args else None)):
+                return attr(*args, **kwargs)
+        return call
+
+
+class SpanExporter:
+    """
+    Finished spans go onto a bounded queue and a daemon thread writes them in
+    batches, so request threads never block on disk or the collector. Spans
+    are dropped (and counted) when the queue is full.
+    """
+
+    def __init__(self, mode: str = TRACE_EXPORT):
+        self.mode = mode
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + TRACE_FLUSH_SECS
+            while len(batch) < TRACE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as e:
+                print(f"❌ Failed to export {len(batch)} span(s): {e}")
+
+    def write(self, batch: list):
+        if self.mode == "otlp":
+            self._post_otlp(batch)
+            return
+        os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+        try:
+            if os.path.getsize(TRACE_FILE) >= TRACE_FILE_MAX_MB * 1024 * 1024:
+                os.replace(TRACE_FILE, f"{TRACE_FILE}.1")
+        except FileNotFoundError:
+            pass
+        with open(TRACE_FILE, "a") as f:
+            f.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in batch))
+
+    def _post_otlp(self, batch: list):
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        spans = [{
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": s.parent_id or "",
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": k, "value": value(v)} for k, v in s.attributes.items() if v is not None],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        } for s in batch]
+        body = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": spans}],
+        }]}
+        request = urllib.request.Request(
+            TRACE_OTLP_URL, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+
+exporter = SpanExporter()
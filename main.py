@@ -1,8 +1,29 @@
+import time
+
+from dotenv import load_dotenv
+
+# .env must be loaded before any app module reads its os.getenv settings
+load_dotenv()
+
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import bots, exchange_keys, webhook_receiver, webhook  # ✅ include webhook
+from app.routers import bots, exchange_keys, webhook_receiver, webhook, portfolio, admin  # ✅ include webhook
 from app.services.evaluator import evaluate_condition_groups
+from app.supabase_client import supabase, supabase_replica
+from app.utils.db_policy import CircuitOpenError
+from app.utils.profiling import request_profiler
+from app.utils.tracing import span
+from app.services.bot_purger import bot_purger
+from app.services.log_retention import log_retention_job
+from app.services.position_ledger import position_ledgers
+from app.services.kline_store import kline_store
+from app.services.webhook_journal import webhook_journal
+from app.services.order_reconciler import order_reconciler
+from app.services.symbol_filters import symbol_filters
+from app.services.portfolio import portfolio_snapshotter
+from app.services.dca_scheduler import dca_scheduler
 
 evaluate_condition_groups()  # optional - runs once at startup for testing
 
@@ -25,11 +46,67 @@ async def log_requests(request: Request, call_next):
     print(f"📤 Response status: {response.status_code}")
     return response
 
+# 🔥 Opt-in sampling profiler (signed X-Profile header or admin toggle)
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    path = request.url.path
+    if not request_profiler.should_profile(request.method, path, request.headers.get("x-profile")):
+        return await call_next(request)
+
+    session = request_profiler.begin()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        name = request_profiler.finish(session, request.method, path, (time.perf_counter() - started) * 1000)
+    if name:
+        response.headers["X-Profile-File"] = name
+    return response
+
+# 🧭 Root span per request, continuing the caller's W3C traceparent if sent
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with span(f"{request.method} {request.url.path}", traceparent=request.headers.get("traceparent"),
+              method=request.method, path=request.url.path) as current:
+        response = await call_next(request)
+        if current is not None:
+            current.set_attribute("status_code", response.status_code)
+            response.headers["traceparent"] = current.traceparent
+        return response
+
+# 🛑 Fail fast while the database circuit is open
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database temporarily unavailable"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+# 🧵 Background workers
+@app.on_event("startup")
+def start_background_workers():
+    bot_purger.start()
+    log_retention_job.start()
+    position_ledgers.start()
+    kline_store.start()
+    order_reconciler.start()
+    symbol_filters.start()
+    portfolio_snapshotter.start()
+    dca_scheduler.start()
+
+# 📓 Re-run webhooks accepted before a crash/restart but never fully processed
+@app.on_event("startup")
+async def replay_webhook_journal():
+    await webhook_journal.replay()
+
 # 📦 Register routers
 app.include_router(bots.router, prefix="/bots", tags=["Bots"])
 app.include_router(exchange_keys.router, prefix="/exchange-keys", tags=["Exchange Keys"])
 app.include_router(webhook_receiver.router, tags=["Webhook Receiver"])
 app.include_router(webhook.router, tags=["Webhook"])  # ✅ register webhook routes
+app.include_router(portfolio.router, prefix="/portfolio", tags=["Portfolio"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 # 🏠 Basic routes
 @app.get("/")
@@ -38,7 +115,12 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"message": "Backend is healthy"}
+    database = supabase.policy.health()
+    message = "Backend is healthy" if database["status"] == "ok" else "Backend is degraded"
+    health = {"message": message, "database": database}
+    if supabase_replica is not None:
+        health["replica"] = supabase_replica.policy.health()
+    return health
 
 @app.get("/test-webhook")
 def test_webhook():
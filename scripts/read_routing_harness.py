@@ -0,0 +1,161 @@
+"""
+Read routing harness: runs ReadRouter against two local stand-in PostgREST
+servers ("primary" and "replica") and checks where each read lands.
+
+    python scripts/read_routing_harness.py
+
+Needs only the postgrest package (installed with supabase); no database or
+credentials. Exits non-zero when a check fails.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from postgrest import SyncPostgrestClient  # noqa: E402
+
+from app.utils.db_policy import ResilientClient  # noqa: E402
+from app.utils.read_routing import MemoryStickiness, ReadRouter, SharedStickiness  # noqa: E402
+
+STICKY_SECS = 0.5
+
+
+class StandIn:
+    """
+    Minimal PostgREST: answers every request with one row naming the server;
+    can be made to fail. Writes filtered by bot_id return the bot's owner, as
+    the real update would return the row.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.failing = False
+        self.requests = []
+        self.owners = {}  # bot_id -> user_id
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self):
+                length = int(self.headers.get("content-length") or 0)
+                if length:
+                    self.rfile.read(length)
+                stand_in.requests.append((self.command, self.path))
+                if stand_in.failing:
+                    status, body = 503, {"code": "PGRST001", "message": f"{stand_in.name} unavailable",
+                                         "details": None, "hint": None}
+                else:
+                    status, body = 200, [{"server": stand_in.name}]
+                    bot_filter = parse_qs(urlsplit(self.path).query).get("bot_id", [""])[0]
+                    bot_id = bot_filter[3:] if bot_filter.startswith("eq.") else None
+                    if self.command != "GET" and bot_id in stand_in.owners:
+                        body[0].update(bot_id=bot_id, user_id=stand_in.owners[bot_id])
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _answer
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name=f"stand-in-{name}", daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def client(self) -> ResilientClient:
+        return ResilientClient(SyncPostgrestClient(self.url))
+
+
+def served_by(router: ReadRouter, query: str, bot_id: str = None, user_id: str = None) -> str:
+    client = router.client_for(query, bot_id=bot_id, user_id=user_id)
+    table = query.split(".")[0]
+    return client.table(table).select("*").eq("bot_id", bot_id or "any").execute().data[0]["server"]
+
+
+def check(name: str, actual, expected) -> bool:
+    ok = actual == expected
+    print(f"{'✅' if ok else '❌'} {name}: {actual}" + ("" if ok else f" (expected {expected})"))
+    return ok
+
+
+def run(sticky_factory, label: str) -> bool:
+    print(f"🧪 Stickiness backend: {label}")
+    primary_server, replica_server = StandIn("primary"), StandIn("replica")
+    primary, replica = primary_server.client(), replica_server.client()
+    router = ReadRouter(primary, replica, sticky_secs=STICKY_SECS, sticky=sticky_factory())
+    primary.on_write = router.mark_write
+
+    results = [
+        check("routed read goes to the replica", served_by(router, "bots.get", bot_id="b1"), "replica"),
+        check("unrouted read stays on the primary", served_by(router, "bot_trades.list", bot_id="b1"), "primary"),
+    ]
+
+    primary.table("bots").update({"status": "paused"}).eq("bot_id", "b1").execute()
+    results += [
+        check("write went to the primary", primary_server.requests[-1][0], "PATCH"),
+        check("read of the written bot sticks to the primary", served_by(router, "bots.get", bot_id="b1"), "primary"),
+        check("other bots still read the replica", served_by(router, "bots.get", bot_id="b2"), "replica"),
+    ]
+
+    primary.table("bots").insert({"bot_id": "b3", "user_id": "u1"}).execute()
+    results.append(check("user listing after an insert sticks to the primary",
+                         served_by(router, "bots.list_user", user_id="u1"), "primary"))
+
+    primary_server.owners["b5"] = "u5"
+    primary.table("bots").update({"status": "paused"}).eq("bot_id", "b5").execute()
+    results.append(check("owner listing after an update by bot_id sticks to the primary",
+                         served_by(router, "bots.list_user", user_id="u5"), "primary"))
+
+    time.sleep(STICKY_SECS + 0.1)
+    results.append(check("sticky window expires back to the replica",
+                         served_by(router, "bots.get", bot_id="b1"), "replica"))
+
+    # A second router sharing the backend stands in for another worker process
+    if isinstance(router._sticky, SharedStickiness):
+        other = ReadRouter(primary, replica, sticky_secs=STICKY_SECS, sticky=sticky_factory())
+        primary.table("bots").update({"status": "running"}).eq("bot_id", "b4").execute()
+        results.append(check("another worker sees the write's sticky window",
+                             served_by(other, "bots.get", bot_id="b4"), "primary"))
+
+    replica_server.failing = True
+    for _ in range(10):
+        try:
+            replica.table("bot_logs").select("*").execute()
+        except Exception:
+            pass
+    results += [
+        check("replica breaker opened", replica.policy.is_open("bot_logs"), True),
+        check("reads fall back to the primary while it is open",
+              served_by(router, "bot_logs.list", bot_id="b2"), "primary"),
+        check("no replica configured reads the primary",
+              served_by(ReadRouter(primary, None, sticky=sticky_factory()), "bots.get", bot_id="b2"), "primary"),
+    ]
+
+    primary_server.server.shutdown()
+    replica_server.server.shutdown()
+    return all(results)
+
+
+def main() -> int:
+    shm_path = os.path.join(tempfile.mkdtemp(), "read-sticky")
+    passed = run(MemoryStickiness, "memory")
+    passed = run(lambda: SharedStickiness(path=shm_path, slots=1024), "shm") and passed
+    print("🎉 All read routing checks passed" if passed else "💥 Read routing checks failed")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+-- Soft delete for bots; rows are purged in the background by app/services/bot_purger.py
+alter table bots add column if not exists deleted_at timestamptz;
+
+create index if not exists bots_status_idx on bots (status);
+create index if not exists bot_logs_bot_id_idx on bot_logs (bot_id);
+create index if not exists bot_trades_bot_id_idx on bot_trades (bot_id);
+create index if not exists bot_runs_bot_id_idx on bot_runs (bot_id);
@@ -0,0 +1,24 @@
+-- Hourly rollups of pruned bot_logs / webhook_logs rows (app/services/log_retention.py)
+create table if not exists log_rollups (
+    source text not null,
+    bucket timestamptz not null,
+    bot_id text not null default '',
+    event text not null default '',
+    valid boolean not null default true,
+    count bigint not null default 0,
+    primary key (source, bot_id, bucket, event, valid)
+);
+
+create or replace function increment_log_rollups(rows jsonb)
+returns void
+language sql
+as $$
+    insert into log_rollups (source, bucket, bot_id, event, valid, count)
+    select r.source, r.bucket, r.bot_id, r.event, r.valid, r.count
+    from jsonb_to_recordset(rows) as r(source text, bucket timestamptz, bot_id text, event text, valid boolean, count bigint)
+    on conflict (source, bot_id, bucket, event, valid)
+    do update set count = log_rollups.count + excluded.count;
+$$;
+
+create index if not exists bot_logs_timestamp_idx on bot_logs (timestamp);
+create index if not exists webhook_logs_received_at_idx on webhook_logs (received_at);
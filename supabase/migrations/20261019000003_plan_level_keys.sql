@@ -0,0 +1,7 @@
+-- Stable key for plan levels in bot_trades: (bot_id, run_id, kind, step)
+-- kind is one of dca / take_profit / stop / pause; fills keep kind null.
+alter table bot_trades add column if not exists run_id uuid;
+alter table bot_trades add column if not exists kind text;
+
+create unique index if not exists bot_trades_plan_key_idx
+    on bot_trades (bot_id, run_id, kind, step);
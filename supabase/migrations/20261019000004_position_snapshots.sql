@@ -0,0 +1,17 @@
+-- Latest running position per bot run (app/services/position_ledger.py)
+create table if not exists position_snapshots (
+    run_id uuid primary key,
+    bot_id text not null,
+    user_id text,
+    symbol text,
+    quantity double precision not null default 0,
+    cost_basis double precision not null default 0,
+    avg_entry_price double precision not null default 0,
+    last_entry_price double precision not null default 0,
+    realized_pnl double precision not null default 0,
+    fees_paid double precision not null default 0,
+    fill_count integer not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists position_snapshots_bot_id_idx on position_snapshots (bot_id);
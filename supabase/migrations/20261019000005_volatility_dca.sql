@@ -0,0 +1,4 @@
+-- Settings for the 'volatility' DCA condition (rung spacing = multiplier x ATR%)
+alter table bots add column if not exists volatility_interval text default '1h';
+alter table bots add column if not exists volatility_window integer default 14;
+alter table bots add column if not exists volatility_multiplier double precision default 1.0;
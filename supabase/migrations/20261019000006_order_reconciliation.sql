@@ -0,0 +1,14 @@
+-- Exchange order tracking on bot_trades (app/services/order_reconciler.py)
+alter table bot_trades add column if not exists order_id text;
+alter table bot_trades add column if not exists order_status text;
+alter table bot_trades add column if not exists quantity double precision;
+alter table bot_trades add column if not exists filled_quantity double precision not null default 0;
+alter table bot_trades add column if not exists avg_fill_price double precision;
+alter table bot_trades add column if not exists fees double precision not null default 0;
+alter table bot_trades add column if not exists last_trade_id bigint;
+alter table bot_trades add column if not exists reconciled_at timestamptz;
+
+-- The reconciler only ever scans resting orders
+create index if not exists bot_trades_open_orders_idx
+    on bot_trades (order_status)
+    where order_status in ('new', 'partially_filled');
@@ -0,0 +1,76 @@
+-- Per-run projection maintained incrementally by app/services/run_summaries.py
+create table if not exists bot_run_summaries (
+    run_id uuid primary key,
+    bot_id text not null,
+    user_id text,
+    status text,
+    started_at timestamptz not null default now(),
+    ended_at timestamptz,
+    last_event text,
+    last_event_at timestamptz,
+    event_count integer not null default 0,
+    error_count integer not null default 0,
+    fill_count integer not null default 0,
+    bought_quantity double precision not null default 0,
+    bought_amount double precision not null default 0,
+    plan_levels integer,
+    plan_updated_at timestamptz,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists bot_run_summaries_user_idx
+    on bot_run_summaries (user_id, started_at desc);
+create index if not exists bot_run_summaries_bot_idx on bot_run_summaries (bot_id);
+
+-- One round trip per event: counters are added, last-* fields replaced, nulls keep the stored value
+create or replace function bump_run_summary(
+    p_run_id uuid,
+    p_bot_id text,
+    p_user_id text default null,
+    p_event text default null,
+    p_status text default null,
+    p_fills integer default 0,
+    p_quantity double precision default 0,
+    p_amount double precision default 0,
+    p_plan_levels integer default null,
+    p_error boolean default false,
+    p_at timestamptz default now()
+)
+returns void
+language sql
+as $$
+    insert into bot_run_summaries as s (
+        run_id, bot_id, user_id, status, started_at, ended_at, last_event, last_event_at,
+        event_count, error_count, fill_count, bought_quantity, bought_amount,
+        plan_levels, plan_updated_at, updated_at
+    )
+    values (
+        p_run_id, p_bot_id, p_user_id, p_status, p_at,
+        case when p_status in ('stopped', 'failed', 'completed') then p_at end,
+        p_event, case when p_event is not null then p_at end,
+        case when p_event is not null then 1 else 0 end,
+        case when p_error then 1 else 0 end,
+        p_fills, p_quantity, p_amount,
+        p_plan_levels, case when p_plan_levels is not null then p_at end,
+        p_at
+    )
+    on conflict (run_id) do update set
+        user_id = coalesce(s.user_id, excluded.user_id),
+        status = coalesce(excluded.status, s.status),
+        started_at = least(s.started_at, excluded.started_at),
+        ended_at = case
+            when excluded.status in ('stopped', 'failed', 'completed') then excluded.updated_at
+            when excluded.status is not null then null
+            else s.ended_at
+        end,
+        last_event = coalesce(excluded.last_event, s.last_event),
+        last_event_at = coalesce(excluded.last_event_at, s.last_event_at),
+        event_count = s.event_count + excluded.event_count,
+        error_count = s.error_count + excluded.error_count,
+        fill_count = s.fill_count + excluded.fill_count,
+        bought_quantity = s.bought_quantity + excluded.bought_quantity,
+        bought_amount = s.bought_amount + excluded.bought_amount,
+        plan_levels = coalesce(excluded.plan_levels, s.plan_levels),
+        plan_updated_at = coalesce(excluded.plan_updated_at, s.plan_updated_at),
+        updated_at = excluded.updated_at;
+$$;
@@ -0,0 +1,75 @@
+-- Per-user, per-symbol position aggregates (app/services/portfolio.py)
+create table if not exists portfolio_positions (
+    user_id text not null,
+    symbol text not null,
+    quantity double precision not null default 0,
+    cost_basis double precision not null default 0,
+    realized_pnl double precision not null default 0,
+    fees_paid double precision not null default 0,
+    fill_count integer not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, symbol)
+);
+
+-- Average-cost accounting applied atomically per fill
+create or replace function apply_portfolio_fill(
+    p_user_id text,
+    p_symbol text,
+    p_side text,
+    p_price double precision,
+    p_quantity double precision,
+    p_fee double precision default 0
+)
+returns void
+language plpgsql
+as $$
+declare
+    pos portfolio_positions%rowtype;
+    sold double precision;
+    avg_price double precision;
+begin
+    insert into portfolio_positions (user_id, symbol)
+    values (p_user_id, p_symbol)
+    on conflict (user_id, symbol) do nothing;
+
+    select * into pos from portfolio_positions
+    where user_id = p_user_id and symbol = p_symbol
+    for update;
+
+    if lower(p_side) = 'buy' then
+        pos.quantity := pos.quantity + p_quantity;
+        pos.cost_basis := pos.cost_basis + p_price * p_quantity + p_fee;
+    else
+        sold := least(p_quantity, pos.quantity);
+        avg_price := case when pos.quantity > 0 then pos.cost_basis / pos.quantity else 0 end;
+        pos.realized_pnl := pos.realized_pnl + (p_price - avg_price) * sold - p_fee;
+        pos.cost_basis := pos.cost_basis - avg_price * sold;
+        pos.quantity := pos.quantity - sold;
+        if pos.quantity <= 1e-12 then
+            pos.quantity := 0;
+            pos.cost_basis := 0;
+        end if;
+    end if;
+
+    update portfolio_positions set
+        quantity = pos.quantity,
+        cost_basis = pos.cost_basis,
+        realized_pnl = pos.realized_pnl,
+        fees_paid = pos.fees_paid + p_fee,
+        fill_count = pos.fill_count + 1,
+        updated_at = now()
+    where user_id = p_user_id and symbol = p_symbol;
+end;
+$$;
+
+-- Periodic valuations for history charts; bucket makes snapshots idempotent across workers
+create table if not exists portfolio_snapshots (
+    user_id text not null,
+    bucket timestamptz not null,
+    capital_deployed double precision not null default 0,
+    market_value double precision not null default 0,
+    unrealized_pnl double precision not null default 0,
+    realized_pnl double precision not null default 0,
+    positions jsonb not null default '[]'::jsonb,
+    primary key (user_id, bucket)
+);
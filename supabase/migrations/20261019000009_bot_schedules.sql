@@ -0,0 +1,76 @@
+-- Recurring time-based buys (app/services/dca_scheduler.py)
+create table if not exists bot_schedules (
+    bot_id text primary key,
+    user_id text not null,
+    exchange text not null,
+    symbol text not null,
+    amount double precision not null check (amount > 0),
+    interval_secs integer not null check (interval_secs >= 60),
+    next_fire_at timestamptz not null,
+    last_fired_at timestamptz,
+    fire_count integer not null default 0,
+    last_error text,
+    status text not null default 'active',
+    claimed_by text,
+    claimed_until timestamptz,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists bot_schedules_due_idx on bot_schedules (next_fire_at) where status = 'active';
+create index if not exists bot_schedules_updated_idx on bot_schedules (updated_at);
+
+-- One trade per (bot, slot): a slot reserved once is never bought twice, even across workers and restarts
+alter table bot_trades add column if not exists schedule_slot timestamptz;
+create unique index if not exists bot_trades_schedule_slot_idx on bot_trades (bot_id, schedule_slot);
+
+-- Lease due schedules to one worker; leases of crashed workers expire and are claimed again
+create or replace function claim_bot_schedules(
+    p_worker text,
+    p_until timestamptz,
+    p_lease_secs integer,
+    p_limit integer
+)
+returns setof bot_schedules
+language sql
+as $$
+    update bot_schedules s set
+        claimed_by = p_worker,
+        claimed_until = now() + make_interval(secs => p_lease_secs),
+        updated_at = now()
+    where s.bot_id in (
+        select bot_id from bot_schedules
+        where status = 'active'
+          and next_fire_at <= p_until
+          and (claimed_until is null or claimed_until < now())
+        order by next_fire_at
+        limit p_limit
+        for update skip locked
+    )
+    returning s.*;
+$$;
+
+-- Advance fired schedules and release their leases in one statement
+create or replace function complete_bot_schedules(p_worker text, p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    updated integer;
+begin
+    update bot_schedules s set
+        next_fire_at = r.next_fire_at,
+        last_fired_at = coalesce(r.last_fired_at, s.last_fired_at),
+        fire_count = s.fire_count + coalesce(r.fired, 0),
+        last_error = r.last_error,
+        claimed_by = null,
+        claimed_until = null,
+        updated_at = now()
+    from jsonb_to_recordset(p_rows) as r(
+        bot_id text, next_fire_at timestamptz, last_fired_at timestamptz, fired integer, last_error text
+    )
+    where s.bot_id = r.bot_id and s.claimed_by = p_worker;
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
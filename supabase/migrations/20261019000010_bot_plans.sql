@@ -0,0 +1,44 @@
+-- One row per run holding the whole plan (app/services/log_bot_plan.py).
+-- levels packs each kind as parallel arrays:
+--   {"dca": {"step": [...], "price": [...], "amount": [...], "drop_pct": [...]}, "stop": {..., "type": [...]}, ...}
+create table if not exists bot_plans (
+    id bigserial primary key,
+    run_id uuid,
+    bot_id text not null,
+    symbol text,
+    version integer not null default 1,
+    levels jsonb not null default '{}'::jsonb,
+    level_count integer not null default 0,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create unique index if not exists bot_plans_run_idx on bot_plans (run_id);
+create index if not exists bot_plans_bot_idx on bot_plans (bot_id);
+
+-- Move plan levels out of bot_trades; rows carrying an exchange order stay, they are real orders
+with per_kind as (
+    select
+        run_id,
+        min(bot_id) as bot_id,
+        min(symbol) as symbol,
+        kind,
+        count(*) as n,
+        jsonb_build_object(
+            'step', jsonb_agg(step order by step),
+            'price', jsonb_agg(price order by step),
+            'amount', jsonb_agg(amount order by step),
+            'drop_pct', jsonb_agg(drop_pct order by step),
+            'type', jsonb_agg(nullif(split_part(note, ': ', 2), '') order by step)
+        ) as columns
+    from bot_trades
+    where kind is not null and run_id is not null and order_id is null
+    group by run_id, kind
+)
+insert into bot_plans (run_id, bot_id, symbol, levels, level_count)
+select run_id, min(bot_id), min(symbol), jsonb_object_agg(kind, columns), sum(n)
+from per_kind
+group by run_id
+on conflict (run_id) do nothing;
+
+delete from bot_trades where kind is not null and order_id is null;
@@ -0,0 +1,7 @@
+-- Idempotency keys of journaled webhooks (app/services/webhook_journal.py):
+-- a replayed webhook is skipped when its key already produced a run or an entry trade
+alter table bot_runs add column if not exists entry_key text;
+alter table bot_trades add column if not exists entry_key text;
+
+create unique index if not exists bot_runs_entry_key_idx on bot_runs (entry_key);
+create unique index if not exists bot_trades_entry_key_idx on bot_trades (entry_key);
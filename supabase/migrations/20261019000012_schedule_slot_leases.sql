@@ -0,0 +1,6 @@
+-- Lease on a reserved schedule slot (app/services/dca_scheduler.py): a slot left
+-- pending without an order by a crashed worker can be reserved again once it lapses
+alter table bot_trades add column if not exists reserved_until timestamptz;
+
+update bot_trades set reserved_until = created_at
+where schedule_slot is not null and reserved_until is null;
@@ -0,0 +1,76 @@
+-- Plans logged without a run are keyed by bot (app/services/log_bot_plan.py):
+-- keep only the newest such row per bot, then enforce one
+delete from bot_plans p
+using bot_plans newer
+where p.run_id is null and newer.run_id is null
+  and p.bot_id = newer.bot_id
+  and (newer.updated_at, newer.id) > (p.updated_at, p.id);
+
+create unique index if not exists bot_plans_bot_unscoped_idx on bot_plans (bot_id) where run_id is null;
+
+-- Plan levels written before bot_trades had kind/plan keys carry only their note
+-- ("DCA Order", "Take Profit", "STOP: <type>", "PAUSE: <type>") and often no run_id.
+-- Repeated plans were appended, so the newest row per level wins.
+with legacy as (
+    select
+        run_id,
+        bot_id,
+        symbol,
+        price,
+        amount,
+        drop_pct,
+        created_at,
+        case
+            when note = 'DCA Order' then 'dca'
+            when note = 'Take Profit' then 'take_profit'
+            when note like 'STOP: %' then 'stop'
+            else 'pause'
+        end as plan_kind,
+        nullif(split_part(note, ': ', 2), '') as level_type,
+        step
+    from bot_trades
+    where kind is null and order_id is null
+      and (note in ('DCA Order', 'Take Profit') or note like 'STOP: %' or note like 'PAUSE: %')
+),
+stepped as (
+    select *,
+        -- Legacy stop/pause rows were all written with step 0; their slot comes
+        -- from the condition type, as CONDITION_STEPS does for new plans
+        case
+            when plan_kind in ('stop', 'pause') then
+                case level_type when 'priceDropFromLast' then 1 when 'priceDropFromAvg' then 2 else 0 end
+            else coalesce(step, 0)
+        end as plan_step
+    from legacy
+),
+latest as (
+    select distinct on (run_id, bot_id, plan_kind, plan_step) *
+    from stepped
+    order by run_id, bot_id, plan_kind, plan_step, created_at desc
+),
+per_kind as (
+    select
+        run_id,
+        bot_id,
+        min(symbol) as symbol,
+        plan_kind,
+        count(*) as n,
+        jsonb_build_object(
+            'step', jsonb_agg(plan_step order by plan_step),
+            'price', jsonb_agg(price order by plan_step),
+            'amount', jsonb_agg(amount order by plan_step),
+            'drop_pct', jsonb_agg(drop_pct order by plan_step),
+            'type', jsonb_agg(level_type order by plan_step)
+        ) as columns
+    from latest
+    group by run_id, bot_id, plan_kind
+)
+insert into bot_plans (run_id, bot_id, symbol, levels, level_count)
+select run_id, bot_id, min(symbol), jsonb_object_agg(plan_kind, columns), sum(n)
+from per_kind
+group by run_id, bot_id
+on conflict do nothing;
+
+delete from bot_trades
+where kind is null and order_id is null
+  and (note in ('DCA Order', 'Take Profit') or note like 'STOP: %' or note like 'PAUSE: %');
@@ -0,0 +1,45 @@
+-- Roll up and delete one batch of pruned log rows in a single transaction
+-- (app/services/log_retention.py). Counts come from the rows actually deleted,
+-- so a retried or concurrent batch can never count a row twice.
+create or replace function roll_up_logs(
+    p_source text,
+    p_key text,
+    p_time text,
+    p_event text,
+    p_valid text,
+    p_ids jsonb
+)
+returns integer
+language plpgsql
+as $$
+declare
+    moved integer;
+begin
+    if p_source not in ('bot_logs', 'webhook_logs') then
+        raise exception 'roll_up_logs: unsupported source %', p_source;
+    end if;
+
+    execute format($sql$
+        with gone as (
+            delete from %1$I
+            where %2$I::text in (select jsonb_array_elements_text($1))
+            returning %3$I::timestamptz as ts, bot_id, %4$I as event, %5$s as valid
+        ), counted as (
+            insert into log_rollups (source, bucket, bot_id, event, valid, count)
+            select $2, date_trunc('hour', ts at time zone 'utc') at time zone 'utc',
+                   coalesce(bot_id::text, ''), coalesce(event::text, ''), valid, count(*)
+            from gone
+            group by 1, 2, 3, 4, 5
+            on conflict (source, bot_id, bucket, event, valid)
+            do update set count = log_rollups.count + excluded.count
+        )
+        select count(*) from gone
+    $sql$,
+        p_source, p_key, p_time, p_event,
+        coalesce('coalesce(' || quote_ident(p_valid) || ', false)', 'true'))
+    into moved
+    using p_ids, p_source;
+
+    return moved;
+end;
+$$;
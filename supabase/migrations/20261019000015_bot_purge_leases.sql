@@ -0,0 +1,3 @@
+-- Lease on a soft-deleted bot being purged (app/services/bot_purger.py): every worker
+-- runs the purger, and only the one holding an unexpired lease purges and archives the bot
+alter table bots add column if not exists purge_claimed_until timestamptz;
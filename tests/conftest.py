@@ -0,0 +1,13 @@
+import os
+import sys
+
+from cryptography.fernet import Fernet
+
+# Settings are read when app modules are imported; point them at throwaway
+# values first so the tests never pick up the credentials in .env
+os.environ["SUPABASE_URL"] = "http://localhost:54321"
+os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "aaa.bbb.ccc"
+os.environ["SUPABASE_READ_URL"] = ""
+os.environ["FERNET_KEY"] = Fernet.generate_key().decode()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,92 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services.capital_calculator import _round2, calculate_ladder_capital, expand_grid, required_capital
+from legacy_ladder import calculate_dca_levels
+
+ENTRY_PRICE = 27123.45
+
+
+def _bot(**fields):
+    row = {
+        "dca_condition": "lastEntry",
+        "dca_amount_mode": "fixed",
+        "dca_orders": 0,
+        "max_dca_orders": 6,
+        "initial_amount": 100.0,
+        "fixed_amount": 50.0,
+        "multiplier": 1.5,
+        "last_entry_drop": 2.5,
+        "average_entry_drop": 3.0,
+        "loss_percentage": 1.75,
+        "loss_amount": 7.0,
+    }
+    row.update(fields)
+    return row
+
+
+def _legacy_capital(bot: dict, entry_price: float) -> dict:
+    """Capital, average entry and depth of the full ladder, from the legacy levels."""
+    levels = calculate_dca_levels(bot, entry_price)
+    required = bot["initial_amount"] + sum(level["amount"] for level in levels)
+    quantity = bot["initial_amount"] / entry_price + sum(level["amount"] / level["trigger_price"] for level in levels)
+    return {
+        "required_capital": round(required, 2),
+        "worst_avg_entry_price": required / quantity,
+        "last_trigger_price": levels[-1]["trigger_price"] if levels else entry_price,
+    }
+
+
+BOTS = [
+    _bot(dca_condition=condition, dca_amount_mode=mode, max_dca_orders=steps)
+    for condition, mode, steps in itertools.product(
+        ("lastEntry", "averageEntry", "lossPercent", "lossAmount"), ("fixed", "multiplier"), (0, 1, 8))
+] + [
+    # 1139.07 * 1.5 = 1708.605: np.round alone would give 1708.60, round() gives 1708.61
+    _bot(dca_amount_mode="multiplier", initial_amount=1139.07, multiplier=1.5),
+    _bot(dca_amount_mode="multiplier", multiplier=1.05, max_dca_orders=25),
+]
+
+
+def test_matches_legacy_ladder():
+    results = calculate_ladder_capital(BOTS, entry_price=ENTRY_PRICE)
+
+    for bot, result in zip(BOTS, results):
+        expected = _legacy_capital(bot, ENTRY_PRICE)
+        assert result["error"] is None
+        assert result["required_capital"] == expected["required_capital"]
+        # The legacy ladder rounds every rung to 4 decimals, the calculator works on exact ratios
+        assert result["worst_avg_entry_price"] == pytest.approx(expected["worst_avg_entry_price"], rel=1e-6)
+        assert result["last_trigger_price"] == pytest.approx(expected["last_trigger_price"], rel=1e-6)
+        assert result["ladder_depth_pct"] == pytest.approx(
+            (1 - expected["last_trigger_price"] / ENTRY_PRICE) * 100, abs=1e-3)
+
+
+def test_round2_follows_python_round_on_near_ties():
+    values = np.array([1139.07 * 1.5, 0.125, 2.675, 10.0])
+    assert _round2(values).tolist() == [round(v, 2) for v in values.tolist()]
+
+
+def test_invalid_configs_report_an_error():
+    [result] = calculate_ladder_capital([_bot(dca_amount_mode="bogus")])
+    assert result["required_capital"] is None
+    assert result["error"] == "Invalid DCA amount mode"
+
+
+def test_required_capital_single_bot():
+    assert required_capital(_bot(max_dca_orders=4)) == 300.0
+    assert required_capital(_bot(max_dca_orders=0)) == 100.0
+
+
+def test_expand_grid():
+    rows = expand_grid(_bot(), {"multiplier": [1.2, 1.5], "progressive_drops.multiplier": [1.0, 2.0]})
+    assert len(rows) == 4
+    assert {(row["multiplier"], row["progressive_drops"]["multiplier"]) for row in rows} == {
+        (1.2, 1.0), (1.2, 2.0), (1.5, 1.0), (1.5, 2.0)}
+
+
+def test_expand_grid_is_bounded():
+    with pytest.raises(ValueError, match="Grid too large"):
+        expand_grid(_bot(), {"multiplier": list(range(101)), "max_dca_orders": list(range(100))})
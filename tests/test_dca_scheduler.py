@@ -0,0 +1,22 @@
+from app.services.dca_scheduler import next_fire
+
+
+def test_future_slot_is_kept():
+    assert next_fire(1000.0, 60, now=900.0) == 1000.0
+
+
+def test_slot_at_now_moves_to_the_next_one():
+    assert next_fire(1000.0, 60, now=1000.0) == 1060.0
+
+
+def test_missed_slots_collapse_onto_the_grid():
+    # Down for ~10 intervals: fire once, at the next slot of the original grid
+    assert next_fire(1000.0, 60, now=1601.0) == 1660.0
+    assert next_fire(1000.0, 60, now=1659.9) == 1660.0
+
+
+def test_next_slot_is_always_after_now():
+    for now in (1000.0, 1000.5, 1059.999, 1060.0, 5000.0):
+        fire = next_fire(1000.0, 60, now)
+        assert now < fire <= now + 60
+        assert (fire - 1000.0) % 60 == 0
@@ -0,0 +1,88 @@
+import itertools
+
+import pytest
+
+from app.models.bot_config import BotConfig
+from app.services.ladder_templates import dca_template, ladder_templates, take_profit_template
+from legacy_ladder import calculate_dca_levels, calculate_take_profit_levels
+
+ENTRY_PRICES = (27123.45, 1.0, 0.04213)
+
+
+def _bot(**fields):
+    row = {
+        "bot_id": "bot-1",
+        "trading_pair": "BTCUSDT",
+        "dca_condition": "lastEntry",
+        "dca_amount_mode": "fixed",
+        "dca_orders": 0,
+        "max_dca_orders": 6,
+        "initial_amount": 100.0,
+        "fixed_amount": 50.0,
+        "multiplier": 1.5,
+        "last_entry_drop": 2.5,
+        "average_entry_drop": 3.0,
+        "loss_percentage": 1.75,
+        "loss_amount": 7.0,
+        "progressive_drops": {},
+        "take_profit": {"targets": [
+            {"triggerPrice": 1.5, "positionSize": 50},
+            {"trigger_pct": 3.25, "position_size": 50},
+        ]},
+    }
+    row.update(fields)
+    return row
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    ladder_templates.clear()
+    yield
+    ladder_templates.clear()
+
+
+BOTS = [
+    _bot(dca_condition=condition, dca_amount_mode=mode)
+    for condition, mode in itertools.product(
+        ("lastEntry", "averageEntry", "lossPercent", "lossAmount"), ("fixed", "multiplier"))
+] + [
+    _bot(dca_amount_mode="multiplier", initial_amount=1139.07, multiplier=1.5),
+    _bot(dca_orders=4),
+    _bot(progressive_drops={"enabled": True, "multiplier": 1.3}),
+]
+
+
+@pytest.mark.parametrize("bot", BOTS)
+@pytest.mark.parametrize("entry_price", ENTRY_PRICES)
+def test_dca_ladder_matches_legacy_levels(bot, entry_price):
+    levels = dca_template(BotConfig.from_row(bot)).scale(entry_price)
+    without_quantity = [{k: v for k, v in level.items() if k != "quantity"} for level in levels]
+    assert without_quantity == calculate_dca_levels(bot, entry_price)
+
+
+@pytest.mark.parametrize("entry_price", ENTRY_PRICES)
+def test_take_profit_ladder_matches_legacy_levels(entry_price):
+    bot = _bot()
+    levels = take_profit_template(BotConfig.from_row(bot)).scale(entry_price)
+    assert levels == calculate_take_profit_levels(bot, entry_price)
+
+
+def test_configs_with_the_same_ladder_share_a_template():
+    hits = ladder_templates.hits
+    first = dca_template(BotConfig.from_row(_bot(bot_id="a", trading_pair="BTCUSDT")))
+    second = dca_template(BotConfig.from_row(_bot(bot_id="b", trading_pair="ETHUSDT")))
+    assert first is second
+    assert ladder_templates.hits == hits + 1
+
+    other = dca_template(BotConfig.from_row(_bot(last_entry_drop=4.0)))
+    assert other is not first
+
+
+def test_cache_is_bounded():
+    ladder_templates.max_size, size = 2, ladder_templates.max_size
+    try:
+        for drop in (1.0, 2.0, 3.0):
+            dca_template(BotConfig.from_row(_bot(last_entry_drop=drop)))
+        assert len(ladder_templates._entries) == 2
+    finally:
+        ladder_templates.max_size = size
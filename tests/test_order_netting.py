@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.order_netting import allocate
+
+
+def _order(**fields):
+    return {"order_id": "1", "symbol": "BTCUSDT", "price": "100", "amount": 60.0, **fields}
+
+
+def test_allocate_splits_pro_rata():
+    shares = allocate(_order(filled_quantity=0.6), [10.0, 20.0, 30.0])
+
+    assert [s["amount"] for s in shares] == pytest.approx([10.0, 20.0, 30.0])
+    assert [s["filled_quantity"] for s in shares] == pytest.approx([0.1, 0.2, 0.3])
+    assert all(s["netted_with"] == 3 and s["netted_amount"] == 60.0 for s in shares)
+    assert all(s["order_id"] == "1" for s in shares)
+
+
+def test_allocate_remainder_goes_to_last_share():
+    shares = allocate(_order(amount=100.0, filled_quantity=1.0), [1.0, 1.0, 1.0])
+
+    assert shares[0]["filled_quantity"] == shares[1]["filled_quantity"] == 0.33333333
+    assert shares[0]["amount"] == shares[1]["amount"] == 33.33333333
+    assert sum(s["filled_quantity"] for s in shares) == pytest.approx(1.0, abs=1e-12)
+    assert sum(s["amount"] for s in shares) == pytest.approx(100.0, abs=1e-12)
+
+
+def test_allocate_uses_exchange_filled_quantity():
+    # The exchange fill, not amount / price, is what the callers actually bought
+    shares = allocate(_order(amount=50.0, filled_quantity=0.49), [25.0, 25.0])
+    assert sum(s["filled_quantity"] for s in shares) == pytest.approx(0.49)
+
+
+def test_allocate_falls_back_to_amount_over_price():
+    shares = allocate(_order(amount=50.0), [25.0, 25.0])
+    assert [s["filled_quantity"] for s in shares] == pytest.approx([0.25, 0.25])
+
+
+def test_allocate_single_request_keeps_the_whole_fill():
+    [share] = allocate(_order(filled_quantity=0.6), [60.0])
+    assert share["amount"] == 60.0
+    assert share["filled_quantity"] == 0.6
@@ -0,0 +1,99 @@
+import pytest
+
+from app.services import paper_exchange
+from app.services.paper_exchange import PAPER_START_BALANCE, PaperExchange, PaperOrderNotFound
+
+MAKER_FEE = 0.0002
+TAKER_FEE = 0.001
+SLIPPAGE_BPS = 5.0
+
+
+@pytest.fixture
+def exchange(monkeypatch):
+    monkeypatch.setattr(paper_exchange, "PAPER_MAKER_FEE", MAKER_FEE)
+    monkeypatch.setattr(paper_exchange, "PAPER_TAKER_FEE", TAKER_FEE)
+    monkeypatch.setattr(paper_exchange, "PAPER_SLIPPAGE_BPS", SLIPPAGE_BPS)
+    ex = PaperExchange()
+    ex._prices["BTCUSDT"] = 100.0
+    return ex
+
+
+def test_resting_buy_reserves_value_and_maker_fee(exchange):
+    order = exchange.submit("key", "BTCUSDT", "buy", 1.0, price=90.0)
+
+    assert order.status == "NEW"
+    assert order.reserved == pytest.approx(90.0 * (1 + MAKER_FEE))
+    assert exchange.balances("key")["USDT"] == pytest.approx(PAPER_START_BALANCE - 90.0 * (1 + MAKER_FEE))
+
+
+def test_resting_buy_fills_at_its_limit_as_maker(exchange):
+    order = exchange.submit("key", "BTCUSDT", "buy", 1.0, price=90.0)
+
+    assert exchange.tick("BTCUSDT", 91.0) == 0
+    assert exchange.tick("BTCUSDT", 89.0) == 1
+
+    balances = exchange.balances("key")
+    assert order.status == "FILLED" and order.reserved == 0.0
+    assert balances["BTC"] == 1.0
+    assert balances["USDT"] == pytest.approx(PAPER_START_BALANCE - 90.0 * (1 + MAKER_FEE))
+    [trade] = exchange.trades("key", "BTCUSDT")
+    assert float(trade["price"]) == 90.0
+    assert float(trade["commission"]) == pytest.approx(90.0 * MAKER_FEE)
+    assert trade["isMaker"] is True
+
+
+def test_cancel_refunds_the_whole_reservation(exchange):
+    order = exchange.submit("key", "BTCUSDT", "buy", 2.0, price=80.0)
+    exchange.cancel("key", order.order_id)
+
+    assert order.status == "CANCELED"
+    assert exchange.balances("key")["USDT"] == pytest.approx(PAPER_START_BALANCE)
+    assert exchange.tick("BTCUSDT", 70.0) == 0
+
+
+def test_market_buy_fills_with_slippage_and_taker_fee(exchange):
+    order = exchange.submit("key", "BTCUSDT", "buy", 1.0)
+
+    fill_price = 100.0 * (1 + SLIPPAGE_BPS / 10000)
+    assert order.status == "FILLED"
+    assert exchange.balances("key")["BTC"] == 1.0
+    assert exchange.balances("key")["USDT"] == pytest.approx(PAPER_START_BALANCE - fill_price * (1 + TAKER_FEE))
+    [trade] = exchange.trades("key", "BTCUSDT")
+    assert trade["isMaker"] is False
+
+
+def test_marketable_limit_buy_refunds_the_price_improvement(exchange):
+    exchange.submit("key", "BTCUSDT", "buy", 1.0, price=105.0)
+    # Reserved at 105 but filled at the market price of 100
+    assert exchange.balances("key")["USDT"] == pytest.approx(PAPER_START_BALANCE - 100.0 * (1 + TAKER_FEE))
+
+
+def test_resting_sell_credits_quote_less_fee(exchange):
+    exchange.submit("key", "BTCUSDT", "buy", 1.0)
+    usdt = exchange.balances("key")["USDT"]
+
+    order = exchange.submit("key", "BTCUSDT", "sell", 1.0, price=110.0)
+    assert exchange.balances("key")["BTC"] == 0.0
+    exchange.tick("BTCUSDT", 111.0)
+
+    assert order.status == "FILLED"
+    assert exchange.balances("key")["USDT"] == pytest.approx(usdt + 110.0 * (1 - MAKER_FEE))
+
+
+def test_insufficient_balance(exchange):
+    with pytest.raises(ValueError, match="Insufficient paper USDT"):
+        exchange.submit("key", "BTCUSDT", "buy", 1000.0, price=99.0)
+    with pytest.raises(ValueError, match="Insufficient paper BTC"):
+        exchange.submit("key", "BTCUSDT", "sell", 1.0, price=101.0)
+
+
+def test_unknown_order_carries_binance_code(exchange):
+    order = exchange.submit("key", "BTCUSDT", "buy", 1.0, price=90.0)
+
+    with pytest.raises(PaperOrderNotFound) as excinfo:
+        exchange.order("key", 123)
+    assert excinfo.value.code == -2013
+    assert isinstance(excinfo.value, ValueError)
+    # Another account's order is just as unknown
+    with pytest.raises(PaperOrderNotFound):
+        exchange.cancel("other", order.order_id)
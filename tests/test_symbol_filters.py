@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.services.ladder_templates import DcaTemplate
+from app.services.symbol_filters import SymbolFilters, decimals, snap
+
+BTCUSDT_INFO = {
+    "symbol": "BTCUSDT",
+    "filters": [
+        {"filterType": "PRICE_FILTER", "tickSize": "0.01000000", "minPrice": "0.01000000", "maxPrice": "1000000.00000000"},
+        {"filterType": "LOT_SIZE", "stepSize": "0.00001000", "minQty": "0.00001000", "maxQty": "9000.00000000"},
+        {"filterType": "NOTIONAL", "minNotional": "5.00000000"},
+    ],
+}
+
+
+@pytest.fixture
+def filters():
+    return SymbolFilters.from_symbol_info(BTCUSDT_INFO)
+
+
+def test_decimals():
+    assert decimals("0.01000000") == 2
+    assert decimals("0.00001000") == 5
+    assert decimals("1.00000000") == 0
+
+
+def test_from_symbol_info(filters):
+    assert filters.tick_size == 0.01 and filters.price_precision == 2
+    assert filters.step_size == 0.00001 and filters.quantity_precision == 5
+    assert filters.min_qty == 0.00001 and filters.max_qty == 9000.0
+    assert filters.min_notional == 5.0
+
+
+def test_snap_modes():
+    assert snap([1.234, 1.235, 1.236], 0.01, 2).tolist() == [1.23, 1.24, 1.24]
+    assert snap([1.239], 0.01, 2, "down").tolist() == [1.23]
+    assert snap([1.231], 0.01, 2, "up").tolist() == [1.24]
+    # Values already on the grid stay put despite float error (0.3 / 0.1 == 2.9999999999999996)
+    assert snap([0.3], 0.1, 1, "down").tolist() == [0.3]
+    assert snap([0.3], 0.1, 1, "up").tolist() == [0.3]
+
+
+def test_snap_without_increment_is_a_no_op():
+    assert snap([1.23456], 0.0, 8).tolist() == [1.23456]
+
+
+def test_quantize_prices_rounds_to_tick_and_clamps(filters):
+    prices = filters.quantize_prices([27123.456, 27123.454, 0.001, 2_000_000.0])
+    assert prices.tolist() == [27123.46, 27123.45, 0.01, 1_000_000.0]
+
+
+def test_quantities_for_rounds_down(filters):
+    # 100 / 27123.45 = 0.0036868... -> never spend more than the amount
+    quantities = filters.quantities_for([100.0, 50.0], [27123.45, 25000.0])
+    assert quantities.tolist() == [0.00368, 0.002]
+    assert (quantities * np.array([27123.45, 25000.0]) <= np.array([100.0, 50.0])).all()
+
+
+def test_quantities_for_zero_price(filters):
+    assert filters.quantities_for([100.0], [0.0]).tolist() == [0.0]
+
+
+def test_valid_checks_min_qty_and_min_notional(filters):
+    mask = filters.valid([25000.0, 25000.0, 25000.0], [0.0002, 0.00019, 0.000001])
+    assert mask.tolist() == [True, False, False]
+
+
+def test_check_order_raises_below_minimum(filters):
+    filters.check_order(25000.0, 0.001)
+    with pytest.raises(ValueError, match="below the exchange minimum"):
+        filters.check_order(25000.0, 0.0001)
+
+
+def test_ladder_quantities_are_snapped_and_small_rungs_dropped(filters):
+    template = DcaTemplate(drop_pct=10.0, amounts=(20.0, 4.0, 30.0))
+    levels = template.scale(30000.0, filters)
+
+    # The 4 USDT rung is below the 5 USDT minimum notional and is left out
+    assert [level["step"] for level in levels] == [1, 3]
+    assert [level["trigger_price"] for level in levels] == [27000.0, 21870.0]
+    assert [level["quantity"] for level in levels] == [0.00074, 0.00137]
+
+
+def test_ladder_without_filters_keeps_every_rung():
+    levels = DcaTemplate(drop_pct=10.0, amounts=(20.0, 4.0)).scale(30000.0)
+    assert [level["quantity"] for level in levels] == [round(20.0 / 27000.0, 6), round(4.0 / 24300.0, 6)]